@@ -0,0 +1,113 @@
+"""
+Compares the cost of decoding gateway events with JSON and ETF.
+
+Usage::
+
+    python benchmarks/gateway_codec.py [payloads.jsonl] [--iterations N]
+
+``payloads.jsonl`` holds one recorded gateway payload (``{"op": 0, "t": ..., "d": ...}``) per line. Without it, a
+set of built-in MESSAGE_CREATE, GUILD_CREATE and PRESENCE_UPDATE payloads is used. Snowflake strings are turned
+into integers for the ETF side, like discord sends them.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from discordSplash import codec, etf  # noqa: E402
+
+
+def _user(i):
+    return {"id": str(80351110224678912 + i), "username": f"user{i}", "discriminator": f"{i % 10000:04d}",
+            "avatar": "8342729096ea3675442027381ff50dfe", "bot": False, "public_flags": 64}
+
+
+def _message(i):
+    return {"op": 0, "s": i, "t": "MESSAGE_CREATE", "d": {
+        "id": str(334385199974967042 + i), "channel_id": "290926798999357250", "guild_id": "290926798626357250",
+        "author": _user(i), "member": {"roles": ["41771983423143936"], "joined_at": "2015-04-26T06:26:56.936000+00:00",
+                                       "deaf": False, "mute": False},
+        "content": "Supa Hot " * (i % 5 + 1), "timestamp": "2017-07-11T17:27:07.299000+00:00",
+        "edited_timestamp": None, "tts": False, "mention_everyone": False, "mentions": [], "mention_roles": [],
+        "attachments": [], "embeds": [], "pinned": False, "type": 0, "nonce": str(334385199974967040 + i)}}
+
+
+def _guild(i, members=250):
+    return {"op": 0, "s": i, "t": "GUILD_CREATE", "d": {
+        "id": str(290926798626357250 + i), "name": f"guild {i}", "icon": None, "owner_id": "80351110224678912",
+        "roles": [{"id": str(41771983423143936 + r), "name": f"role{r}", "color": 3447003, "hoist": True,
+                   "position": r, "permissions": "66321471", "managed": False, "mentionable": False}
+                  for r in range(20)],
+        "channels": [{"id": str(290926798999357250 + c), "type": 0, "name": f"channel{c}", "position": c,
+                      "permission_overwrites": [], "nsfw": False, "last_message_id": None} for c in range(30)],
+        "members": [{"user": _user(m), "roles": [], "joined_at": "2015-04-26T06:26:56.936000+00:00",
+                     "deaf": False, "mute": False} for m in range(members)],
+        "member_count": members, "large": False, "unavailable": False}}
+
+
+def _presence(i):
+    return {"op": 0, "s": i, "t": "PRESENCE_UPDATE", "d": {
+        "user": {"id": str(80351110224678912 + i)}, "guild_id": "290926798626357250", "status": "online",
+        "activities": [{"name": "a game", "type": 0, "created_at": 1626192000000}],
+        "client_status": {"desktop": "online"}}}
+
+
+def builtin_payloads():
+    return [_message(i) for i in range(50)] + [_guild(i) for i in range(2)] + [_presence(i) for i in range(50)]
+
+
+def snowflakes_to_int(obj, key=None):
+    """turns snowflake strings into integers, the way discord sends them over ETF"""
+    if isinstance(obj, dict):
+        return {k: snowflakes_to_int(v, k) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [snowflakes_to_int(v, key) for v in obj]
+    if isinstance(obj, str) and obj.isdigit() and key in ('id', 'roles', 'nonce') or \
+            (isinstance(key, str) and key.endswith('_id') and isinstance(obj, str) and obj.isdigit()):
+        return int(obj)
+    return obj
+
+
+def bench(decode, frames, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for frame in frames:
+            decode(frame)
+    elapsed = time.perf_counter() - start
+    return elapsed / (iterations * len(frames)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('payloads', nargs='?', help='file with one recorded gateway payload per line')
+    parser.add_argument('--iterations', type=int, default=20)
+    args = parser.parse_args()
+
+    if args.payloads:
+        with open(args.payloads, encoding='utf-8') as f:
+            payloads = [json.loads(line) for line in f if line.strip()]
+    else:
+        payloads = builtin_payloads()
+
+    by_type = {}
+    for payload in payloads:
+        by_type.setdefault(payload.get('t') or f"op {payload.get('op')}", []).append(payload)
+
+    print(f"JSON codec: {codec.name}")
+    print(f"{'event':<20}{'count':>7}{'json bytes':>12}{'etf bytes':>12}{'json us/ev':>12}{'etf us/ev':>12}")
+    for event_type, events in sorted(by_type.items()):
+        json_frames = [json.dumps(p).encode() for p in events]
+        etf_frames = [etf.encode(snowflakes_to_int(p)) for p in events]
+        assert etf.decode(etf_frames[0]) == snowflakes_to_int(events[0])
+
+        json_us = bench(codec.loads, json_frames, args.iterations)
+        etf_us = bench(etf.decode, etf_frames, args.iterations)
+        print(f"{event_type:<20}{len(events):>7}{sum(map(len, json_frames)) // len(events):>12}"
+              f"{sum(map(len, etf_frames)) // len(events):>12}{json_us:>12.1f}{etf_us:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""
+Replays gateway traffic through a bot and measures the whole receive path.
+
+Usage::
+
+    python benchmarks/gateway_replay.py [recording] [--events N] [--realtime] [--speed X] [--no-allocations]
+
+``recording`` is a file written by :class:`discordSplash.replay.FrameRecorder`. Without it, a session is made up
+from the built-in payloads of ``gateway_codec.py`` (READY, 2 GUILD_CREATEs, then ``--events`` events: 50%
+MESSAGE_CREATE, 40% PRESENCE_UPDATE and 10% TYPING_START) and recorded as JSON, as compressed JSON (zlib-stream)
+and as ETF.
+
+Every recording is replayed through a new :class:`discordSplash.GatewayBot` with three sets of listeners:
+
+- ``cache only``: no listeners, so only the events the cache uses are decoded
+- ``raw``: raw listeners for MESSAGE_CREATE and PRESENCE_UPDATE
+- ``model``: typed listeners for MESSAGE_CREATE and PRESENCE_UPDATE
+
+and reports the events per second (including the time the listeners take), the p50 and p99 time the read loop spent
+on an event, and the bytes allocated per event (a second replay under :mod:`tracemalloc`).
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import zlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from discordSplash import GatewayBot, codec, etf, events  # noqa: E402
+from discordSplash.cache import Cache  # noqa: E402
+from discordSplash.replay import RecordedFrame, ReplayDriver, write_recording  # noqa: E402
+from gateway_codec import _guild, _message, _presence, snowflakes_to_int  # noqa: E402
+
+
+def _typing(i):
+    return {"op": 0, "s": i, "t": "TYPING_START", "d": {
+        "user_id": str(80351110224678912 + i), "channel_id": "290926798999357250",
+        "guild_id": "290926798626357250", "timestamp": 1626192000}}
+
+
+def session(count):
+    """payloads of a made up session"""
+    payloads = [{"op": 10, "d": {"heartbeat_interval": 41250}},
+                {"op": 0, "s": 1, "t": "READY", "d": {
+                    "v": 9, "user": {"id": "80351110224678912", "username": "bot", "discriminator": "0001"},
+                    "session_id": "session", "guilds": [], "application": {"id": "80351110224678912"}}}]
+    payloads += [_guild(i) for i in range(2)]
+    for i in range(count):
+        kind = i % 10
+        payload = _message(i) if kind < 5 else _presence(i) if kind < 9 else _typing(i)
+        payloads.append(payload)
+    for seq, payload in enumerate(payloads):
+        if payload['op'] == 0:
+            payload['s'] = seq
+    return payloads
+
+
+def _json_frame(payload):
+    # discord puts the event type and sequence first
+    ordered = {key: payload[key] for key in ('t', 's', 'op', 'd') if key in payload}
+    return codec.dumps(ordered)
+
+
+def recordings(count):
+    """the made up session as JSON, compressed JSON and ETF frames"""
+    payloads = session(count)
+    json_frames = [_json_frame(payload) for payload in payloads]
+    compressor = zlib.compressobj()
+    compressed = [compressor.compress(frame.encode()) + compressor.flush(zlib.Z_SYNC_FLUSH) for frame in json_frames]
+    etf_frames = [etf.encode(snowflakes_to_int(payload)) for payload in payloads]
+
+    def frames(encoding, compress, data):
+        return [RecordedFrame(0.0, None, {'encoding': encoding, 'compress': compress})] + \
+               [RecordedFrame(i * 0.001, frame) for i, frame in enumerate(data)]
+
+    return {'json': frames('json', False, json_frames), 'json+zlib': frames('json', True, compressed),
+            'etf': frames('etf', False, etf_frames)}
+
+
+async def _listener(payload):
+    pass
+
+
+LISTENERS = {
+    'cache only': (),
+    'raw': ((events.raw_eventdict, 'MESSAGE_CREATE'), (events.raw_eventdict, 'PRESENCE_UPDATE')),
+    'model': ((events.eventdict, 'MESSAGE_CREATE'), (events.eventdict, 'PRESENCE_UPDATE')),
+}
+
+
+async def replay(frames, listeners, args, trace_allocations):
+    for registry, event_type in listeners:
+        registry.add(event_type, _listener)
+    bot = GatewayBot('token', cache=Cache(), command_cache=None)
+    try:
+        return await ReplayDriver(bot, frames, realtime=args.realtime, speed=args.speed,
+                                  trace_allocations=trace_allocations).run()
+    finally:
+        await bot.close()
+        for registry, event_type in listeners:
+            registry.popall(event_type, None)
+
+
+async def run(args):
+    if args.recording:
+        sources = {os.path.basename(args.recording): args.recording}
+    else:
+        sources = recordings(args.events)
+
+    print(f"JSON codec: {codec.name}")
+    print(f"{'recording':<14}{'listeners':<12}{'events':>8}{'events/s':>11}{'p50 us':>9}{'p99 us':>9}"
+          f"{'KiB/event':>11}")
+    for name, frames in sources.items():
+        if isinstance(frames, list):
+            # written and read back, so the made up sessions go through the same file format as real ones
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'session.rec')
+                write_recording(path, frames)
+                frames = ReplayDriver(None, path).frames
+        for listeners_name, listeners in LISTENERS.items():
+            stats = await replay(frames, listeners, args, False)
+            allocated = ''
+            if not args.no_allocations:
+                traced = await replay(frames, listeners, args, True)
+                allocated = f"{traced.allocated_per_event / 1024:.2f}"
+            print(f"{name:<14}{listeners_name:<12}{stats.frames:>8}{stats.events_per_second:>11.0f}"
+                  f"{stats.percentile(50) * 1e6:>9.1f}{stats.percentile(99) * 1e6:>9.1f}{allocated:>11}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('recording', nargs='?', help='file written by discordSplash.replay.FrameRecorder')
+    parser.add_argument('--events', type=int, default=20000)
+    parser.add_argument('--realtime', action='store_true', help='replay at the pace the frames were recorded')
+    parser.add_argument('--speed', type=float, default=1.0, help='how much faster than recorded to replay')
+    parser.add_argument('--no-allocations', action='store_true', help='skip the tracemalloc replay')
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+Measures how long the interaction router takes to dispatch an interaction.
+
+Usage::
+
+    python benchmarks/interaction_router.py [--commands N] [--iterations N]
+
+Registers ``--commands`` commands (default 1,000): a third of them plain commands, a third as subcommands of
+commands with 10 subcommands each, and a third as subcommands of subcommand groups. The same number of components
+is registered, half with a fixed ``custom_id`` and half parametrised (``poll0:{poll_id}``). Then each kind of
+interaction is dispatched to a coroutine that does nothing, and the time per dispatch is reported:
+
+- ``route``: finding the coroutine and parsing the options (:meth:`InteractionRouter.dispatch`)
+- ``model + route``: also building the :class:`discordSplash.slashCommand.Interaction`, like the gateway does
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from discordSplash import cache  # noqa: E402
+from discordSplash.router import InteractionRouter  # noqa: E402
+from discordSplash.slashCommand import Interaction  # noqa: E402
+
+
+async def handler(interaction, **kwargs):
+    pass
+
+
+def build_router(count):
+    router = InteractionRouter()
+    third = count // 3
+    for i in range(third):
+        router.add_command(f'command{i}', handler)
+    for i in range(third):
+        router.add_command(f'parent{i // 10} sub{i % 10}', handler)
+    for i in range(count - 2 * third):
+        router.add_command(f'root{i // 100} group{i // 10 % 10} sub{i % 10}', handler)
+    for i in range(count // 2):
+        router.add_component(f'button{i}', handler)
+    for i in range(count - count // 2):
+        router.add_component(f'poll{i}:{{poll_id}}', handler)
+    return router
+
+
+def _interaction(interaction_type, data):
+    return {"id": "860000000000000000", "application_id": "800000000000000000", "type": interaction_type,
+            "token": "token", "version": 1, "guild_id": "290926798626357250", "channel_id": "290926798999357250",
+            "member": {"user": {"id": "80351110224678912", "username": "user", "discriminator": "0001"},
+                       "roles": [], "joined_at": "2015-04-26T06:26:56.936000+00:00", "deaf": False, "mute": False},
+            "data": data}
+
+
+def _leaf_options():
+    return [{"type": 3, "name": "question", "value": "what now?"}, {"type": 4, "name": "minutes", "value": 10},
+            {"type": 6, "name": "target", "value": "80351110224678913"}]
+
+
+def payloads(count):
+    third = count // 3
+    resolved = {"users": {"80351110224678913": {"id": "80351110224678913", "username": "target",
+                                                "discriminator": "0002"}}}
+    last = count - 2 * third - 1
+    return {
+        'command': _interaction(2, {"id": "1", "name": f"command{third - 1}", "type": 1,
+                                    "options": _leaf_options(), "resolved": resolved}),
+        'subcommand': _interaction(2, {"id": "1", "name": f"parent{(third - 1) // 10}", "type": 1, "resolved": resolved,
+                                       "options": [{"type": 1, "name": f"sub{(third - 1) % 10}",
+                                                    "options": _leaf_options()}]}),
+        'group subcommand': _interaction(2, {
+            "id": "1", "name": f"root{last // 100}", "type": 1, "resolved": resolved,
+            "options": [{"type": 2, "name": f"group{last // 10 % 10}",
+                         "options": [{"type": 1, "name": f"sub{last % 10}", "options": _leaf_options()}]}]}),
+        'component': _interaction(3, {"custom_id": f"button{count // 2 - 1}", "component_type": 2}),
+        'parametrised component': _interaction(3, {"custom_id": f"poll{count - count // 2 - 1}:1234",
+                                                   "component_type": 2}),
+    }
+
+
+async def bench(router, payload, iterations, build):
+    interaction = Interaction(payload)
+    start = time.perf_counter()
+    if build:
+        for _ in range(iterations):
+            await router.dispatch(Interaction(payload))
+    else:
+        for _ in range(iterations):
+            await router.dispatch(interaction)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+async def run(args):
+    router = build_router(args.commands)
+    print(f"{len(router)} routes, {args.iterations} iterations")
+    print(f"{'interaction':<26}{'route us':>12}{'model + route us':>18}")
+    for name, payload in payloads(args.commands).items():
+        route = await bench(router, payload, args.iterations, False)
+        full = await bench(router, payload, args.iterations, True)
+        print(f"{name:<26}{route:>12.2f}{full:>18.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--commands', type=int, default=1000)
+    parser.add_argument('--iterations', type=int, default=100000)
+    args = parser.parse_args()
+    cache.set_cache(cache.Cache(messages=False))
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+Sends signed interactions to a local :class:`discordSplash.webhook.InteractionServer`.
+
+Usage::
+
+    python benchmarks/interaction_webhook.py [--requests N] [--concurrency N] [--port PORT]
+
+A key pair is generated, the server is started with its public key, and every request is signed with the private
+key like discord does. The harness first checks that unsigned and badly signed requests are rejected, then sends
+``--requests`` PINGs and ``--requests`` slash commands (``--concurrency`` at a time) and reports requests per
+second and the p50 and p99 latency of each. The command responds straight away, so its latency is the cost of
+verifying, building the interaction and routing it.
+
+Needs PyNaCl or cryptography (``pip install discordSplash[webhook]``).
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import aiohttp
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from discordSplash import router  # noqa: E402
+from discordSplash.slashCommand import ReactionResponse  # noqa: E402
+from discordSplash.snowflake import snowflake_from_time  # noqa: E402
+from discordSplash.webhook import InteractionServer, InteractionSigner, backend  # noqa: E402
+import datetime  # noqa: E402
+
+
+async def pong(interaction, text='pong'):
+    await interaction.respond(ReactionResponse(text))
+
+
+def _ping():
+    return {"id": str(snowflake_from_time(datetime.datetime.now())), "application_id": "800000000000000000",
+            "type": 1, "token": "token", "version": 1}
+
+
+def _command():
+    return {"id": str(snowflake_from_time(datetime.datetime.now())), "application_id": "800000000000000000",
+            "type": 2, "token": "token", "version": 1, "guild_id": "290926798626357250",
+            "channel_id": "290926798999357250",
+            "member": {"user": {"id": "80351110224678912", "username": "user", "discriminator": "0001"},
+                       "roles": [], "joined_at": "2015-04-26T06:26:56.936000+00:00", "deaf": False, "mute": False},
+            "data": {"id": "1", "name": "ping", "type": 1,
+                     "options": [{"type": 3, "name": "text", "value": "hello"}]}}
+
+
+async def post(session, url, body, headers):
+    start = time.perf_counter()
+    async with session.post(url, data=body, headers=dict(headers, **{'Content-Type': 'application/json'})) as r:
+        payload = await r.read()
+    return r.status, payload, time.perf_counter() - start
+
+
+async def check(session, url, signer):
+    body = json.dumps(_ping()).encode()
+    status, _, _ = await post(session, url, body, {})
+    assert status == 401, f"unsigned request got {status}"
+    headers = signer.sign(body)
+    status, _, _ = await post(session, url, body + b' ', headers)
+    assert status == 401, f"tampered request got {status}"
+    status, payload, _ = await post(session, url, body, signer.sign(body))
+    assert status == 200 and json.loads(payload) == {"type": 1}, f"PING got {status} {payload!r}"
+    body = json.dumps(_command()).encode()
+    status, payload, _ = await post(session, url, body, signer.sign(body))
+    assert status == 200 and json.loads(payload) == {"type": 4, "data": {"content": "hello"}}, \
+        f"command got {status} {payload!r}"
+    print("signature checks, PING and command responses: ok")
+
+
+async def load(session, url, signer, make, count, concurrency):
+    # bodies are signed beforehand so the client does not compete with the server for the CPU
+    requests = []
+    for _ in range(count):
+        body = json.dumps(make()).encode()
+        requests.append((body, signer.sign(body)))
+    latencies = []
+    queue = iter(requests)
+
+    async def worker():
+        for body, headers in queue:
+            status, _, latency = await post(session, url, body, headers)
+            assert status == 200, status
+            latencies.append(latency)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return count / elapsed, latencies[len(latencies) // 2] * 1000, latencies[int(len(latencies) * 0.99)] * 1000
+
+
+async def run(args):
+    signer = InteractionSigner()
+    router.get_router().add_command('ping', pong)
+    server = InteractionServer(signer.public_key)
+    await server.start('127.0.0.1', args.port)
+    url = f'http://127.0.0.1:{args.port}{server.path}'
+    try:
+        async with aiohttp.ClientSession() as session:
+            await check(session, url, signer)
+            print(f"backend {backend}, {args.requests} requests per kind, concurrency {args.concurrency}")
+            print(f"{'interaction':<12}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+            for name, make in (('PING', _ping), ('command', _command)):
+                rate, p50, p99 = await load(session, url, signer, make, args.requests, args.concurrency)
+                print(f"{name:<12}{rate:>10.0f}{p50:>10.2f}{p99:>10.2f}")
+    finally:
+        await server.close()
+    print(f"server: {server.requests} requests, {server.rejected} rejected")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
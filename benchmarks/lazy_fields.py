@@ -0,0 +1,81 @@
+"""
+Measures what lazy field parsing saves when building messages.
+
+Usage::
+
+    python benchmarks/lazy_fields.py [payloads.jsonl] [--iterations N] [--no-message-cache]
+
+``payloads.jsonl`` holds one recorded gateway payload per line. Only the MESSAGE_CREATE payloads are used. Without
+it, the built-in MESSAGE_CREATE payloads of ``gateway_codec.py`` are used. Messages go through the default
+:class:`discordSplash.cache.Cache`, like the gateway does, unless ``--no-message-cache`` is given.
+
+Three handlers are timed per message:
+
+- ``filter``: reads only ``content``, like a prefix filter that rejects almost every message
+- ``all fields``: reads every lazily parsed field, which costs what eager parsing used to
+- ``all fields twice``: reads them again, which only hits the memoized values
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from discordSplash import cache  # noqa: E402
+from discordSplash.message import Message  # noqa: E402
+from gateway_codec import _message  # noqa: E402
+
+
+def content_filter(message):
+    return message.content.startswith('!')
+
+
+def all_fields(message):
+    return (message.author, message.timestamp, message.edited_timestamp, message.application_id,
+            message.author.timestamp)
+
+
+def all_fields_twice(message):
+    all_fields(message)
+    return all_fields(message)
+
+
+def bench(handler, payloads, iterations, messages_cache):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for payload in payloads:
+            # built by the cache, or by the event itself when the message cache is off
+            handler(messages_cache.parse('MESSAGE_CREATE', payload) or Message(payload))
+    elapsed = time.perf_counter() - start
+    return elapsed / (iterations * len(payloads)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('payloads', nargs='?', help='file with one recorded gateway payload per line')
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--no-message-cache', action='store_true')
+    args = parser.parse_args()
+
+    if args.payloads:
+        with open(args.payloads, encoding='utf-8') as f:
+            payloads = [json.loads(line) for line in f if line.strip()]
+    else:
+        payloads = [_message(i) for i in range(50)]
+    payloads = [payload['d'] for payload in payloads if payload.get('t') == 'MESSAGE_CREATE']
+
+    messages_cache = cache.Cache(messages=not args.no_message_cache)
+    cache.set_cache(messages_cache)
+
+    print(f"{len(payloads)} MESSAGE_CREATE payloads, {args.iterations} iterations, "
+          f"message cache {'off' if args.no_message_cache else 'on'}")
+    print(f"{'handler':<20}{'us/message':>12}")
+    for name, handler in (('filter', content_filter), ('all fields', all_fields),
+                          ('all fields twice', all_fields_twice)):
+        print(f"{name:<20}{bench(handler, payloads, args.iterations, messages_cache):>12.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+"""
+Load tests a bot against a local :class:`discordSplash.mock.MockGateway` and :class:`discordSplash.mock.MockAPI`.
+
+Usage::
+
+    python benchmarks/mock_load.py [--events N] [--encoding json|etf] [--compress] [--listener raw|model]
+                                   [--no-message-cache] [--requests N] [--limit N] [--per S] [--global-limit N]
+
+The mock servers run in a child process, so they do not compete with the bot for the CPU, and are driven through a
+pipe. Gateway phases, each ``--events`` MESSAGE_CREATEs long:
+
+- ``flood``: events sent as fast as the bot takes them
+- ``reconnect``: RECONNECT halfway through; the bot resumes and the missed events are replayed
+- ``invalid session``: INVALID_SESSION first; the bot waits 1-5 seconds and identifies again
+
+For each phase the events per second the listener received (first to last event) are reported, and every event
+must arrive exactly once. Then ``--requests`` messages are sent through the bot's HTTP client to one channel (one
+ratelimit bucket of ``--limit`` requests per ``--per`` seconds) and to as many channels (bounded by the global
+limit), reporting requests per second, p50/p99 latency and the 429s the server sent.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from discordSplash import GatewayBot, events  # noqa: E402
+from discordSplash.cache import Cache  # noqa: E402
+from discordSplash.mock import MockAPI, MockGateway  # noqa: E402
+from discordSplash.ratelimit import GlobalRateLimit  # noqa: E402
+from discordSplash.request import HTTPClient  # noqa: E402
+from gateway_codec import _message, snowflakes_to_int  # noqa: E402
+
+
+def _stats(gateway, api):
+    return {'identifies': gateway.identifies, 'resumes': gateway.resumes, 'heartbeats': gateway.heartbeats,
+            'dispatched': gateway.dispatched, 'requests': api.requests, 'rate_limited': api.rate_limited,
+            'global_rate_limited': api.global_rate_limited}
+
+
+async def _serve(pipe, args):
+    gateway = MockGateway(resume_buffer=args.events)
+    api = MockAPI(limit=args.limit, per=args.per, global_limit=args.global_limit)
+    await gateway.start()
+    api.gateway_url = gateway.url
+    await api.start()
+    pipe.send((gateway.url, api.url))
+
+    message = _message(1)['d']
+    if args.encoding == 'etf':
+        message = snowflakes_to_int(message)
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            command, count = await loop.run_in_executor(None, pipe.recv)
+            if command == 'stop':
+                break
+            if command == 'invalidate':
+                await gateway.invalidate_session(resumable=False)
+            if command != 'stats':
+                await gateway.wait_for_connections(timeout=30)
+            if command == 'reconnect':
+                await gateway.flood('MESSAGE_CREATE', message, count // 2)
+                await gateway.reconnect()
+                await gateway.flood('MESSAGE_CREATE', message, count - count // 2)
+            elif command in ('flood', 'invalidate'):
+                await gateway.flood('MESSAGE_CREATE', message, count)
+            pipe.send(_stats(gateway, api))
+    finally:
+        await gateway.close()
+        await api.close()
+
+
+def serve(pipe, args):
+    asyncio.run(_serve(pipe, args))
+
+
+async def gateway_phase(pipe, received, command, count):
+    loop = asyncio.get_running_loop()
+    first = len(received)
+    pipe.send((command, count))
+    await loop.run_in_executor(None, pipe.recv)
+    deadline = time.monotonic() + 60
+    while len(received) < first + count and time.monotonic() < deadline:
+        await asyncio.sleep(0.01)
+    # anything replayed twice would arrive after the last expected event
+    await asyncio.sleep(0.2)
+    got = len(received) - first
+    assert got == count, f"{command}: {got} of {count} events received"
+    pipe.send(('stats', 0))
+    stats = await loop.run_in_executor(None, pipe.recv)
+    times = received[first:]
+    return count / (times[-1] - times[0]), stats
+
+
+async def rest_phase(http, count, channel):
+    latencies = []
+
+    async def send(i):
+        start = time.perf_counter()
+        channel_id = channel if channel is not None else i + 1
+        await http.request('POST', f'/channels/{channel_id}/messages', json={'content': str(i)},
+                           channel_id=channel_id)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(send(i) for i in range(count)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return count / elapsed, latencies[len(latencies) // 2] * 1000, latencies[int(len(latencies) * 0.99)] * 1000
+
+
+async def run(args, pipe):
+    loop = asyncio.get_running_loop()
+    gateway_url, api_url = await loop.run_in_executor(None, pipe.recv)
+
+    received = []
+
+    async def on_message(payload):
+        received.append(time.perf_counter())
+
+    registry = events.raw_eventdict if args.listener == 'raw' else events.eventdict
+    registry.add('MESSAGE_CREATE', on_message)
+    http = HTTPClient('token', api_url=api_url, global_ratelimit=GlobalRateLimit(args.global_limit))
+    bot = GatewayBot('token', gateway=gateway_url, http=http, encoding=args.encoding, compress=args.compress,
+                     cache=Cache(messages=not args.no_message_cache), command_cache=None)
+    task = asyncio.ensure_future(bot._run(update_commands=False))
+    try:
+        print(f"{args.events} events per phase, {args.encoding}{' + zlib-stream' if args.compress else ''}, "
+              f"{args.listener} listener, message cache {'off' if args.no_message_cache else 'on'}")
+        print(f"{'gateway phase':<18}{'events/s':>10}{'identifies':>12}{'resumes':>9}")
+        for name, command in (('flood', 'flood'), ('reconnect', 'reconnect'), ('invalid session', 'invalidate')):
+            rate, stats = await gateway_phase(pipe, received, command, args.events)
+            print(f"{name:<18}{rate:>10.0f}{stats['identifies']:>12}{stats['resumes']:>9}")
+
+        print(f"\n{args.requests} requests, {args.limit} per {args.per}s per bucket, {args.global_limit}/s global")
+        print(f"{'REST phase':<18}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'429s':>7}{'global':>8}")
+        for name, channel in (('one bucket', 1), ('many buckets', None)):
+            pipe.send(('stats', 0))
+            before = await loop.run_in_executor(None, pipe.recv)
+            rate, p50, p99 = await rest_phase(http, args.requests, channel)
+            pipe.send(('stats', 0))
+            after = await loop.run_in_executor(None, pipe.recv)
+            print(f"{name:<18}{rate:>10.0f}{p50:>10.1f}{p99:>10.1f}"
+                  f"{after['rate_limited'] - before['rate_limited']:>7}"
+                  f"{after['global_rate_limited'] - before['global_rate_limited']:>8}")
+    finally:
+        await bot.close()
+        await task
+        registry.popall('MESSAGE_CREATE', None)
+        pipe.send(('stop', 0))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--events', type=int, default=20000)
+    parser.add_argument('--encoding', choices=('json', 'etf'), default='json')
+    parser.add_argument('--compress', action='store_true', help='use zlib-stream transport compression')
+    parser.add_argument('--listener', choices=('raw', 'model'), default='raw')
+    parser.add_argument('--no-message-cache', action='store_true')
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--limit', type=int, default=50, help='requests per bucket window')
+    parser.add_argument('--per', type=float, default=1.0, help='seconds per bucket window')
+    parser.add_argument('--global-limit', type=int, default=100, help='requests per second across buckets')
+    args = parser.parse_args()
+
+    pipe, child_pipe = multiprocessing.Pipe()
+    server = multiprocessing.Process(target=serve, args=(child_pipe, args), daemon=True)
+    server.start()
+    try:
+        asyncio.run(run(args, pipe))
+    finally:
+        server.join(5)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+Measures the memory used by cached users and messages.
+
+Usage::
+
+    python benchmarks/model_memory.py [--users N] [--messages N]
+
+Fills a :class:`discordSplash.cache.Cache` with ``--users`` users (default 1,000,000) and ``--messages`` messages
+(default 100,000) and reports the bytes per cached object, with and without ``keep_raw``. The ``payload dict`` row
+is the memory of keeping only the decoded payloads, for comparison. Memory is measured with :mod:`tracemalloc`,
+which makes the run several times slower than normal.
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from discordSplash import cache, message, user  # noqa: E402
+
+
+def _user(i):
+    return {"id": str(80351110224678912 + i), "username": f"user{i}", "discriminator": f"{i % 10000:04d}",
+            "avatar": "8342729096ea3675442027381ff50dfe", "bot": False, "public_flags": 64}
+
+
+def _message(i, authors):
+    return {"id": str(334385199974967042 + i), "channel_id": str(290926798999357250 + i % 50),
+            "guild_id": "290926798626357250", "author": _user(i % authors),
+            "member": {"roles": ["41771983423143936"], "joined_at": "2015-04-26T06:26:56.936000+00:00",
+                       "deaf": False, "mute": False},
+            "content": f"message number {i}", "timestamp": "2017-07-11T17:27:07.299000+00:00",
+            "edited_timestamp": None, "tts": False, "mention_everyone": False, "mentions": [], "mention_roles": [],
+            "attachments": [], "embeds": [], "pinned": False, "type": 0, "nonce": str(334385199974967040 + i)}
+
+
+def measure(fill):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    kept = fill()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return used, elapsed
+
+
+def fill_users(count):
+    def fill():
+        users_cache = cache.Cache(messages=False)
+        for i in range(count):
+            users_cache.store_user(_user(i))
+        return users_cache
+    return fill
+
+
+def fill_messages(count, authors):
+    def fill():
+        messages_cache = cache.Cache(max_messages=None)
+        cache.set_cache(messages_cache)
+        for i in range(count):
+            messages_cache.parse('MESSAGE_CREATE', _message(i, authors))
+        return messages_cache
+    return fill
+
+
+def fill_dicts(make, count):
+    def fill():
+        return {i: make(i) for i in range(count)}
+    return fill
+
+
+def report(name, count, used, elapsed):
+    print(f"{name:<28}{count:>10}{used / 2 ** 20:>12.1f}{used / count:>12.0f}{elapsed:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=1000000)
+    parser.add_argument('--messages', type=int, default=100000)
+    args = parser.parse_args()
+    # messages are written by a small set of users, which the cache shares between them
+    authors = max(1, args.messages // 100)
+
+    print(f"{'':<28}{'objects':>10}{'MiB':>12}{'bytes/obj':>12}{'seconds':>10}")
+    report('users: payload dict', args.users, *measure(fill_dicts(_user, args.users)))
+    for keep_raw in (False, True):
+        user.User.keep_raw = keep_raw
+        report(f"users: User (raw={keep_raw})", args.users, *measure(fill_users(args.users)))
+    user.User.keep_raw = False
+
+    report('messages: payload dict', args.messages,
+           *measure(fill_dicts(lambda i: _message(i, authors), args.messages)))
+    for keep_raw in (False, True):
+        message.Message.keep_raw = keep_raw
+        report(f"messages: Message (raw={keep_raw})", args.messages,
+               *measure(fill_messages(args.messages, authors)))
+    message.Message.keep_raw = False
+
+
+if __name__ == '__main__':
+    main()
@@ -12,7 +12,11 @@ __copyright__ = "Copyright © 2021-Present Mineinjava"
 __license__ = "GNU GPLv3"
 
 from .gateway import GatewayBot
-from .enums import ActivityType, ApplicationCommandOptionType
+from .sharding import ShardManager
+from .cluster import ClusterManager
+from .cache import Cache
+from .enums import ActivityType, ApplicationCommandOptionType, Intents
 from .presence import Activity, UpdatePresence
-from .request import make_request
-from . import message, events
\ No newline at end of file
+from .request import make_request, HTTPClient
+from .router import InteractionRouter, command, component
+from . import message, events, router, snowflake
\ No newline at end of file
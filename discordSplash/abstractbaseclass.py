@@ -14,6 +14,8 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 import datetime
 
+from .snowflake import timestamp_ms
+
 
 class Object:
     """
@@ -45,15 +47,23 @@ class Object:
         id of the object.
 
     timestamp : :class:`datetime.datetime`
-        timestamp of when the object was created.
+        timestamp of when the object was created, as a naive datetime in local time. Computed when it is first read.
+        See :func:`discordSplash.snowflake.snowflake_time` for an aware one in UTC.
     """
+    __slots__ = ('id', '_timestamp')
 
     def __init__(self, id: int):
         id = int(id)
         self.id = id
-        # bit of math that gets the timestamp
-        epochs = (int(bin(id).replace("0b", ''), 2) >> 22) + 1420070400000
-        self.timestamp = datetime.datetime.fromtimestamp(epochs/1000)
+        # computed when it is first read
+        self._timestamp = None
+
+    @property
+    def timestamp(self) -> datetime.datetime:
+        """timestamp of when the object was created, as a naive datetime in local time."""
+        if self._timestamp is None:
+            self._timestamp = datetime.datetime.fromtimestamp(timestamp_ms(self.id) / 1000)
+        return self._timestamp
 
     def __int__(self):
         return self.id
@@ -83,6 +93,7 @@ class BaseChannel(Object):
 
         returns the object's discord id
     """
+    __slots__ = ()
 
     def __init__(self, json: dict):
         self.id = json.get('id')
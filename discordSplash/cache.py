@@ -0,0 +1,666 @@
+# Copyright (C) 2021-Present Mineinjava
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+In-memory cache of the guilds, channels, roles, members and users the bot can see.
+
+The cache is filled and kept up to date by gateway events, before the bot's listeners for them run. Every lookup is
+a dict lookup by snowflake. Users are stored once and shared by every member and message that refers to them.
+Recent messages are kept in a bounded :class:`MessageCache`.
+"""
+import collections
+from typing import Any, Callable, Deque, Dict, FrozenSet, List, Optional, Set, Tuple, Union
+
+from . import message, util
+from .channel import Channel
+from .guild import Guild, Member, Role
+from .user import User
+
+#: the events that update the :class:`MessageCache`
+MESSAGE_EVENTS = frozenset(('MESSAGE_CREATE', 'MESSAGE_UPDATE', 'MESSAGE_DELETE', 'MESSAGE_DELETE_BULK'))
+
+
+def _message_ids(cached) -> Tuple[int, int]:
+    """the id and channel id of a cached message or of its payload"""
+    if isinstance(cached, dict):
+        return int(cached['id']), int(cached['channel_id'])
+    return cached.id, cached.channel_id
+
+
+class MessageCache:
+    """
+    Bounded cache of recent messages, evicting the least recently used message when it is full.
+
+    Messages can be cached as their payload, which is only built into a :class:`discordSplash.message.Message`
+    the first time it is read from the cache. Most cached messages are never read again.
+
+    Parameters
+    ----------
+    max_messages : Optional[:class:`int`]
+        maximum number of cached messages. ``None`` for no limit. Defaults to ``1000``
+
+    max_bytes : Optional[:class:`int`]
+        maximum approximate memory use of the cached messages. ``None`` for no limit (default). Measuring a message
+        costs about as much as parsing it, so messages are only measured when this is set.
+
+    per_channel : Optional[:class:`int`]
+        maximum number of messages cached per channel. When a channel has more, its oldest message is evicted.
+        ``None`` for no limit (default). Setting it also keeps every channel's messages in order, see
+        :meth:`channel_history`.
+
+    Attributes
+    ----------
+    hits : :class:`int`
+        number of lookups that found the message
+
+    misses : :class:`int`
+        number of lookups that did not find the message
+
+    evictions : :class:`int`
+        number of messages evicted because a limit was reached
+    """
+
+    def __init__(self, max_messages: Optional[int] = 1000, max_bytes: Optional[int] = None,
+                 per_channel: Optional[int] = None):
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+        self.per_channel = per_channel
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        # least recently used first
+        self._messages: "collections.OrderedDict[int, Union[message.Message, dict]]" = collections.OrderedDict()
+        self._sizes: Dict[int, int] = dict()
+        self._bytes = 0
+        self._channels: Dict[int, Deque[int]] = dict()
+
+    def __len__(self):
+        return len(self._messages)
+
+    def __contains__(self, message_id):
+        return int(message_id) in self._messages
+
+    def get(self, message_id: int) -> Optional["message.Message"]:
+        """gets a cached message and marks it as recently used. ``None`` if it is not cached."""
+        message_id = int(message_id)
+        cached = self._messages.get(message_id)
+        if cached is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._messages.move_to_end(message_id)
+        return self._built(message_id, cached)
+
+    def _built(self, message_id: int, cached: Union["message.Message", dict]) -> "message.Message":
+        # a payload is replaced by its message, which keeps its place in the LRU order
+        if isinstance(cached, dict):
+            cached = self._messages[message_id] = message.Message(cached)
+        return cached
+
+    def channel_history(self, channel_id: int) -> List["message.Message"]:
+        """cached messages in a channel, oldest first. Always empty unless ``per_channel`` is set."""
+        return [self._built(message_id, self._messages[message_id])
+                for message_id in self._channels.get(int(channel_id), ())]
+
+    def add(self, cached: Union["message.Message", dict]) -> None:
+        """
+        Caches a message, evicting the least recently used messages if a limit is reached.
+
+        Parameters
+        ----------
+        cached : Union[:class:`discordSplash.message.Message`, :class:`dict`]
+            the message, or its MESSAGE_CREATE payload to build it only when it is read
+        """
+        message_id, channel_id = _message_ids(cached)
+        if message_id in self._messages:
+            self.remove(message_id, build=False)
+        self._messages[message_id] = cached
+        if self.max_bytes is not None:
+            size = self._sizes[message_id] = util.approximate_size(cached)
+            self._bytes += size
+
+        if self.per_channel is not None:
+            history = self._channels.get(channel_id)
+            if history is None:
+                history = self._channels[channel_id] = collections.deque()
+            history.append(message_id)
+            if len(history) > self.per_channel:
+                self._evict(history[0])
+
+        while self._messages and (
+                (self.max_messages is not None and len(self._messages) > self.max_messages) or
+                (self.max_bytes is not None and self._bytes > self.max_bytes)):
+            self._evict(next(iter(self._messages)))
+
+    def _evict(self, message_id: int) -> None:
+        self.evictions += 1
+        self.remove(message_id, build=False)
+
+    def remove(self, message_id: int, build: bool = True) -> Optional["message.Message"]:
+        """
+        Removes a message from the cache
+
+        Parameters
+        ----------
+        message_id : :class:`int`
+            the message's id
+
+        build : Optional[:class:`bool`]
+            whether to build the removed message if it was cached as its payload. Defaults to ``True``
+
+        Returns
+        -------
+        Optional[:class:`discordSplash.message.Message`]
+            the removed message. ``None`` if it was not cached, or if ``build`` is ``False`` and it was not built.
+        """
+        cached = self._messages.pop(int(message_id), None)
+        if cached is None:
+            return None
+        message_id, channel_id = _message_ids(cached)
+        self._bytes -= self._sizes.pop(message_id, 0)
+        history = self._channels.get(channel_id)
+        if history is not None:
+            if history[0] == message_id:
+                history.popleft()
+            else:
+                history.remove(message_id)
+            if not history:
+                del self._channels[channel_id]
+        if isinstance(cached, dict):
+            return message.Message(cached) if build else None
+        return cached
+
+    def update(self, data: dict, build: bool = True) -> Optional["message.Message"]:
+        """
+        Applies a partial MESSAGE_UPDATE payload to the cached message, in place.
+
+        Parameters
+        ----------
+        data : :class:`dict`
+            the MESSAGE_UPDATE payload
+
+        build : Optional[:class:`bool`]
+            whether to build the message if it was cached as its payload. If ``False``, the update is merged into
+            the payload instead. Defaults to ``True``
+
+        Returns
+        -------
+        Optional[:class:`discordSplash.message.Message`]
+            the updated message. ``None`` if it was not cached, or if ``build`` is ``False`` and it was not built.
+        """
+        message_id = int(data['id'])
+        cached = self._messages.get(message_id)
+        if cached is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._messages.move_to_end(message_id)
+        if isinstance(cached, dict) and not build:
+            cached.update(data)
+        else:
+            cached = self._built(message_id, cached)
+            cached._apply_update(data)
+        if self.max_bytes is not None:
+            size = util.approximate_size(cached)
+            self._bytes += size - self._sizes.get(message_id, 0)
+            self._sizes[message_id] = size
+        return cached if not isinstance(cached, dict) else None
+
+    def clear(self) -> None:
+        """drops every cached message"""
+        self._messages.clear()
+        self._sizes.clear()
+        self._channels.clear()
+        self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        memory use and efficiency of the cache
+
+        Returns
+        -------
+        dict
+            ``messages`` and ``bytes`` (approximate memory use, ``None`` unless ``max_bytes`` is set) currently
+            cached, the ``max_messages`` and ``max_bytes`` limits, the number of ``channels`` with a history, and the
+            ``hits``, ``misses`` and ``evictions`` counters.
+        """
+        return {
+            'messages': len(self._messages),
+            'bytes': self._bytes if self.max_bytes is not None else None,
+            'max_messages': self.max_messages,
+            'max_bytes': self.max_bytes,
+            'channels': len(self._channels),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
+
+
+class Cache:
+    """
+    Cache of discord entities, filled by gateway events.
+
+    Every entity type can be turned off, so bots that do not need it do not pay for the memory. Turning off
+    ``users`` stops users from being shared, but members and messages still get their own :class:`User`.
+
+    Parameters
+    ----------
+    guilds : Optional[:class:`bool`]
+        whether or not to cache guilds. Defaults to ``True``
+
+    channels : Optional[:class:`bool`]
+        whether or not to cache channels. Defaults to ``True``
+
+    roles : Optional[:class:`bool`]
+        whether or not to cache roles. Defaults to ``True``
+
+    members : Optional[:class:`bool`]
+        whether or not to cache guild members. Defaults to ``True``
+
+    users : Optional[:class:`bool`]
+        whether or not to cache (and share) users. Defaults to ``True``
+
+    messages : Optional[:class:`bool`]
+        whether or not to cache recent messages. Defaults to ``True``
+
+    max_messages : Optional[:class:`int`]
+        see :class:`MessageCache`. Defaults to ``1000``
+
+    max_message_bytes : Optional[:class:`int`]
+        see :class:`MessageCache`. Defaults to ``None``
+
+    messages_per_channel : Optional[:class:`int`]
+        see :class:`MessageCache`. Defaults to ``None``
+
+    Attributes
+    ----------
+    user : Optional[:class:`discordSplash.user.User`]
+        the bot's own user. ``None`` until READY.
+
+    guilds : Dict[:class:`int`, :class:`discordSplash.guild.Guild`]
+        cached guilds by id
+
+    channels : Dict[:class:`int`, :class:`discordSplash.channel.Channel`]
+        cached channels by id
+
+    roles : Dict[:class:`int`, :class:`discordSplash.guild.Role`]
+        cached roles by id
+
+    members : Dict[:class:`int`, Dict[:class:`int`, :class:`discordSplash.guild.Member`]]
+        cached members by guild id, then user id
+
+    users : Dict[:class:`int`, :class:`discordSplash.user.User`]
+        cached users by id
+
+    messages : Optional[:class:`MessageCache`]
+        cached messages. ``None`` if messages are not cached.
+    """
+
+    def __init__(self, guilds: bool = True, channels: bool = True, roles: bool = True, members: bool = True,
+                 users: bool = True, messages: bool = True, max_messages: Optional[int] = 1000,
+                 max_message_bytes: Optional[int] = None, messages_per_channel: Optional[int] = None):
+        self.cache_guilds = guilds
+        self.cache_channels = channels
+        self.cache_roles = roles
+        self.cache_members = members
+        self.cache_users = users
+
+        self.user: Optional[User] = None
+        self.guilds: Dict[int, Guild] = dict()
+        self.channels: Dict[int, Channel] = dict()
+        self.roles: Dict[int, Role] = dict()
+        self.members: Dict[int, Dict[int, Member]] = dict()
+        self.users: Dict[int, User] = dict()
+        self.messages: Optional[MessageCache] = MessageCache(max_messages, max_message_bytes, messages_per_channel) \
+            if messages else None
+
+        # which channels and roles belong to which guild, so GUILD_DELETE can drop them
+        self._guild_channels: Dict[int, Set[int]] = dict()
+        self._guild_roles: Dict[int, Set[int]] = dict()
+
+        self._parsers: Dict[str, Callable[..., Any]] = {
+            'READY': self._ready,
+            'USER_UPDATE': self._user_update,
+            'GUILD_CREATE': self._guild_create,
+            'GUILD_UPDATE': self._guild_update,
+            'GUILD_DELETE': self._guild_delete,
+            'CHANNEL_CREATE': self._channel_update,
+            'CHANNEL_UPDATE': self._channel_update,
+            'CHANNEL_DELETE': self._channel_delete,
+            'GUILD_ROLE_CREATE': self._role_update,
+            'GUILD_ROLE_UPDATE': self._role_update,
+            'GUILD_ROLE_DELETE': self._role_delete,
+            'GUILD_MEMBER_ADD': self._member_add,
+            'GUILD_MEMBER_UPDATE': self._member_update,
+            'GUILD_MEMBER_REMOVE': self._member_remove,
+            'GUILD_MEMBERS_CHUNK': self._members_chunk,
+            'MESSAGE_CREATE': self._message_create,
+            'MESSAGE_UPDATE': self._message_update,
+            'MESSAGE_DELETE': self._message_delete,
+            'MESSAGE_DELETE_BULK': self._message_delete_bulk,
+        }
+        # events that can not change what is cached are not parsed (and the gateway can skip decoding them)
+        unused = set()
+        if not channels:
+            unused.update(('CHANNEL_CREATE', 'CHANNEL_UPDATE', 'CHANNEL_DELETE'))
+        if not roles:
+            unused.update(('GUILD_ROLE_CREATE', 'GUILD_ROLE_UPDATE', 'GUILD_ROLE_DELETE'))
+        if not (members or users):
+            unused.update(('GUILD_MEMBER_ADD', 'GUILD_MEMBER_UPDATE', 'GUILD_MEMBER_REMOVE', 'GUILD_MEMBERS_CHUNK'))
+        if not (guilds or roles):
+            unused.add('GUILD_UPDATE')
+        if not (guilds or channels or roles or members or users):
+            unused.update(('GUILD_CREATE', 'GUILD_DELETE'))
+        if not messages:
+            unused.update(MESSAGE_EVENTS)
+        for event_type in unused:
+            del self._parsers[event_type]
+
+    @property
+    def event_types(self) -> FrozenSet[str]:
+        """the events that update the cache"""
+        return frozenset(self._parsers)
+
+    def get_guild(self, guild_id: int) -> Optional[Guild]:
+        """gets a cached guild. ``None`` if it is not cached."""
+        return self.guilds.get(int(guild_id))
+
+    def get_channel(self, channel_id: int) -> Optional[Channel]:
+        """gets a cached channel. ``None`` if it is not cached."""
+        return self.channels.get(int(channel_id))
+
+    def get_role(self, role_id: int) -> Optional[Role]:
+        """gets a cached role. ``None`` if it is not cached."""
+        return self.roles.get(int(role_id))
+
+    def get_member(self, guild_id: int, user_id: int) -> Optional[Member]:
+        """gets a cached member of a guild. ``None`` if it is not cached."""
+        members = self.members.get(int(guild_id))
+        return members.get(int(user_id)) if members is not None else None
+
+    def get_user(self, user_id: int) -> Optional[User]:
+        """gets a cached user. ``None`` if it is not cached."""
+        return self.users.get(int(user_id))
+
+    def store_user(self, data: dict) -> User:
+        """
+        Gets the :class:`User` for a user payload, so the same user is only stored once.
+
+        If the user is already cached, the cached object is updated with the fields in ``data`` and returned. Fields
+        missing from ``data`` keep their value.
+
+        Parameters
+        ----------
+        data : :class:`dict`
+            user payload, such as the ``author`` of a message
+
+        Returns
+        -------
+        :class:`discordSplash.user.User`
+        """
+        if not self.cache_users:
+            return User(data)
+        user = self.users.get(int(data['id']))
+        if user is None:
+            user = User(data)
+            self.users[user.id] = user
+        else:
+            user._apply_update(data)
+        return user
+
+    def clear(self) -> None:
+        """drops everything in the cache"""
+        self.user = None
+        self.guilds.clear()
+        self.channels.clear()
+        self.roles.clear()
+        self.members.clear()
+        self.users.clear()
+        if self.messages is not None:
+            self.messages.clear()
+        self._guild_channels.clear()
+        self._guild_roles.clear()
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """number of cached entities of every type"""
+        return {
+            'guilds': len(self.guilds),
+            'channels': len(self.channels),
+            'roles': len(self.roles),
+            'members': sum(len(members) for members in self.members.values()),
+            'users': len(self.users),
+            'messages': len(self.messages) if self.messages is not None else 0
+        }
+
+    def parse(self, event_type: str, data: dict, build: bool = True) -> Any:
+        """
+        Updates the cache from a gateway event. Events that do not change the cache are ignored.
+
+        Parameters
+        ----------
+        event_type : :class:`str`
+            the type of the event, such as ``GUILD_CREATE``
+
+        data : :class:`dict`
+            the event's data
+
+        build : Optional[:class:`bool`]
+            whether the event's messages are needed. If ``False``, new messages are cached as their payload and
+            only built when they are read from the cache. Defaults to ``True``
+
+        Returns
+        -------
+        Any
+            the cached object the event is about, which is handed to the event's handler. The new
+            :class:`discordSplash.message.Message` for MESSAGE_CREATE, the updated or removed one for MESSAGE_UPDATE
+            and MESSAGE_DELETE, and a list of the removed ones for MESSAGE_DELETE_BULK. ``None`` otherwise, and for
+            the message events if ``build`` is ``False``.
+        """
+        parser = self._parsers.get(event_type)
+        if parser is None:
+            return None
+        if event_type in MESSAGE_EVENTS:
+            return parser(data, build)
+        return parser(data)
+
+    # users
+
+    def _ready(self, data: dict) -> None:
+        self.user = self.store_user(data['user'])
+
+    def _user_update(self, data: dict) -> None:
+        if self.user is not None and not self.cache_users:
+            self.user._update(data)
+        else:
+            self.user = self.store_user(data)
+
+    # guilds
+
+    def _guild_create(self, data: dict) -> None:
+        guild_id = int(data['id'])
+        self._store_guild(data)
+
+        for channel in data.get('channels', ()):
+            self._store_channel(channel, guild_id)
+        for thread in data.get('threads', ()):
+            self._store_channel(thread, guild_id)
+        for role in data.get('roles', ()):
+            self._store_role(role, guild_id)
+        for member in data.get('members', ()):
+            self._store_member(member, guild_id)
+
+    def _guild_update(self, data: dict) -> None:
+        # GUILD_UPDATE sends every role again
+        guild_id = int(data['id'])
+        for role in data.get('roles', ()):
+            self._store_role(role, guild_id)
+        self._store_guild(data)
+
+    def _store_guild(self, data: dict) -> None:
+        if not self.cache_guilds:
+            return
+        guild = self.guilds.get(int(data['id']))
+        if guild is None:
+            self.guilds[int(data['id'])] = Guild(data)
+        else:
+            guild._update(data)
+
+    def _guild_delete(self, data: dict) -> None:
+        guild_id = int(data['id'])
+        if data.get('unavailable'):
+            # an outage, the guild comes back with GUILD_CREATE
+            guild = self.guilds.get(guild_id)
+            if guild is not None:
+                guild.unavailable = True
+            return
+
+        self.guilds.pop(guild_id, None)
+        for channel_id in self._guild_channels.pop(guild_id, ()):
+            self.channels.pop(channel_id, None)
+        for role_id in self._guild_roles.pop(guild_id, ()):
+            self.roles.pop(role_id, None)
+        self.members.pop(guild_id, None)
+
+    # channels
+
+    def _store_channel(self, data: dict, guild_id: Optional[int]) -> None:
+        if not self.cache_channels:
+            return
+        channel = self.channels.get(int(data['id']))
+        if channel is None:
+            channel = Channel(data)
+            self.channels[channel.id] = channel
+        else:
+            channel._update(data)
+
+        # channels in GUILD_CREATE do not have a guild_id
+        if channel.guild_id is None:
+            channel.guild_id = guild_id
+        if channel.guild_id is not None:
+            self._guild_channels.setdefault(channel.guild_id, set()).add(channel.id)
+
+    def _channel_update(self, data: dict) -> None:
+        self._store_channel(data, None)
+
+    def _channel_delete(self, data: dict) -> None:
+        channel = self.channels.pop(int(data['id']), None)
+        if channel is not None and channel.guild_id is not None:
+            self._guild_channels.get(channel.guild_id, set()).discard(channel.id)
+
+    # roles
+
+    def _store_role(self, data: dict, guild_id: int) -> None:
+        if not self.cache_roles:
+            return
+        role = self.roles.get(int(data['id']))
+        if role is None:
+            role = Role(data)
+            self.roles[role.id] = role
+        else:
+            role._update(data)
+        self._guild_roles.setdefault(guild_id, set()).add(role.id)
+
+    def _role_update(self, data: dict) -> None:
+        self._store_role(data['role'], int(data['guild_id']))
+
+    def _role_delete(self, data: dict) -> None:
+        role_id = int(data['role_id'])
+        self.roles.pop(role_id, None)
+        self._guild_roles.get(int(data['guild_id']), set()).discard(role_id)
+
+    # members
+
+    def _store_member(self, data: dict, guild_id: int) -> None:
+        user = self.store_user(data['user'])
+        if not self.cache_members:
+            return
+        members = self.members.setdefault(guild_id, dict())
+        member = members.get(user.id)
+        if member is None:
+            members[user.id] = Member(data, guild_id=guild_id, member_user=user)
+        else:
+            member._update(data)
+
+    def _member_add(self, data: dict) -> None:
+        self._store_member(data, int(data['guild_id']))
+        guild = self.guilds.get(int(data['guild_id']))
+        if guild is not None and guild.member_count is not None:
+            guild.member_count += 1
+
+    def _member_update(self, data: dict) -> None:
+        self._store_member(data, int(data['guild_id']))
+
+    def _member_remove(self, data: dict) -> None:
+        guild_id = int(data['guild_id'])
+        members = self.members.get(guild_id)
+        if members is not None:
+            members.pop(int(data['user']['id']), None)
+        guild = self.guilds.get(guild_id)
+        if guild is not None and guild.member_count:
+            guild.member_count -= 1
+
+    def _members_chunk(self, data: dict) -> None:
+        guild_id = int(data['guild_id'])
+        for member in data.get('members', ()):
+            self._store_member(member, guild_id)
+
+    # messages
+
+    def _message_create(self, data: dict, build: bool = True) -> Optional["message.Message"]:
+        if self.messages is None:
+            return None
+        if not build:
+            self.messages.add(data)
+            return None
+        created = message.Message(data)
+        self.messages.add(created)
+        return created
+
+    def _message_update(self, data: dict, build: bool = True) -> Optional["message.Message"]:
+        return self.messages.update(data, build) if self.messages is not None else None
+
+    def _message_delete(self, data: dict, build: bool = True) -> Optional["message.Message"]:
+        return self.messages.remove(data['id'], build) if self.messages is not None else None
+
+    def _message_delete_bulk(self, data: dict, build: bool = True) -> Optional[List["message.Message"]]:
+        if self.messages is None:
+            return []
+        removed = [self.messages.remove(message_id, build) for message_id in data['ids']]
+        return [cached for cached in removed if cached is not None] if build else None
+
+
+#: the cache used by the bot. Set by :class:`discordSplash.GatewayBot`
+entity_cache: Optional[Cache] = None
+
+
+def get_cache() -> Cache:
+    """
+    Gets the :class:`Cache` the bot uses, creating one if the bot has not set it.
+
+    Returns
+    -------
+    :class:`Cache`
+    """
+    global entity_cache
+    if entity_cache is None:
+        entity_cache = Cache()
+    return entity_cache
+
+
+def set_cache(cache: Cache) -> None:
+    """sets the :class:`Cache` returned by :func:`get_cache`"""
+    global entity_cache
+    entity_cache = cache
@@ -1,7 +1,7 @@
 from dataclasses import dataclass
-from datetime import datetime
 
 from .abstractbaseclass import Object
+from .util import UNPARSED, lazy_field, optional_datetime, optional_int
 
 
 @dataclass(init=False, eq=False)
@@ -88,38 +88,61 @@ class Channel(Object):
     
     permissions : string
         Computed permissions for the invoking user in the channel
+
+    raw : dict
+        The channel payload. ``None`` unless :attr:`keep_raw` is ``True``
     """
+    __slots__ = ('type', 'guild_id', 'position', 'permission_overwrites', 'name', 'topic', 'nsfw', 'last_message_id',
+                 'bitrate', 'user_limit', 'rate_limit_per_user', 'recipients', 'icon', 'owner_id', 'application_id',
+                 'parent_id', '_raw_last_pin_timestamp', '_last_pin_timestamp', 'rtc_region', 'video_quality_mode',
+                 'message_count', 'member_count', 'thread_metadata', 'member', 'default_auto_archive_duration',
+                 'permissions', 'raw')
+
+    #: whether or not new channels keep their payload in ``raw``. Off by default to save memory.
+    keep_raw = False
+
+    # parsed the first time it is read
+    last_pin_timestamp = lazy_field('last_pin_timestamp', optional_datetime)
 
     def __init__(self, jsonData: dict):
-        self.channelData = jsonData
-        super.__init__(jsonData.get("id"))
+        super().__init__(jsonData.get("id"))
+        self._update(jsonData)
+
+    @property
+    def channelData(self):
+        """alias of ``raw``"""
+        return self.raw
+
+    def _update(self, jsonData: dict):
+        """replaces the channel's data, keeping the same object"""
+        self.raw = jsonData if self.keep_raw else None
         # Channel data variables
-        self.id = int(self.channelData.get("id"))
-        self.type = self.channelData.get("type")
-        self.guild_id = int(self.channelData.get("guild_id"))
-        self.position = self.channelData.get("position")
-        self.permission_overwrites = self.channelData.get(
+        self.type = jsonData.get("type")
+        self.guild_id = optional_int(jsonData.get("guild_id"))
+        self.position = jsonData.get("position")
+        self.permission_overwrites = jsonData.get(
             "permission_overwrites")  # TODO: Add an Overwrite object - https://discord.com/developers/docs/resources/channel#overwrite-object
-        self.name = self.channelData.get("name")
-        self.topic = self.channelData.get("topic")
-        self.nsfw = self.channelData.get("nsfw")
-        self.last_message_id = int(self.channelData.get("last_message_id"))
-        self.bitrate = self.channelData.get("bitrate")
-        self.user_limit = self.channelData.get("user_limit")
-        self.rate_limit_per_user = self.channelData.get("rate_limit_per_user")
-        self.recipients = self.channelData.get("recipients")
-        self.icon = self.channelData.get("icon")
-        self.owner_id = int(self.channelData.get("owner_id"))
-        self.application_id = int(self.channelData.get("application_id"))
-        self.parent_id = int(self.channelData.get("parent_id"))
-        self.last_pin_timestamp = datetime.fromisoformat(self.channelData.get("last_pin_timestamp"))
-        self.rtc_region = self.channelData.get("rtc_region")
-        self.video_quality_mode = self.channelData.get("video_quality_mode")
-        self.message_count = self.channelData.get("message_count")
-        self.member_count = self.channelData.get("member_count")
-        self.thread_metadate = self.channelData.get(
+        self.name = jsonData.get("name")
+        self.topic = jsonData.get("topic")
+        self.nsfw = jsonData.get("nsfw")
+        self.last_message_id = optional_int(jsonData.get("last_message_id"))
+        self.bitrate = jsonData.get("bitrate")
+        self.user_limit = jsonData.get("user_limit")
+        self.rate_limit_per_user = jsonData.get("rate_limit_per_user")
+        self.recipients = jsonData.get("recipients")
+        self.icon = jsonData.get("icon")
+        self.owner_id = optional_int(jsonData.get("owner_id"))
+        self.application_id = optional_int(jsonData.get("application_id"))
+        self.parent_id = optional_int(jsonData.get("parent_id"))
+        self._raw_last_pin_timestamp = jsonData.get("last_pin_timestamp")
+        self._last_pin_timestamp = UNPARSED
+        self.rtc_region = jsonData.get("rtc_region")
+        self.video_quality_mode = jsonData.get("video_quality_mode")
+        self.message_count = jsonData.get("message_count")
+        self.member_count = jsonData.get("member_count")
+        self.thread_metadata = jsonData.get(
             "thread_metadata")  # TODO: Add a Thread Metadata object - https://discord.com/developers/docs/resources/channel#thread-metadata-object
-        self.member = self.channelData.get(
+        self.member = jsonData.get(
             "member")  # TODO: Add a Thread Member object - https://discord.com/developers/docs/resources/channel#thread-member-object
-        self.default_auto_archive_duration = self.channelData.get("default_auto_archive_duration")
-        self.permissions = self.channelData.get("permissions")
+        self.default_auto_archive_duration = jsonData.get("default_auto_archive_duration")
+        self.permissions = jsonData.get("permissions")
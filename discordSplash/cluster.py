@@ -0,0 +1,404 @@
+# Copyright (C) 2021-Present Mineinjava
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Cluster mode: shards spread across several worker processes.
+
+A supervisor process splits the shards into ranges and runs each range in a worker process with a
+:class:`discordSplash.sharding.ShardManager`. Workers ask the supervisor before every IDENTIFY over a
+:func:`multiprocessing.Pipe`, so identify concurrency is respected across all processes. Crashed workers are
+restarted and every worker reports its shards' stats back to the supervisor.
+
+.. Important::
+    Listeners must be registered at import time of the main module (with ``eventListener``), and the cluster must
+    be started from an ``if __name__ == '__main__':`` block, so worker processes that are spawned (rather than
+    forked) register the same listeners.
+"""
+import asyncio
+import collections
+import logging
+import multiprocessing
+import multiprocessing.connection
+import os
+import threading
+import time
+import typing
+from typing import Dict, List, Optional
+
+from . import util
+from .exception import GatewayError
+from .presence import UpdatePresence, EmptyUpdatePresence
+from .request import HTTPClient
+from .sharding import ShardManager
+
+_log = logging.getLogger(__name__)
+
+# exit code of a worker whose gateway closed in a way reconnecting can not fix, such as an invalid token
+_FATAL_EXIT_CODE = 3
+
+
+class PipeIdentifyLimiter:
+    """
+    Identify limiter used by worker processes. Asks the supervisor before every IDENTIFY.
+
+    Parameters
+    ----------
+    conn : :class:`multiprocessing.connection.Connection`
+        the worker's end of the pipe to the supervisor
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._waiters: Dict[int, asyncio.Future] = dict()
+        self._reader: Optional[threading.Thread] = None
+
+    def _read(self) -> None:
+        # runs in a daemon thread, so a blocked recv never keeps the worker alive
+        while True:
+            try:
+                message = self.conn.recv()
+            except (EOFError, OSError):
+                return
+            if message[0] == 'identify':
+                self._loop.call_soon_threadsafe(self._grant, message[1])
+
+    def _grant(self, shard_id: int) -> None:
+        waiter = self._waiters.pop(shard_id, None)
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    async def acquire(self, shard_id: int) -> None:
+        """waits until the supervisor allows the shard to IDENTIFY"""
+        if self._reader is None:
+            self._loop = asyncio.get_running_loop()
+            self._reader = threading.Thread(target=self._read, name='discordSplash-identify', daemon=True)
+            self._reader.start()
+
+        waiter = self._waiters[shard_id] = self._loop.create_future()
+        self.conn.send(('identify', shard_id))
+        await waiter
+
+
+async def _report_stats(conn, manager: ShardManager, interval: float) -> None:
+    while True:
+        conn.send(('stats', {
+            'pid': os.getpid(),
+            'shards': {shard_id: {'status': shard.status, 'latency': shard.heartbeat_latency.to_dict()}
+                       for shard_id, shard in manager.shards.items()},
+            'pending_events': manager.dispatcher.pending
+        }))
+        await asyncio.sleep(interval)
+
+
+async def _worker(conn, manager: ShardManager, gateway: dict, stats_interval: float, update_commands: bool) -> None:
+    manager.identify_limiter = PipeIdentifyLimiter(conn)
+    manager.create_shards(gateway)
+    reporter = asyncio.ensure_future(_report_stats(conn, manager, stats_interval))
+    try:
+        # like ShardManager, only shard 0 syncs the commands
+        await asyncio.gather(*(shard._run(update_commands and shard_id == 0)
+                               for shard_id, shard in manager.shards.items()))
+    finally:
+        reporter.cancel()
+        await manager.close()
+
+
+def _worker_main(conn, token: str, presence, shard_ids: List[int], shard_count: int, gateway: dict,
+                 stats_interval: float, update_commands: bool, kwargs: dict) -> None:
+    """entry point of a worker process"""
+    manager = ShardManager(token, presence, shard_count=shard_count, shard_ids=shard_ids, **kwargs)
+    try:
+        asyncio.run(_worker(conn, manager, gateway, stats_interval, update_commands))
+    except KeyboardInterrupt:
+        pass
+    except GatewayError as e:
+        conn.send(('fatal', str(e)))
+        raise SystemExit(_FATAL_EXIT_CODE)
+
+
+class _Worker:
+    """a worker process and its end of the pipe, as seen by the supervisor"""
+
+    def __init__(self, index: int, shard_ids: List[int]):
+        self.index = index
+        self.shard_ids = shard_ids
+        self.process: Optional[multiprocessing.process.BaseProcess] = None
+        self.conn = None
+        self.crashes = 0
+        self.restart_at: Optional[float] = None
+        self.stats: dict = dict()
+        self.error: Optional[str] = None
+
+
+class ClusterManager:
+    """
+    Supervisor that runs a bot's shards across several worker processes.
+
+    Parameters
+    ----------
+    token : :class:`str`
+        The bot's token
+
+    presence : Optional[:class:`discordSplash.UpdatePresence`]
+        The bot's presence when it connects
+
+    processes : Optional[:class:`int`]
+        number of worker processes. Defaults to the number of CPU cores.
+
+    shard_count : Optional[:class:`int`]
+        total number of shards. Defaults to the number discord recommends.
+
+    stats_interval : Optional[:class:`float`]
+        seconds between stats reports from the workers. Defaults to ``10``
+
+    **kwargs
+        passed on to the :class:`discordSplash.sharding.ShardManager` in every worker
+
+    Attributes
+    ----------
+    shard_count : Optional[:class:`int`]
+        total number of shards. ``None`` until the cluster is started.
+
+    restarts : :class:`int`
+        number of times a crashed worker has been restarted.
+
+    Raises
+    ------
+    :class:`discordSplash.exception.GatewayError`
+        from :meth:`run`, when a worker's gateway closed in a way reconnecting can not fix, such as an invalid
+        token. The other workers are stopped, as they would fail the same way.
+    """
+
+    #: seconds between identifies in the same bucket
+    identify_delay = 5.0
+
+    def __init__(self, token: str, presence: UpdatePresence = EmptyUpdatePresence, processes: Optional[int] = None,
+                 shard_count: Optional[int] = None, stats_interval: float = 10.0, **kwargs):
+        self.TOKEN = token
+        self.presence = presence
+        self.processes = processes or os.cpu_count() or 1
+        self.shard_count = shard_count
+        self.stats_interval = stats_interval
+        self.restarts = 0
+
+        self._kwargs = kwargs
+        self._update_commands = False
+        self._gateway: dict = dict()
+        self._workers: List[_Worker] = list()
+        self._max_concurrency = 1
+        self._identify_queue: Dict[int, typing.Deque] = collections.defaultdict(collections.deque)
+        self._next_identify: Dict[int, float] = dict()
+        self._stopping = False
+        self._fatal: Optional[_Worker] = None
+        self._context = multiprocessing.get_context()
+
+    @property
+    def stats(self) -> dict:
+        """
+        stats of the whole cluster, aggregated from the latest report of every worker
+
+        Returns
+        -------
+        dict
+            ``shards`` (status and latency of every shard), ``workers`` (pid, shard ids, whether the process is
+            alive and the fatal ``error`` it exited with, if any), ``ready`` (number of ready shards),
+            ``pending_events`` and ``restarts``.
+        """
+        shards = dict()
+        pending = 0
+        workers = dict()
+        for worker in self._workers:
+            shards.update(worker.stats.get('shards', {}))
+            pending += worker.stats.get('pending_events', 0)
+            workers[worker.index] = {
+                'pid': worker.process.pid if worker.process is not None else None,
+                'shard_ids': worker.shard_ids,
+                'alive': worker.process is not None and worker.process.is_alive(),
+                'error': worker.error
+            }
+        return {
+            'shards': shards,
+            'workers': workers,
+            'ready': sum(1 for shard in shards.values() if shard['status'] == 'ready'),
+            'pending_events': pending,
+            'restarts': self.restarts
+        }
+
+    async def fetch_gateway(self) -> dict:
+        """gets ``/gateway/bot`` once for the whole cluster"""
+        http = HTTPClient(self.TOKEN)
+        try:
+            return await http.request("GET", "/gateway/bot")
+        finally:
+            await http.close()
+
+    def _spawn(self, worker: _Worker) -> None:
+        parent_conn, child_conn = self._context.Pipe()
+        worker.conn = parent_conn
+        worker.process = self._context.Process(
+            target=_worker_main,
+            args=(child_conn, self.TOKEN, self.presence, worker.shard_ids, self.shard_count, self._gateway,
+                  self.stats_interval, self._update_commands and 0 in worker.shard_ids, self._kwargs),
+            name=f"discordSplash-worker-{worker.index}",
+            daemon=True
+        )
+        worker.process.start()
+        child_conn.close()
+        worker.restart_at = None
+
+    def _handle_message(self, worker: _Worker, message) -> None:
+        kind, payload = message
+        if kind == 'identify':
+            self._identify_queue[payload % self._max_concurrency].append((worker, payload))
+        elif kind == 'stats':
+            worker.stats = payload
+        elif kind == 'fatal':
+            worker.error = payload
+
+    def _grant_identifies(self) -> Optional[float]:
+        """lets the next shard of every free bucket identify. returns seconds until the next bucket is free."""
+        now = time.monotonic()
+        next_wait = None
+        for bucket, queue in self._identify_queue.items():
+            if not queue:
+                continue
+            wait = self._next_identify.get(bucket, 0.0) - now
+            if wait <= 0:
+                worker, shard_id = queue.popleft()
+                try:
+                    worker.conn.send(('identify', shard_id))
+                except (BrokenPipeError, OSError):
+                    pass
+                self._next_identify[bucket] = now + self.identify_delay
+                wait = self.identify_delay if queue else None
+            if wait is not None:
+                next_wait = wait if next_wait is None else min(next_wait, wait)
+        return next_wait
+
+    def _handle_exit(self, worker: _Worker) -> None:
+        worker.process.join()
+        try:
+            # the fatal error is sent right before the worker exits
+            while worker.conn.poll():
+                self._handle_message(worker, worker.conn.recv())
+        except (EOFError, OSError):
+            pass
+        worker.conn.close()
+        worker.conn = None
+        worker.stats = dict()
+        # the restarted process asks again for its own shards
+        for bucket, queue in self._identify_queue.items():
+            self._identify_queue[bucket] = collections.deque(entry for entry in queue if entry[0] is not worker)
+        if self._stopping:
+            return
+        if worker.process.exitcode == _FATAL_EXIT_CODE:
+            _log.error("Worker %s (shards %s) stopped: %s", worker.index, worker.shard_ids, worker.error)
+            self._fatal = worker
+            return
+        _log.warning("Worker %s (shards %s) exited with code %s, restarting", worker.index, worker.shard_ids,
+                     worker.process.exitcode)
+        # back off if a worker keeps crashing
+        worker.restart_at = time.monotonic() + util.jittered_backoff(worker.crashes, base=1.0, cap=60.0)
+        worker.crashes += 1
+
+    def _poll(self) -> None:
+        now = time.monotonic()
+        for worker in self._workers:
+            if worker.restart_at is not None and worker.restart_at <= now:
+                self.restarts += 1
+                self._spawn(worker)
+
+        timeouts = [self._grant_identifies()]
+        timeouts += [worker.restart_at - now for worker in self._workers if worker.restart_at is not None]
+        timeouts = [max(0.0, t) for t in timeouts if t is not None]
+        timeout = min(timeouts) if timeouts else None
+
+        waitables = {}
+        for worker in self._workers:
+            if worker.conn is not None:
+                waitables[worker.conn] = worker
+                waitables[worker.process.sentinel] = worker
+
+        for ready in multiprocessing.connection.wait(list(waitables), timeout):
+            worker = waitables[ready]
+            if ready is worker.conn:
+                try:
+                    while worker.conn.poll():
+                        self._handle_message(worker, worker.conn.recv())
+                except (EOFError, OSError):
+                    pass
+            elif worker.conn is not None:
+                self._handle_exit(worker)
+
+    def start(self, update_commands: bool = True) -> None:
+        """
+        Fetches the gateway information and starts the worker processes.
+
+        Parameters
+        ----------
+        update_commands : Optional[:class:`bool`]
+            whether or not to update the bot's slash commands. Done by the worker that runs shard 0.
+            Defaults to ``True``
+        """
+        self._update_commands = update_commands
+        self._gateway = asyncio.run(self.fetch_gateway())
+        if self.shard_count is None:
+            self.shard_count = self._gateway['shards']
+        self._max_concurrency = self._gateway.get('session_start_limit', {}).get('max_concurrency', 1)
+
+        processes = min(self.processes, self.shard_count)
+        per_process, extra = divmod(self.shard_count, processes)
+        ranges = []
+        start = 0
+        for index in range(processes):
+            end = start + per_process + (index < extra)
+            ranges.append(list(range(start, end)))
+            start = end
+        self._workers = [_Worker(index, shard_ids) for index, shard_ids in enumerate(ranges)]
+        for worker in self._workers:
+            self._spawn(worker)
+
+    def stop(self) -> None:
+        """stops every worker process"""
+        self._stopping = True
+        for worker in self._workers:
+            if worker.process is not None and worker.process.is_alive():
+                worker.process.terminate()
+        for worker in self._workers:
+            if worker.process is not None:
+                worker.process.join()
+            if worker.conn is not None:
+                worker.conn.close()
+                worker.conn = None
+
+    def run(self, update_commands: bool = True) -> None:
+        """
+        Runs the cluster until it is interrupted. Blocks the calling process, which becomes the supervisor.
+
+        Parameters
+        ----------
+        update_commands : Optional[:class:`bool`]
+            whether or not to update the bot's slash commands. Defaults to ``True``
+        """
+        self.start(update_commands)
+        try:
+            while self._fatal is None:
+                self._poll()
+            raise GatewayError(f"worker {self._fatal.index} (shards {self._fatal.shard_ids}) stopped: "
+                               f"{self._fatal.error}")
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
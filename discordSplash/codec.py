@@ -0,0 +1,71 @@
+# Copyright (C) 2021-Present Mineinjava
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+JSON codec used by the gateway and HTTP requests.
+
+Uses `orjson <https://github.com/ijl/orjson>`_ if it is installed, then `ujson <https://github.com/ultrajson/ultrajson>`_,
+and falls back to the standard library's :mod:`json`. Install the fast codec with ``pip install discordSplash[speed]``.
+
+Attributes
+----------
+name : :class:`str`
+    name of the library being used (``'orjson'``, ``'ujson'`` or ``'json'``)
+"""
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+if orjson is not None:
+    name = 'orjson'
+
+    def loads(data: Union[str, bytes]) -> Any:
+        """decodes a JSON document"""
+        return orjson.loads(data)
+
+    def dumps(obj: Any) -> str:
+        """encodes an object as a JSON :class:`str`"""
+        return orjson.dumps(obj).decode('utf-8')
+
+elif ujson is not None:
+    name = 'ujson'
+
+    def loads(data: Union[str, bytes]) -> Any:
+        """decodes a JSON document"""
+        return ujson.loads(data)
+
+    def dumps(obj: Any) -> str:
+        """encodes an object as a JSON :class:`str`"""
+        return ujson.dumps(obj, ensure_ascii=False)
+
+else:
+    name = 'json'
+
+    def loads(data: Union[str, bytes]) -> Any:
+        """decodes a JSON document"""
+        return json.loads(data)
+
+    def dumps(obj: Any) -> str:
+        """encodes an object as a JSON :class:`str`"""
+        return json.dumps(obj, separators=(',', ':'), ensure_ascii=False)
@@ -12,7 +12,7 @@
 
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
-from typing import Awaitable, List, Optional
+from typing import Callable, List, Optional
 
 from .enums import ApplicationCommandOptionType
 
@@ -22,7 +22,7 @@ class ApplicationCommandOption:
     Represents a discord Application Command Option
 
     .. Warn::
-        ``choices`` are not yet supported.
+        ``choices`` are sent as they are passed: a list of ``{'name': ..., 'value': ...}`` dicts.
 
     Parameters
     ----------
@@ -78,18 +78,64 @@ class ApplicationCommandOption:
     @property
     def to_dict(self) -> dict:
         """turns the :class:`ApplicationCommandOption` into a JSON dict"""
-        dict = dict(self._kwargs)
-        dict['type'] = self.raw_type
-        dict['name'] = self.name
-        dict['description'] = self.description
+        data = dict(self._kwargs)
+        data['type'] = self.raw_type
+        data['name'] = self.name
+        data['description'] = self.description
+        if self.options is not None:
+            data['options'] = [option.to_dict for option in self.options]
 
-        return dict
+        return data
 
 
 class Command:
     """class that represents a slash command.
 
-    This is what is being sent when the slash commands are being created."""
+    This is what is being sent when the slash commands are being created.
 
-    def __init__(self, coro: Awaitable, name:str, description:str, **kwargs):
+    Parameters
+    ----------
+    coro : Optional[Callable]
+        the coroutine that handles the command. ``None`` for a command (or subcommand group) that only describes
+        its subcommands.
+
+    name : :class:`str`
+        full name of the command, such as ``'poll'`` or ``'admin users ban'`` for a subcommand
+
+    description : :class:`str`
+        description of the command
+
+    options : Optional[List[:class:`ApplicationCommandOption`]]
+        the command's options
+
+    guild_id : Optional[:class:`int`]
+        guild the command is created in. ``None`` (default) for a global command. Only read on top-level commands.
+
+    Other keyword arguments (such as ``default_member_permissions`` or ``type``) are sent as they are.
+
+    Attributes
+    ----------
+    to_dict
+
+    path : List[:class:`str`]
+        the name split into the command, subcommand group and subcommand names
+    """
+
+    def __init__(self, coro: Optional[Callable], name: str, description: str, **kwargs):
         self.callback = coro
+        self.name = name
+        self.path: List[str] = name.split()
+        self.description = description
+        self.options: List[ApplicationCommandOption] = kwargs.pop('options', None) or []
+        self.guild_id: Optional[int] = kwargs.pop('guild_id', None)
+        self._kwargs = kwargs
+
+    @property
+    def to_dict(self) -> dict:
+        """turns the :class:`Command` into a JSON dict. Subcommands are not nested, see
+        :func:`discordSplash.sync.build_payloads`"""
+        data = dict(self._kwargs)
+        data['name'] = self.path[-1]
+        data['description'] = self.description
+        data['options'] = [option.to_dict for option in self.options]
+        return data
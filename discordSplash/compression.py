@@ -0,0 +1,87 @@
+# Copyright (C) 2021-Present Mineinjava
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Gateway transport compression (``compress=zlib-stream``)
+"""
+import zlib
+from typing import Optional
+
+#: every complete zlib-stream message ends with this suffix
+ZLIB_SUFFIX = b'\x00\x00\xff\xff'
+
+
+class ZlibStreamInflator:
+    """
+    Decompresses a gateway connection that uses ``zlib-stream`` transport compression.
+
+    The whole connection shares one zlib context, so one inflator has to be used for every frame of a connection
+    and must be :meth:`reset` when a new connection is made. A message can be split across several frames; they are
+    buffered until a frame ends with :data:`ZLIB_SUFFIX`.
+
+    Attributes
+    ----------
+    bytes_in : :class:`int`
+        total compressed bytes received
+
+    bytes_out : :class:`int`
+        total bytes after decompression
+    """
+
+    def __init__(self):
+        self.bytes_in: int = 0
+        self.bytes_out: int = 0
+        self._inflator = zlib.decompressobj()
+        self._buffer = bytearray()
+
+    @property
+    def ratio(self) -> float:
+        """compression ratio (decompressed bytes / compressed bytes) of everything received"""
+        return self.bytes_out / self.bytes_in if self.bytes_in else 0.0
+
+    def reset(self) -> None:
+        """starts a new zlib context for a new connection. the byte counters are kept."""
+        self._inflator = zlib.decompressobj()
+        self._buffer.clear()
+
+    def feed(self, data: bytes) -> Optional[bytes]:
+        """
+        Feeds a frame from the websocket to the inflator
+
+        Parameters
+        ----------
+        data : :class:`bytes`
+            binary frame received from the gateway
+
+        Returns
+        -------
+        Optional[:class:`bytes`]
+            the decompressed message, or ``None`` if the message is not complete yet.
+        """
+        self.bytes_in += len(data)
+
+        if not data.endswith(ZLIB_SUFFIX):
+            self._buffer += data
+            return None
+
+        if self._buffer:
+            self._buffer += data
+            out = self._inflator.decompress(self._buffer)
+            self._buffer.clear()
+        else:
+            # most messages fit in one frame and do not need to be copied into the buffer
+            out = self._inflator.decompress(data)
+
+        self.bytes_out += len(out)
+        return out
@@ -0,0 +1,163 @@
+# Copyright (C) 2021-Present Mineinjava
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Event dispatching for :class:`discordSplash.GatewayBot`.
+
+Handlers run as tasks so a slow handler does not block the websocket read loop.
+"""
+import asyncio
+import functools
+import logging
+import typing
+from typing import Any, Callable, Hashable, Optional, Union
+
+_log = logging.getLogger(__name__)
+
+
+def _channel_key(event_type: Optional[str], data: Optional[dict]) -> Optional[Hashable]:
+    return data.get('channel_id') if isinstance(data, dict) else None
+
+
+def _event_key(event_type: Optional[str], data: Optional[dict]) -> Optional[Hashable]:
+    return event_type
+
+
+_ORDERINGS = {
+    None: None,
+    'event': _event_key,
+    'channel': _channel_key
+}
+
+
+class Dispatcher:
+    """
+    Runs event handlers as tasks with a cap on how many can run at once.
+
+    When ``max_concurrency`` handlers are already running, :meth:`submit` waits for one of them to finish. This
+    makes the websocket read loop slow down instead of letting pending handlers pile up in memory.
+
+    Parameters
+    ----------
+    max_concurrency : Optional[:class:`int`]
+        maximum number of handlers that can be running (or waiting for their turn) at once. Defaults to ``64``
+
+    ordering : Optional[Union[:class:`str`, Callable[[:class:`str`, :class:`dict`], Hashable]]]
+        which events must be handled in the order they were received.
+
+        - ``None``: no ordering, handlers run as soon as possible (default)
+        - ``'event'``: events of the same type are handled one at a time, in order
+        - ``'channel'``: events in the same channel are handled one at a time, in order
+        - a function that takes the event type and data and returns a key. Events with the same key are handled
+          in order. Events with a key of ``None`` are not ordered.
+
+    Attributes
+    ----------
+    max_concurrency : :class:`int`
+        maximum number of handlers that can be running at once.
+    """
+
+    def __init__(self, max_concurrency: int = 64,
+                 ordering: Optional[Union[str, Callable[[str, dict], Optional[Hashable]]]] = None):
+        if max_concurrency < 1:
+            raise ValueError('max_concurrency must be at least 1')
+
+        self.max_concurrency = max_concurrency
+        self._ordering = _ORDERINGS[ordering] if ordering is None or isinstance(ordering, str) else ordering
+
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._tasks: typing.Set[asyncio.Task] = set()
+        self._locks: typing.Dict[Hashable, asyncio.Lock] = dict()
+        self._lock_users: typing.Dict[Hashable, int] = dict()
+
+    @property
+    def pending(self) -> int:
+        """number of handlers that are running or waiting for their turn"""
+        return len(self._tasks)
+
+    @property
+    def full(self) -> bool:
+        """whether :meth:`submit` would wait, because ``max_concurrency`` handlers are pending"""
+        return len(self._tasks) >= self.max_concurrency
+
+    async def submit(self, event_type: Optional[str], data: Optional[dict], func: Callable, payload: Any) -> None:
+        """
+        Schedules a listener for an event.
+
+        Waits if ``max_concurrency`` handlers are already pending.
+
+        Parameters
+        ----------
+        event_type : Optional[:class:`str`]
+            the type of the event, such as ``MESSAGE_CREATE``. ``None`` for raw frames.
+
+        data : Optional[:class:`dict`]
+            the event's payload, used to order the event. ``None`` for raw frames.
+
+        func : Callable
+            the coroutine listening for the event
+
+        payload : Any
+            what ``func`` is called with: the event's model, its payload dict or the raw frame.
+        """
+        if self._semaphore is None:
+            # created here so it belongs to the running event loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        await self._semaphore.acquire()
+
+        key = self._ordering(event_type, data) if self._ordering is not None else None
+        if key is not None:
+            # claim the lock now so handlers queue on it in the order they were submitted
+            self._lock_users[key] = self._lock_users.get(key, 0) + 1
+            if key not in self._locks:
+                self._locks[key] = asyncio.Lock()
+
+        task = asyncio.ensure_future(self._run(key, event_type, func, payload))
+        self._tasks.add(task)
+        task.add_done_callback(functools.partial(self._finished, key))
+
+    async def _run(self, key: Optional[Hashable], event_type: Optional[str], func: Callable, payload: Any) -> None:
+        try:
+            if key is None:
+                await func(payload)
+            else:
+                async with self._locks[key]:
+                    await func(payload)
+        except Exception:
+            _log.exception("Unhandled exception in %s handler %r", event_type, func)
+
+    def _finished(self, key: Optional[Hashable], task: asyncio.Task) -> None:
+        # done callback, so it also runs for tasks that were cancelled before they started
+        self._tasks.discard(task)
+        if key is not None:
+            self._lock_users[key] -= 1
+            if not self._lock_users[key]:
+                del self._lock_users[key]
+                del self._locks[key]
+        self._semaphore.release()
+
+    async def join(self) -> None:
+        """waits until every pending handler has finished"""
+        while self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def close(self) -> None:
+        """cancels every pending handler. The dispatcher can be used again afterwards, on any event loop."""
+        for task in list(self._tasks):
+            task.cancel()
+        await self.join()
+        # the semaphore and locks belong to this event loop, so they are made again on the next submit
+        self._semaphore = None
+        self._locks.clear()
+        self._lock_users.clear()
@@ -15,7 +15,7 @@
 """
 DiscordSplash Enumterators.
 """
-from enum import Enum
+from enum import Enum, IntFlag
 
 
 class Opcodes:
@@ -33,6 +33,34 @@ class Opcodes:
     HEARTBEAT_ACK   = 11
 
 
+class Intents(IntFlag):
+    """
+    Gateway intents. Combine them with ``|``.
+
+    ``GUILD_MEMBERS``, ``GUILD_PRESENCES`` and ``MESSAGE_CONTENT`` are privileged and must be turned on in the
+    developer portal.
+    """
+    GUILDS                        = 1 << 0
+    GUILD_MEMBERS                 = 1 << 1
+    GUILD_MODERATION              = 1 << 2
+    GUILD_EMOJIS_AND_STICKERS     = 1 << 3
+    GUILD_INTEGRATIONS            = 1 << 4
+    GUILD_WEBHOOKS                = 1 << 5
+    GUILD_INVITES                 = 1 << 6
+    GUILD_VOICE_STATES            = 1 << 7
+    GUILD_PRESENCES               = 1 << 8
+    GUILD_MESSAGES                = 1 << 9
+    GUILD_MESSAGE_REACTIONS       = 1 << 10
+    GUILD_MESSAGE_TYPING          = 1 << 11
+    DIRECT_MESSAGES               = 1 << 12
+    DIRECT_MESSAGE_REACTIONS      = 1 << 13
+    DIRECT_MESSAGE_TYPING         = 1 << 14
+    MESSAGE_CONTENT               = 1 << 15
+    GUILD_SCHEDULED_EVENTS        = 1 << 16
+    AUTO_MODERATION_CONFIGURATION = 1 << 20
+    AUTO_MODERATION_EXECUTION     = 1 << 21
+
+
 class ApplicationCommandOptionType(Enum):
     """
     Enumerator for discord Slash command option types.
@@ -46,6 +74,8 @@ class ApplicationCommandOptionType(Enum):
     CHANNEL           = 7
     ROLE              = 8
     MENTIONABLE       = 9
+    NUMBER            = 10
+    ATTACHMENT        = 11
 
 
 class ActivityType(Enum):
@@ -82,11 +112,14 @@ class InteractionResponseType(Enum):
     DeferredChannelMessageWithSource = 5
     DeferredUpdateMessage            = 6
     UpdateMessage                    = 7
+    AutocompleteResult               = 8
 
 class InteractionType(Enum):
     """Enumerator for discord Interaction types.
     """
-    Ping               = 1
-    ApplicationCommand = 2
-    MessageComponent   = 3
+    Ping                           = 1
+    ApplicationCommand             = 2
+    MessageComponent               = 3
+    ApplicationCommandAutocomplete = 4
+    ModalSubmit                    = 5
 
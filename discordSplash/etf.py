@@ -0,0 +1,329 @@
+# Copyright (C) 2021-Present Mineinjava
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Erlang External Term Format (ETF) encoding and decoding for the gateway (``encoding=etf``).
+
+Only the terms discord uses are supported. Binaries and atoms are decoded to :class:`str`, the atoms ``nil``,
+``true`` and ``false`` to ``None``, ``True`` and ``False``, and big integers (such as snowflakes) straight to
+:class:`int`.
+"""
+import struct
+import zlib
+from typing import Any, Callable, Dict, Tuple
+
+FORMAT_VERSION = 131
+
+NEW_FLOAT_EXT = 70
+COMPRESSED = 80
+SMALL_INTEGER_EXT = 97
+INTEGER_EXT = 98
+FLOAT_EXT = 99
+ATOM_EXT = 100
+SMALL_TUPLE_EXT = 104
+LARGE_TUPLE_EXT = 105
+NIL_EXT = 106
+STRING_EXT = 107
+LIST_EXT = 108
+BINARY_EXT = 109
+SMALL_BIG_EXT = 110
+LARGE_BIG_EXT = 111
+SMALL_ATOM_EXT = 115
+MAP_EXT = 116
+ATOM_UTF8_EXT = 118
+SMALL_ATOM_UTF8_EXT = 119
+
+_ATOMS = {
+    'nil': None,
+    'true': True,
+    'false': False
+}
+
+_unpack_int = struct.Struct('>i').unpack_from
+_unpack_uint = struct.Struct('>I').unpack_from
+_unpack_ushort = struct.Struct('>H').unpack_from
+_unpack_double = struct.Struct('>d').unpack_from
+
+
+class ETFDecodeError(ValueError):
+    """raised when a term can not be decoded"""
+    pass
+
+
+def _atom(text: str):
+    return _ATOMS.get(text, text)
+
+
+def _decode_term(data: bytes, i: int) -> Tuple[Any, int]:
+    tag = data[i]
+    i += 1
+
+    # the most common terms in gateway payloads are handled inline, which saves a function call per term
+    if tag == BINARY_EXT:
+        length = _unpack_uint(data, i)[0]
+        i += 4
+        return data[i:i + length].decode('utf-8'), i + length
+    if tag == MAP_EXT:
+        arity = _unpack_uint(data, i)[0]
+        i += 4
+        result = {}
+        for _ in range(arity):
+            key, i = _decode_term(data, i)
+            result[key], i = _decode_term(data, i)
+        return result, i
+    if tag == SMALL_ATOM_UTF8_EXT:
+        length = data[i]
+        i += 1
+        return _atom(data[i:i + length].decode('utf-8')), i + length
+    if tag == SMALL_INTEGER_EXT:
+        return data[i], i + 1
+    if tag == SMALL_BIG_EXT:
+        length = data[i]
+        sign = data[i + 1]
+        i += 2
+        value = int.from_bytes(data[i:i + length], 'little')
+        return (-value if sign else value), i + length
+
+    decoder = _DECODERS.get(tag)
+    if decoder is None:
+        raise ETFDecodeError(f"unsupported ETF tag {tag} at offset {i - 1}")
+    return decoder(data, i)
+
+
+def _small_integer(data, i):
+    return data[i], i + 1
+
+
+def _integer(data, i):
+    return _unpack_int(data, i)[0], i + 4
+
+
+def _new_float(data, i):
+    return _unpack_double(data, i)[0], i + 8
+
+
+def _float(data, i):
+    return float(data[i:i + 31].split(b'\x00', 1)[0]), i + 31
+
+
+def _atom_ext(data, i):
+    length = _unpack_ushort(data, i)[0]
+    i += 2
+    return _atom(data[i:i + length].decode('latin-1')), i + length
+
+
+def _small_atom(data, i):
+    length = data[i]
+    i += 1
+    return _atom(data[i:i + length].decode('latin-1')), i + length
+
+
+def _atom_utf8(data, i):
+    length = _unpack_ushort(data, i)[0]
+    i += 2
+    return _atom(data[i:i + length].decode('utf-8')), i + length
+
+
+def _small_atom_utf8(data, i):
+    length = data[i]
+    i += 1
+    return _atom(data[i:i + length].decode('utf-8')), i + length
+
+
+def _tuple(data, i, arity):
+    items = []
+    for _ in range(arity):
+        item, i = _decode_term(data, i)
+        items.append(item)
+    return tuple(items), i
+
+
+def _small_tuple(data, i):
+    return _tuple(data, i + 1, data[i])
+
+
+def _large_tuple(data, i):
+    return _tuple(data, i + 4, _unpack_uint(data, i)[0])
+
+
+def _nil(data, i):
+    return [], i
+
+
+def _string(data, i):
+    length = _unpack_ushort(data, i)[0]
+    i += 2
+    return data[i:i + length].decode('utf-8'), i + length
+
+
+def _list(data, i):
+    length = _unpack_uint(data, i)[0]
+    i += 4
+    items = []
+    append = items.append
+    for _ in range(length):
+        item, i = _decode_term(data, i)
+        append(item)
+    # proper lists end with NIL_EXT
+    tail, i = _decode_term(data, i)
+    if tail != []:
+        append(tail)
+    return items, i
+
+
+def _binary(data, i):
+    length = _unpack_uint(data, i)[0]
+    i += 4
+    return data[i:i + length].decode('utf-8'), i + length
+
+
+def _big(data, i, length):
+    sign = data[i]
+    i += 1
+    value = int.from_bytes(data[i:i + length], 'little')
+    return (-value if sign else value), i + length
+
+
+def _small_big(data, i):
+    return _big(data, i + 1, data[i])
+
+
+def _large_big(data, i):
+    return _big(data, i + 4, _unpack_uint(data, i)[0])
+
+
+def _map(data, i):
+    arity = _unpack_uint(data, i)[0]
+    i += 4
+    result = {}
+    for _ in range(arity):
+        key, i = _decode_term(data, i)
+        value, i = _decode_term(data, i)
+        result[key] = value
+    return result, i
+
+
+def _compressed(data, i):
+    size = _unpack_uint(data, i)[0]
+    inflated = zlib.decompress(data[i + 4:])
+    if len(inflated) != size:
+        raise ETFDecodeError('compressed term has the wrong size')
+    return _decode_term(inflated, 0)[0], len(data)
+
+
+_DECODERS: Dict[int, Callable[[bytes, int], Tuple[Any, int]]] = {
+    NEW_FLOAT_EXT: _new_float,
+    COMPRESSED: _compressed,
+    SMALL_INTEGER_EXT: _small_integer,
+    INTEGER_EXT: _integer,
+    FLOAT_EXT: _float,
+    ATOM_EXT: _atom_ext,
+    SMALL_TUPLE_EXT: _small_tuple,
+    LARGE_TUPLE_EXT: _large_tuple,
+    NIL_EXT: _nil,
+    STRING_EXT: _string,
+    LIST_EXT: _list,
+    BINARY_EXT: _binary,
+    SMALL_BIG_EXT: _small_big,
+    LARGE_BIG_EXT: _large_big,
+    SMALL_ATOM_EXT: _small_atom,
+    MAP_EXT: _map,
+    ATOM_UTF8_EXT: _atom_utf8,
+    SMALL_ATOM_UTF8_EXT: _small_atom_utf8
+}
+
+
+def decode(data: bytes) -> Any:
+    """
+    Decodes an ETF term
+
+    Parameters
+    ----------
+    data : :class:`bytes`
+        the term, starting with the format version byte (``131``)
+
+    Returns
+    -------
+    Any
+        the decoded term
+    """
+    if not data or data[0] != FORMAT_VERSION:
+        raise ETFDecodeError('ETF data does not start with the format version')
+    return _decode_term(data, 1)[0]
+
+
+def _encode_atom(name: str, out: bytearray) -> None:
+    raw = name.encode('utf-8')
+    out += struct.pack('>BB', SMALL_ATOM_UTF8_EXT, len(raw))
+    out += raw
+
+
+def _encode_term(obj: Any, out: bytearray) -> None:
+    if obj is None:
+        _encode_atom('nil', out)
+    elif obj is True:
+        _encode_atom('true', out)
+    elif obj is False:
+        _encode_atom('false', out)
+    elif isinstance(obj, int):
+        if 0 <= obj <= 255:
+            out += struct.pack('>BB', SMALL_INTEGER_EXT, obj)
+        elif -2 ** 31 <= obj < 2 ** 31:
+            out += struct.pack('>Bi', INTEGER_EXT, obj)
+        else:
+            raw = abs(obj).to_bytes((abs(obj).bit_length() + 7) // 8, 'little')
+            if len(raw) > 255:
+                raise ValueError('integer is too big to encode')
+            out += struct.pack('>BBB', SMALL_BIG_EXT, len(raw), obj < 0)
+            out += raw
+    elif isinstance(obj, float):
+        out += struct.pack('>Bd', NEW_FLOAT_EXT, obj)
+    elif isinstance(obj, (str, bytes)):
+        raw = obj.encode('utf-8') if isinstance(obj, str) else obj
+        out += struct.pack('>BI', BINARY_EXT, len(raw))
+        out += raw
+    elif isinstance(obj, dict):
+        out += struct.pack('>BI', MAP_EXT, len(obj))
+        for key, value in obj.items():
+            _encode_term(key, out)
+            _encode_term(value, out)
+    elif isinstance(obj, (list, tuple)):
+        if not obj:
+            out.append(NIL_EXT)
+            return
+        out += struct.pack('>BI', LIST_EXT, len(obj))
+        for item in obj:
+            _encode_term(item, out)
+        out.append(NIL_EXT)
+    else:
+        raise TypeError(f"Object of type {type(obj).__name__} can not be encoded as ETF")
+
+
+def encode(obj: Any) -> bytes:
+    """
+    Encodes an object as an ETF term
+
+    Parameters
+    ----------
+    obj : Any
+        a ``dict``, ``list``, ``tuple``, ``str``, ``bytes``, ``int``, ``float``, ``bool`` or ``None``
+
+    Returns
+    -------
+    :class:`bytes`
+        the encoded term, starting with the format version byte.
+    """
+    out = bytearray((FORMAT_VERSION,))
+    _encode_term(obj, out)
+    return bytes(out)
@@ -13,45 +13,164 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-from typing import Mapping, Awaitable, Any, Callable
+import logging
+from typing import Mapping, Awaitable, Any, Callable, List
 import multidict
 
 from . import exception
-from .message import Message
+from .message import Message, MessageBulkDelete, MessageDelete, MessageUpdate
+from .router import get_router
+from .slashCommand import Interaction
 
+_log = logging.getLogger(__name__)
+
+# listeners that get the event's model
 eventdict = multidict.MultiDict()
+# listeners that get the event's payload dict
+raw_eventdict = multidict.MultiDict()
+# listeners that get every frame from the gateway before it is decoded
+raw_frame_listeners: List[Callable] = []
 
 
-# InteractionCreateHandler
-async def InteractionCreateHandler(data: dict, out_func):
-    """
-    Handles an Interaction_Create event
-    """
-    event_name = data['name']
+def MessageCreateHandler(data: dict, cached=None) -> Message:
+    return cached if cached is not None else Message(data)
+
+
+def MessageUpdateHandler(data: dict, cached=None) -> MessageUpdate:
+    return MessageUpdate(data, cached)
+
 
+def MessageDeleteHandler(data: dict, cached=None) -> MessageDelete:
+    return MessageDelete(data, cached)
 
-async def MessageCreateHandler(data: dict, out_func):
-    message = Message(data)
-    await out_func(message)
+
+def MessageDeleteBulkHandler(data: dict, cached=None) -> MessageBulkDelete:
+    return MessageBulkDelete(data, cached)
+
+
+def InteractionCreateHandler(data: dict, cached=None) -> Interaction:
+    return Interaction(data)
 
 
 def eventListener(event_name):
-    """decorator that makes a coroutine listen for an event"""
+    """
+    decorator that makes a coroutine listen for an event
+
+    The coroutine is called with the event's model (such as a :class:`discordSplash.message.Message` for
+    ``MESSAGE_CREATE``), or with the payload :class:`dict` for events that do not have a model.
+    """
 
     def wrapper(func):
         eventdict.add(event_name, func)
-        print(event_name, func)
+        _log.debug("Registered %r as a listener for %s", func, event_name)
+        return func
 
     return wrapper
 
 
-async def eventHandler(event_type, data, out_func):
-    func = i_eventDict.get(event_type)
-    if func is not None:
-        await func(data, out_func)
+def rawEventListener(event_name):
+    """
+    decorator that makes a coroutine listen for an event's payload
+
+    The coroutine is called with the event's payload :class:`dict` (the ``d`` of the dispatch). No model is built
+    for raw listeners, so they are the cheapest way to read a few keys of high-volume events.
+    """
+
+    def wrapper(func):
+        raw_eventdict.add(event_name, func)
+        _log.debug("Registered %r as a raw listener for %s", func, event_name)
+        return func
+
+    return wrapper
+
+
+def rawFrameListener(func):
+    """
+    decorator that makes a coroutine listen for every frame the gateway sends
+
+    The coroutine is called with the frame as it was received, after decompression but before it is decoded.
+    JSON frames are :class:`str`, or :class:`bytes` with zlib-stream compression, and ETF frames are :class:`bytes`,
+    so listeners should accept both. Frames of every opcode are passed, not only dispatches.
+    """
+    raw_frame_listeners.append(func)
+    _log.debug("Registered %r as a raw frame listener", func)
+    return func
+
+
+def build_event(event_type: str, data: dict, cached=None) -> Any:
+    """
+    Builds the model passed to an event's listeners.
+
+    Parameters
+    ----------
+    event_type : :class:`str`
+        the type of the event, such as ``MESSAGE_CREATE``
+
+    data : :class:`dict`
+        the event's payload
+
+    cached : Optional[Any]
+        the cached object the event is about. See :meth:`discordSplash.cache.Cache.parse`
+
+    Returns
+    -------
+    Any
+        the model, or ``data`` if the event does not have one.
+    """
+    builder = i_eventDict.get(event_type)
+    return builder(data, cached) if builder is not None else data
+
+
+async def dispatch_event(dispatcher, cache, event_type: str, data: dict, model=None) -> None:
+    """
+    Updates a cache with an event and submits it to its listeners. This is what every way of receiving events
+    (the gateway, or the interactions webhook server) goes through.
+
+    Raw listeners get ``data``. The event's model is only built if it has typed listeners, and it is built once
+    for all of them. Interactions are also routed by :func:`discordSplash.router.get_router`.
+
+    Parameters
+    ----------
+    dispatcher : :class:`discordSplash.dispatch.Dispatcher`
+        runs the listeners
+
+    cache : :class:`discordSplash.cache.Cache`
+        the cache to update
+
+    event_type : :class:`str`
+        the type of the event, such as ``MESSAGE_CREATE``
+
+    data : :class:`dict`
+        the event's payload
+
+    model : Optional[Any]
+        the event's model, if it was already built
+    """
+    funcs = eventdict.getall(event_type, ())
+    if event_type == 'INTERACTION_CREATE':
+        funcs = [*funcs, get_router().dispatch]
+    # without typed listeners, messages are cached as their payload and only built if they are read again
+    cached = cache.parse(event_type, data, build=bool(funcs) and model is None)
+
+    for func in raw_eventdict.getall(event_type, ()):
+        await dispatcher.submit(event_type, data, func, data)
+
+    if funcs:
+        if model is None:
+            model = build_event(event_type, data, cached)
+        for func in funcs:
+            await dispatcher.submit(event_type, data, func, model)
+
+
+async def eventHandler(event_type, data, out_func, cached=None):
+    await out_func(build_event(event_type, data, cached))
 
 
+# builds the model for an event's typed listeners
 i_eventDict = {
-    "INTERACTION_CREATE": InteractionCreateHandler,
-    "MESSAGE_CREATE": MessageCreateHandler
+    "MESSAGE_CREATE": MessageCreateHandler,
+    "MESSAGE_UPDATE": MessageUpdateHandler,
+    "MESSAGE_DELETE": MessageDeleteHandler,
+    "MESSAGE_DELETE_BULK": MessageDeleteBulkHandler,
+    "INTERACTION_CREATE": InteractionCreateHandler
 }
@@ -58,23 +58,45 @@ class MethodNotAllowed(HTTPWarning):
 
 
 class TooManyRequests(HTTPWarning):
-    """raised when receiving a 429 response from the api.
+    """raised when a request is still ratelimited (429) after it has been retried.
     **this shouldn't happen.**"""
     pass
 
 
+class ServerError(HTTPWarning):
+    """Discord's API had an internal error, and the request still failed after it was retried."""
+    pass
+
+
 HTTPexceptionStatusPairing = {
     400: BadRequest,
     401: Unauthorized,
     403: Forbidden,
     404: NotFound,
     405: MethodNotAllowed,
-    429: TooManyRequests
+    429: TooManyRequests,
+    500: ServerError,
+    502: ServerError,
+    503: ServerError,
+    504: ServerError
 }
 
 
+# MARK: gateway exceptions
+
+class GatewayError(BaseSplashException):
+    """Raised when the gateway closes the connection in a way that reconnecting can not fix,
+    such as an invalid token or disallowed intents."""
+    pass
+
+
 # MARK: interaction exceptions
 
 class SlashCommandNotFound(BaseSplashWarning):
     """Raised when a slash command on Discord's API is not bound to a DiscordSplash function"""
     pass
+
+
+class CommandRegistrationError(BaseSplashException):
+    """Raised when a command or component can not be registered, such as when its name is already taken"""
+    pass
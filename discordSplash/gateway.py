@@ -14,13 +14,55 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 import asyncio
+import logging
+import random
+import re
+import time
+import typing
 import websockets
-import json
+import websockets.exceptions
 
-from .request import auth_header
+from .request import auth_header, HTTPClient, set_client
 from .presence import UpdatePresence, EmptyUpdatePresence
 from .enums import Opcodes
-from .events import i_eventDict, eventHandler, eventdict
+from .events import dispatch_event, eventdict, raw_eventdict, raw_frame_listeners
+from .intents import intents_for
+from .router import get_router
+from .sync import DEFAULT_CACHE_PATH, CommandSync
+from .cache import Cache, set_cache
+from .dispatch import Dispatcher
+from .compression import ZlibStreamInflator
+from .exception import GatewayError
+from . import codec, etf, util
+
+_log = logging.getLogger(__name__)
+
+# discord starts every JSON dispatch with the event type and sequence, so unwanted events can be skipped before
+# they are decoded. Frames that do not start like this are decoded as usual.
+_DISPATCH_PREFIX = re.compile(r'\{"t":"([A-Z0-9_]+)","s":(\d+),"op":0[,}]')
+_DISPATCH_PREFIX_BYTES = re.compile(rb'\{"t":"([A-Z0-9_]+)","s":(\d+),"op":0[,}]')
+# events the bot always needs
+_GATEWAY_EVENTS = frozenset(('READY', 'RESUMED'))
+
+# close codes after which connecting again can not work
+FATAL_CLOSE_CODES = {
+    4004: 'authentication failed',
+    4010: 'invalid shard',
+    4011: 'sharding required',
+    4012: 'invalid API version',
+    4013: 'invalid intents',
+    4014: 'disallowed intents'
+}
+# close codes after which the session can not be resumed
+RESET_CLOSE_CODES = frozenset((4007, 4009))
+
+
+class _Reconnect(Exception):
+    """raised inside the read loop when discord asks the bot to reconnect"""
+
+    def __init__(self, resume: bool):
+        super().__init__()
+        self.resume = resume
 
 
 
@@ -33,6 +75,72 @@ class GatewayBot:
     token : str
         The bot's token
 
+    presence : Optional[:class:`discordSplash.UpdatePresence`]
+        The bot's presence when it connects
+
+    connector_limit : Optional[int]
+        maximum number of simultaneous HTTP connections the bot's pool can open. Defaults to ``100``
+
+    max_concurrency : Optional[int]
+        maximum number of event handlers that can run at once. Defaults to ``64``
+
+    ordering : Optional[str]
+        which events must be handled in order. See :class:`discordSplash.dispatch.Dispatcher`
+
+    compress : Optional[bool]
+        whether or not to use ``zlib-stream`` transport compression. Defaults to ``False``
+
+    encoding : Optional[str]
+        encoding of the gateway connection. ``'json'`` (default) or ``'etf'``.
+        With ``'etf'``, snowflakes in event data are :class:`int` instead of :class:`str`.
+
+    intents : Optional[int]
+        gateway intents to identify with, such as ``Intents.GUILDS | Intents.GUILD_MESSAGES``. By default they are
+        worked out from the events that have listeners when the bot connects
+        (see :func:`discordSplash.intents.intents_for`).
+
+    cache : Optional[:class:`discordSplash.cache.Cache`]
+        cache of the guilds, channels, roles, members and users the bot can see. Defaults to a
+        :class:`discordSplash.cache.Cache` with every entity type turned on. Pass ``Cache(members=False)`` (for
+        example) to stop caching some types.
+
+    trace : Optional[bool]
+        whether or not to log every frame sent and received at the ``TRACE`` level (``discordSplash.util.TRACE``).
+        Tokens are redacted. Defaults to ``False``
+
+    trace_limit : Optional[int]
+        maximum number of characters of each traced frame. Defaults to ``1000``, ``None`` logs whole frames.
+
+    shard_id : Optional[int]
+        id of the shard this bot connects as. Generally set by :class:`discordSplash.sharding.ShardManager`
+
+    shard_count : Optional[int]
+        total number of shards. Required if ``shard_id`` is passed.
+
+    gateway : Optional[str]
+        base url of the gateway. Defaults to ``wss://gateway.discord.gg``
+
+    api_url : Optional[str]
+        base url of the HTTP API. Defaults to ``discordSplash.request.api_url``. Ignored if ``http`` is passed.
+
+    http : Optional[:class:`discordSplash.request.HTTPClient`]
+        HTTP client to share with other bots (shards). A new one is created if not passed.
+
+    dispatcher : Optional[:class:`discordSplash.dispatch.Dispatcher`]
+        dispatcher to share with other bots (shards). A new one is created if not passed.
+
+    identify_limiter : Optional[:class:`discordSplash.sharding.IdentifyLimiter`]
+        waited on before every IDENTIFY, so shards identify within discord's ``max_concurrency``
+
+    command_cache : Optional[str]
+        file the hashes of the synced slash commands are saved to, so restarts with the same commands do not make
+        any request. Defaults to ``.discordSplash-commands.json``, ``None`` turns it off.
+        See :class:`discordSplash.sync.CommandSync`
+
+    recorder : Optional[:class:`discordSplash.replay.FrameRecorder`]
+        records every frame received from the gateway, as it was received (before decompression), so it can be
+        replayed later with :class:`discordSplash.replay.ReplayDriver`
+
 
     Methods
     -------
@@ -43,24 +151,101 @@ class GatewayBot:
     TOKEN : str
         The bot's token (keep this safe)
 
+    http : :class:`discordSplash.request.HTTPClient`
+        pooled HTTP client that all of the bot's requests go through
+
+    dispatcher : :class:`discordSplash.dispatch.Dispatcher`
+        runs the bot's event handlers
+
+    cache : :class:`discordSplash.cache.Cache`
+        entities seen by the bot, updated before the listeners of every event run
+
+    inflator : Optional[:class:`discordSplash.compression.ZlibStreamInflator`]
+        decompresses the gateway connection. ``None`` if compression is off.
+        ``inflator.bytes_in`` and ``inflator.bytes_out`` count the bytes received before and after decompression.
+
+    shard_id : Optional[int]
+        id of the bot's shard. ``None`` if the bot is not sharded.
+
+    application_id : Optional[int]
+        id of the bot's application. ``None`` until the bot is ready.
+
+    status : str
+        state of the connection. One of ``'disconnected'``, ``'connecting'``, ``'identifying'``,
+        ``'resuming'`` or ``'ready'``.
+
+    skipped_events : int
+        number of events that were dropped because nothing listens for them
+
+    latency : Optional[float]
+        seconds between the last heartbeat and its acknowledgement. ``None`` until the first one is acknowledged.
+
+    heartbeat_latency : :class:`discordSplash.util.RollingLatency`
+        rolling gateway round-trip latency. ``heartbeat_latency.to_dict()`` gives the ``last``, ``p50`` and ``p99``.
+
     """
     pass
 
-    def __init__(self, token: str, presence: UpdatePresence = EmptyUpdatePresence):
+    def __init__(self, token: str, presence: UpdatePresence = EmptyUpdatePresence, connector_limit: int = 100,
+                 max_concurrency: int = 64, ordering=None, compress: bool = False, encoding: str = 'json',
+                 shard_id: typing.Optional[int] = None, shard_count: typing.Optional[int] = None,
+                 gateway: str = 'wss://gateway.discord.gg', http: typing.Optional[HTTPClient] = None,
+                 dispatcher: typing.Optional[Dispatcher] = None, identify_limiter=None,
+                 cache: typing.Optional[Cache] = None, intents: typing.Optional[int] = None, trace: bool = False,
+                 trace_limit: typing.Optional[int] = 1000,
+                 command_cache: typing.Optional[str] = DEFAULT_CACHE_PATH, recorder=None,
+                 api_url: typing.Optional[str] = None):
 
         # stuff for dealing with the gateway
         self._interval = None
         self._sequence = None
         self._session_id = None
+        self._resume_gateway = None
+        self._closing = False
 
         self.CLIENT_ID = None
+        self.application_id = None
+        self.command_cache = command_cache
+        self.recorder = recorder
+        self._update_commands = False
+        # tasks the bot started on its own, kept so they are not garbage collected before they finish
+        self._background_tasks: typing.Set[asyncio.Future] = set()
 
         self._websocket = None
+        self._last_heartbeat = None
+        self._heartbeat_acked = True
+        # when the read loop last took a frame off the websocket
+        self._last_frame = 0.0
+        self.heartbeat_latency = util.RollingLatency()
+        self.status = 'disconnected'
+        self.gateway = gateway
+        self.shard_id = shard_id
+        self.identify_limiter = identify_limiter
+        self.trace = trace
+        self.intents = intents
+        self.skipped_events = 0
+        self._handled_events: typing.FrozenSet[str] = frozenset()
+        self._handled_events_bytes: typing.FrozenSet[bytes] = frozenset()
+        self.trace_limit = trace_limit
+        self.inflator = ZlibStreamInflator() if compress else None
+
+        if encoding not in ('json', 'etf'):
+            raise ValueError(f"unknown gateway encoding {encoding!r}. Must be 'json' or 'etf'")
+        self.encoding = encoding
+        self._loads = codec.loads
+        self._dumps = codec.dumps
 
         self.TOKEN = token
         auth_header['Authorization'] = f"Bot {token}"
 
-        TOKEN = self.TOKEN
+        # shards share these with each other, so only close them if the bot created them
+        self._owns_http = http is None
+        self.http = http or HTTPClient(token, connector_limit=connector_limit, api_url=api_url)
+        set_client(self.http)
+        self._owns_dispatcher = dispatcher is None
+        self.dispatcher = dispatcher or Dispatcher(max_concurrency=max_concurrency, ordering=ordering)
+        self.cache = cache if cache is not None else Cache()
+        set_cache(self.cache)
 
         self._auth = {
             "token": self.TOKEN,
@@ -70,110 +255,341 @@ class GatewayBot:
                 "$device": "discordSplash"
             },
             'presence': presence.to_dict,
-            'intents': 29185
-
+            'intents': intents if intents is not None else 0
         }
+        if shard_id is not None:
+            if shard_count is None:
+                raise ValueError('shard_count must be passed with shard_id')
+            self._auth['shard'] = [shard_id, shard_count]
 
     def run(self, update_commands: bool = True):
         """
         Run the bot.
+
+        Parameters
+        ----------
+        update_commands : Optional[bool]
+            whether or not to sync the registered slash commands with discord once the bot is ready
+            (see :meth:`sync_commands`). Defaults to ``True``
         """
 
+        asyncio.run(self._run(update_commands))
+
+    @property
+    def can_resume(self) -> bool:
+        """whether or not the current session can be resumed"""
+        return self._session_id is not None and self._sequence is not None
+
+    def _invalidate_session(self):
+        self._session_id = None
+        self._sequence = None
+        self._resume_gateway = None
+
+    async def _run(self, update_commands: bool):
+        """
+        Connects, and keeps reconnecting until :meth:`close` is called.
+
+        A lost connection is resumed with the ``session_id`` and sequence whenever discord allows it. The bot only
+        identifies again if the session can not be resumed. Reconnects back off with jitter if they keep failing.
+        """
+        self._closing = False
+        attempt = 0
         try:
-            asyncio.run(self.connect(resume=False, update_commands=update_commands))
-        except websockets.exceptions.ConnectionClosedError:
-            while True:
+            while not self._closing:
+                if attempt:
+                    await asyncio.sleep(util.jittered_backoff(attempt - 1, base=1.0, cap=60.0))
+                attempt += 1
                 try:
-                    asyncio.run(self.connect(resume=True, update_commands=False))
-                except (websockets.exceptions.ConnectionClosedError, websockets.exceptions.ConnectionClosedOK):
-                    pass
+                    await self.connect(update_commands=update_commands, resume=self.can_resume)
+                except _Reconnect as e:
+                    # discord asked for the reconnect, so there is no need to back off
+                    _log.info("Shard %s reconnecting (resume=%s)", self.shard_id, e.resume)
+                    if not e.resume:
+                        self._invalidate_session()
+                    attempt = 0
+                except (websockets.exceptions.WebSocketException, OSError, asyncio.TimeoutError) as e:
+                    if self._closing:
+                        break
+                    code = self._websocket.close_code if self._websocket is not None else None
+                    if code in FATAL_CLOSE_CODES:
+                        raise GatewayError(f"gateway closed with code {code}: {FATAL_CLOSE_CODES[code]}") from e
+                    _log.warning("Shard %s lost its connection (close code %s): %r", self.shard_id, code, e)
+                    if code in RESET_CLOSE_CODES:
+                        self._invalidate_session()
+                    # a connection that got to READY was healthy, so reconnect straight away
+                    if self.status == 'ready':
+                        attempt = 0
+                self.status = 'disconnected'
+                # READY clears this once the sync is scheduled, so a connection that never got there tries again
+                update_commands = self._update_commands
+        finally:
+            await self.close()
+
+    async def close(self):
+        """
+        Closes the bot's websocket and HTTP connection pool, and cancels a command sync that is still running.
+        """
+        self._closing = True
+        self.status = 'disconnected'
+        if self._websocket is not None:
+            await self._websocket.close()
+        for task in list(self._background_tasks):
+            task.cancel()
+        await asyncio.gather(*self._background_tasks, return_exceptions=True)
+        if self._owns_dispatcher:
+            await self.dispatcher.close()
+        if self._owns_http:
+            await self.http.close()
+
+    async def sync_commands(self, force: bool = False) -> typing.Dict[str, str]:
+        """
+        Creates, updates or deletes the bot's slash commands on discord so they match the registered ones. Only
+        scopes whose commands changed are sent. See :class:`discordSplash.sync.CommandSync`
+
+        Parameters
+        ----------
+        force : Optional[bool]
+            whether or not to fetch the existing commands even if the saved hashes match. Defaults to ``False``
+
+        Returns
+        -------
+        Dict[str, str]
+            what was done for each scope, see :meth:`discordSplash.sync.CommandSync.sync`
+        """
+        if self.application_id is None:
+            raise RuntimeError('the application id is only known once the bot is ready')
+        return await CommandSync(self.application_id, self.http, self.command_cache).sync(force=force)
+
+    async def _sync_commands_in_background(self):
+        try:
+            await self.sync_commands()
+        except Exception:
+            _log.exception("Could not sync the slash commands")
+
+    def refresh_subscriptions(self):
+        """
+        Works out which events the bot handles and which intents it needs, from the listeners registered now and
+        the events the cache uses. Called every time the bot connects; call it again after registering a listener
+        for a new event while connected. The intents only change on the next IDENTIFY.
+        """
+        listened = set(eventdict.keys()) | set(raw_eventdict.keys())
+        if get_router():
+            listened.add('INTERACTION_CREATE')
+        self._handled_events = frozenset(listened | self.cache.event_types | _GATEWAY_EVENTS)
+        self._handled_events_bytes = frozenset(event_type.encode() for event_type in self._handled_events)
+        self._auth['intents'] = int(self.intents if self.intents is not None else intents_for(listened))
+
+    def _url(self, base: str) -> str:
+        url = f'{base}/?v=9&encoding={self.encoding}'
+        if self.inflator is not None:
+            url += '&compress=zlib-stream'
+        return url
+
+    @property
+    def gateway_url(self) -> str:
+        """url of the gateway websocket"""
+        return self._url(self.gateway)
 
     async def connect(self, update_commands: bool, resume=False):
-        async with websockets.connect(
-                'wss://gateway.discord.gg/?v=9&encoding=json') \
-                as self._websocket:
-            if resume is False:
-                await self.hello()
-                if self._interval is None:
-                    return
-                await asyncio.gather(self.heartbeat(), self.receive())
-            if resume is True:
-                await self.resume()
-                print('Reconnecting to discord websocket.')
-
-                await asyncio.gather(self.heartbeat(), self.receive())
-
-            # while self.interval is not None:
-            #     pass
+        """
+        Makes one connection to the gateway and reads from it until it is closed.
+
+        Parameters
+        ----------
+        update_commands : bool
+            whether or not to update the bot's slash commands once it is ready
+
+        resume : bool
+            whether to RESUME the previous session instead of identifying. Resumes connect to the
+            ``resume_gateway_url`` discord sent in READY.
+        """
+        self._prepare_connection(update_commands)
+
+        url = self._url(self._resume_gateway) if resume and self._resume_gateway else self.gateway_url
+        self.status = 'connecting'
+        self._websocket = None
+        # READY and GUILD_CREATE can be far bigger than websockets' default size limit
+        async with websockets.connect(url, max_size=None) as self._websocket:
+            await self.hello()
+            heartbeat = asyncio.ensure_future(self.heartbeat())
+            try:
+                if resume:
+                    self.status = 'resuming'
+                    await self.resume()
+                else:
+                    await self.identify()
+                await self.receive()
+            finally:
+                heartbeat.cancel()
+                if not self._closing:
+                    # closing with 1000 or 1001 would invalidate the session
+                    await self._websocket.close(code=4000)
+
+    def _prepare_connection(self, update_commands: bool):
+        """resets the per-connection state. Called before every connection, and by the replay driver."""
+        if self.encoding == 'etf':
+            self._loads, self._dumps = etf.decode, etf.encode
+        else:
+            self._loads, self._dumps = codec.loads, codec.dumps
+        if self.inflator is not None:
+            self.inflator.reset()
+        self.refresh_subscriptions()
+        self._update_commands = update_commands
+        if self.recorder is not None:
+            self.recorder.connection(self.encoding, self.inflator is not None)
 
     async def receive(self):
-        print("Entering receive")
+        """
+        reads from the gateway until the connection is closed, or discord asks for a reconnect
+        """
+        recorder = self.recorder
         async for message in self._websocket:
-            print("<", message)
-            data = json.loads(message)
-            if data["op"] == Opcodes.RECONNECT:
-                await self._websocket.close()
-                await asyncio.sleep(5)
-                await self.connect(False, False)
-            if data["op"] == Opcodes.DISPATCH:
+            # before any listener is submitted, so backpressure from the handlers does not look like a dead connection
+            self._last_frame = time.perf_counter()
+            if recorder is not None:
+                recorder.record(message)
+            if self.inflator is not None and isinstance(message, bytes):
+                message = self.inflator.feed(message)
+                if message is None:
+                    continue
+            for func in raw_frame_listeners:
+                await self.dispatcher.submit(None, None, func, message)
+
+            if self.encoding == 'json':
+                if isinstance(message, str):
+                    match = _DISPATCH_PREFIX.match(message)
+                    handled = self._handled_events
+                else:
+                    match = _DISPATCH_PREFIX_BYTES.match(message)
+                    handled = self._handled_events_bytes
+                if match is not None and match.group(1) not in handled:
+                    # nothing uses the event, so only its sequence is kept
+                    self._sequence = int(match.group(2))
+                    self.skipped_events += 1
+                    continue
+
+            data = self._loads(message)
+            if self.trace and _log.isEnabledFor(util.TRACE):
+                _log.log(util.TRACE, "< %s", util.LoggedPayload(data, self.trace_limit))
+            op = data["op"]
+            if op == Opcodes.HEARTBEAT_ACK:
+                self._heartbeat_acked = True
+                if self._last_heartbeat is not None:
+                    self.heartbeat_latency.add(time.perf_counter() - self._last_heartbeat)
+            elif op == Opcodes.HEARTBEAT:
+                # discord wants a heartbeat right now. It is not acknowledged, so the ACK state is left alone
+                await self.send(Opcodes.HEARTBEAT, self._sequence)
+            elif op == Opcodes.RECONNECT:
+                raise _Reconnect(resume=True)
+            elif op == Opcodes.INVALID_SESSION:
+                # discord asks clients to wait a random 1-5 seconds before identifying again
+                await asyncio.sleep(random.uniform(1, 5))
+                raise _Reconnect(resume=bool(data["d"]))
+            elif op == Opcodes.DISPATCH:
                 self._sequence = int(data["s"])
                 event_type = data["t"]
+                if event_type in ("READY", "RESUMED"):
+                    self.status = 'ready'
                 if event_type == "READY":
-                    print('ready')
+                    _log.info("Shard %s is ready (session %s)", self.shard_id, data['d']['session_id'])
                     self.CLIENT_ID = data['d']['user']['id']
+                    self.application_id = int(data['d'].get('application', {}).get('id', self.CLIENT_ID))
                     self._session_id = data['d']['session_id']
+                    self._resume_gateway = data['d'].get('resume_gateway_url')
+
+                await self.dispatch(event_type, data['d'])
+                if event_type == "READY" and self._update_commands:
+                    self._update_commands = False
+                    task = asyncio.ensure_future(self._sync_commands_in_background())
+                    self._background_tasks.add(task)
+                    task.add_done_callback(self._background_tasks.discard)
 
-                funcs = eventdict.getall(event_type, [])
-                for coro in funcs:
-                    await eventHandler(event_type, data['d'], coro)
+        # the server closed the connection
+        raise websockets.exceptions.ConnectionClosedOK(None, None)
 
-                
-                """
-                elif event_type == "INTERACTION_CREATE":
+    async def dispatch(self, event_type: str, data: dict):
+        """
+        Updates the cache with an event and submits it to its listeners.
+
+        See :func:`discordSplash.events.dispatch_event`
+        """
+        if event_type not in self._handled_events:
+            self.skipped_events += 1
+            return
+        await dispatch_event(self.dispatcher, self.cache, event_type, data)
 
-                    event_name = data['d']['data']['name']
-                    try:
-                        function = self.commands[event_name]
-                       # await function(ReactionData(data))
-                    except:
-                        pass
-                """
+    def _decode(self, message):
+        """decodes a frame from the gateway. returns ``None`` if a compressed message is not complete yet."""
+        if isinstance(message, bytes) and self.inflator is not None:
+            message = self.inflator.feed(message)
+            if message is None:
+                return None
+        return self._loads(message)
 
     async def send(self, opcode, payload):
+        if self.trace and _log.isEnabledFor(util.TRACE):
+            _log.log(util.TRACE, "> op %s %s", opcode, util.LoggedPayload(payload, self.trace_limit))
         data = self.opcode(opcode, payload)
-        print(">", data)
         await self._websocket.send(data)
 
+    @property
+    def latency(self) -> typing.Optional[float]:
+        """seconds between the last heartbeat and its acknowledgement"""
+        return self.heartbeat_latency.last
+
+    async def send_heartbeat(self):
+        """sends a heartbeat and starts waiting for its acknowledgement"""
+        self._heartbeat_acked = False
+        self._last_heartbeat = time.perf_counter()
+        await self.send(Opcodes.HEARTBEAT, self._sequence)
+
     async def heartbeat(self):
-        print("Entering heartbeat")
-        while self._interval is not None:
-            print("Sending a heartbeat")
-            await self.send(Opcodes.HEARTBEAT, self._sequence)
+        """
+        Sends heartbeats every ``heartbeat_interval``.
+
+        If the previous heartbeat was never acknowledged, and nothing else was received since it was sent, the
+        connection is a zombie: it is closed so the bot resumes on a new one. While the read loop is held back by
+        busy handlers (see :class:`discordSplash.dispatch.Dispatcher`), the ACK may simply not have been read yet, so
+        the connection is not judged.
+        """
+        self._heartbeat_acked = True
+        # the first heartbeat is jittered so shards that connected together do not heartbeat together
+        await asyncio.sleep(self._interval * random.random())
+        while True:
+            if not self._heartbeat_acked and self._last_frame < self._last_heartbeat and not self.dispatcher.full:
+                _log.warning("Shard %s did not receive a heartbeat ACK, reconnecting", self.shard_id)
+                await self._websocket.close(code=4000)
+                return
+            await self.send_heartbeat()
             await asyncio.sleep(self._interval)
 
     async def hello(self):
+        """waits for HELLO and reads the heartbeat interval from it"""
+        data = None
+        while data is None:
+            message = await self._websocket.recv()
+            if self.recorder is not None:
+                self.recorder.record(message)
+            data = self._decode(message)
+
+        if data["op"] != Opcodes.HELLO:
+            raise websockets.exceptions.ProtocolError(f"expected HELLO, got opcode {data['op']}")
+        self._interval = data["d"]["heartbeat_interval"] / 1000
+        _log.debug("Shard %s received HELLO, heartbeat interval %ss", self.shard_id, self._interval)
+
+    async def identify(self):
+        """starts a new session"""
+        self.status = 'identifying'
+        if self.identify_limiter is not None:
+            await self.identify_limiter.acquire(self.shard_id or 0)
         await self.send(Opcodes.IDENTIFY, self._auth)
-        print(f"hello > auth")
-
-        ret = await self._websocket.recv()
-        print(f"hello < {ret}")
-
-        data = json.loads(ret)
-        opcode = data["op"]
-        if opcode != 10:
-            print("Unexpected reply")
-            print(ret)
-            return
-        self._interval = (data["d"]["heartbeat_interval"] - 2000) / 1000
-        # self.interval = 5
-        print("interval:", self._interval)
 
-    def opcode(self, opcode: int, payload) -> str:
+    def opcode(self, opcode: int, payload) -> typing.Union[str, bytes]:
         data = {
             "op": opcode,
             "d": payload
         }
-        return json.dumps(data)
+        return self._dumps(data)
 
     async def resume(self):
         resume_pkt = await self.create_resume_packet()
@@ -1,24 +1,49 @@
 from dataclasses import dataclass
-from datetime import datetime
+from typing import Optional
 
 from . import user
 from .abstractbaseclass import Object
+from .util import UNPARSED, lazy_field, optional_datetime, optional_int
 
 @dataclass(init=False, eq=False)
 class Role(Object):
+    """
+    Represents a Discord Role
+
+    ``raw`` holds the role payload if :attr:`keep_raw` is ``True``, and is ``None`` otherwise.
+    """
+    __slots__ = ('name', 'color', 'is_hoisted', 'icon', 'emoji', 'position', 'permissions', 'managed', 'mentionable',
+                 'tags', 'raw')
+
+    #: whether or not new roles keep their payload in ``raw``. Off by default to save memory.
+    keep_raw = False
+
     def __init__(self, json):
         super().__init__(json.get('id'))
-        self.json = json
-        self.name = self.json.get("name")
-        self.color = self.json.get("color") #TODO add color object
-        self.is_hoisted = self.json.get("hoist")
-        self.icon = self.json.get("icon") #TODO: ADD ICON OBJECT
-        self.emoji = self.json.get("unicode_emoji")
-        self.position = self.json.get("position")
-        self.permissions = self.json.get("permissions") #TODO IMPLEMENT Permissions
-        self.managed = self.json.get("managed")
-        self.mentionable = self.json.get("mentionable")
-        self.tags = self.json.get("tags") #TODO: ADD ROLE TAGS OBJECT
+        self._update(json)
+
+    @property
+    def json(self):
+        """alias of ``raw``"""
+        return self.raw
+
+    def _update(self, json):
+        """replaces the role's data, keeping the same object"""
+        self.raw = json if self.keep_raw else None
+        self.name = json.get("name")
+        self.color = json.get("color") #TODO add color object
+        self.is_hoisted = json.get("hoist")
+        self.icon = json.get("icon") #TODO: ADD ICON OBJECT
+        self.emoji = json.get("unicode_emoji")
+        self.position = json.get("position")
+        self.permissions = json.get("permissions") #TODO IMPLEMENT Permissions
+        self.managed = json.get("managed")
+        self.mentionable = json.get("mentionable")
+        self.tags = json.get("tags") #TODO: ADD ROLE TAGS OBJECT
+
+
+def _role_ids(data):
+    return [int(role_id) for role_id in data] if data is not None else []
 
 
 @dataclass(init=False, eq=False)
@@ -54,19 +79,112 @@ class Member(Object):
     
     permissions : string
         Total permissions of the member in the channel
+
+    raw : dict
+        The member payload. ``None`` unless :attr:`keep_raw` is ``True``
+    """
+    __slots__ = ('guild_id', 'user', 'nick', '_raw_roles', '_roles', '_raw_joined_at', '_joined_at',
+                 '_raw_premium_since', '_premium_since', 'deaf', 'mute', 'pending', 'permissions', 'raw')
+
+    #: whether or not new members keep their payload in ``raw``. Off by default to save memory.
+    keep_raw = False
+
+    # parsed the first time they are read
+    roles = lazy_field('roles', _role_ids)
+    joined_at = lazy_field('joined_at', optional_datetime)
+    premium_since = lazy_field('premium_since', optional_datetime)
+
+    def __init__(self, jsonData: dict, guild_id: Optional[int] = None, member_user: Optional[user.User] = None):
+        self.guild_id = guild_id if guild_id is not None else optional_int(jsonData.get("guild_id"))
+        self.user = member_user if member_user is not None else user.User(jsonData.get("user"))
+        super().__init__(self.user.id)
+        self._update(jsonData)
+
+    @property
+    def memberData(self):
+        """alias of ``raw``"""
+        return self.raw
+
+    def _update(self, jsonData: dict):
+        """replaces the member's data, keeping the same object. the user is kept."""
+        self.raw = jsonData if self.keep_raw else None
+
+        self.nick = jsonData.get("nick")
+        self._raw_roles = jsonData.get("roles")
+        self._roles = UNPARSED
+        self._raw_joined_at = jsonData.get("joined_at")
+        self._joined_at = UNPARSED
+        self._raw_premium_since = jsonData.get("premium_since")
+        self._premium_since = UNPARSED
+        self.deaf = jsonData.get("deaf")
+        self.mute = jsonData.get("mute")
+        self.pending = jsonData.get("pending")
+        self.permissions = jsonData.get("permissions")
+
+
+@dataclass(init=False, eq=False)
+class Guild(Object):
+    """
+    Represents a Discord Guild
+
+    Channels, roles and members are not stored on the guild. Get them from :class:`discordSplash.cache.Cache`.
+
+    Attributes
+    ----------
+    id : int
+        ID of the guild
+
+    name : string
+        Name of the guild
+
+    icon : string
+        Icon hash
+
+    owner_id : int
+        ID of the guild's owner
+
+    unavailable : bool
+        Whether the guild is unavailable because of an outage
+
+    member_count : int
+        Total number of members in the guild. Only sent in GUILD_CREATE
+
+    large : bool
+        Whether the guild is considered large
+
+    premium_tier : int
+        The guild's boost level
+
+    preferred_locale : string
+        The guild's preferred locale
+
+    raw : dict
+        The guild payload. ``None`` unless :attr:`keep_raw` is ``True``
     """
+    __slots__ = ('name', 'icon', 'owner_id', 'unavailable', 'member_count', 'large', 'premium_tier',
+                 'preferred_locale', 'raw')
+
+    #: whether or not new guilds keep their payload in ``raw``. Off by default to save memory.
+    keep_raw = False
 
     def __init__(self, jsonData: dict):
-        self.memberData = jsonData
-
-        # Member data variables
-        self.user = user.User(self.memberData.get("user"))
-        self.nick = self.memberData.get("nick")
-        self.roles = self.memberData.get("roles")
-        self.joined_at = datetime.fromisoformat(self.memberData.get("joined_at"))
-        self.premium_since = datetime.fromisoformat(self.memberData.get("premium_since"))
-        self.deaf = self.memberData.get("deaf")
-        self.mute = self.memberData.get("mute")
-        self.pending = self.memberData.get("pending")
-        self.permissions = self.memberData.get("permissions")
+        super().__init__(jsonData.get("id"))
+        self.member_count = None
+        self.large = None
+        self._update(jsonData)
+
+    def _update(self, jsonData: dict):
+        """applies a GUILD_CREATE or GUILD_UPDATE payload, keeping the same object"""
+        self.raw = jsonData if self.keep_raw else None
 
+        self.name = jsonData.get("name")
+        self.icon = jsonData.get("icon")
+        self.owner_id = optional_int(jsonData.get("owner_id"))
+        self.unavailable = jsonData.get("unavailable", False)
+        # GUILD_UPDATE does not include these
+        if "member_count" in jsonData:
+            self.member_count = jsonData["member_count"]
+        if "large" in jsonData:
+            self.large = jsonData["large"]
+        self.premium_tier = jsonData.get("premium_tier")
+        self.preferred_locale = jsonData.get("preferred_locale")
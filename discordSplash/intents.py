@@ -0,0 +1,105 @@
+# Copyright (C) 2021-Present Mineinjava
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Works out which gateway intents a bot needs from the events it listens for.
+"""
+from typing import Dict, Iterable
+
+from .enums import Intents
+
+_GUILD_MESSAGES = Intents.GUILD_MESSAGES | Intents.DIRECT_MESSAGES
+_REACTIONS = Intents.GUILD_MESSAGE_REACTIONS | Intents.DIRECT_MESSAGE_REACTIONS
+
+#: intents that make discord send each event. Events that are not here (such as ``READY`` and
+#: ``INTERACTION_CREATE``) are sent without any intent.
+EVENT_INTENTS: Dict[str, Intents] = {
+    'GUILD_CREATE': Intents.GUILDS,
+    'GUILD_UPDATE': Intents.GUILDS,
+    'GUILD_DELETE': Intents.GUILDS,
+    'GUILD_ROLE_CREATE': Intents.GUILDS,
+    'GUILD_ROLE_UPDATE': Intents.GUILDS,
+    'GUILD_ROLE_DELETE': Intents.GUILDS,
+    'CHANNEL_CREATE': Intents.GUILDS,
+    'CHANNEL_UPDATE': Intents.GUILDS,
+    'CHANNEL_DELETE': Intents.GUILDS,
+    'CHANNEL_PINS_UPDATE': Intents.GUILDS | Intents.DIRECT_MESSAGES,
+    'THREAD_CREATE': Intents.GUILDS,
+    'THREAD_UPDATE': Intents.GUILDS,
+    'THREAD_DELETE': Intents.GUILDS,
+    'THREAD_LIST_SYNC': Intents.GUILDS,
+    'THREAD_MEMBER_UPDATE': Intents.GUILDS,
+    'THREAD_MEMBERS_UPDATE': Intents.GUILDS | Intents.GUILD_MEMBERS,
+    'STAGE_INSTANCE_CREATE': Intents.GUILDS,
+    'STAGE_INSTANCE_UPDATE': Intents.GUILDS,
+    'STAGE_INSTANCE_DELETE': Intents.GUILDS,
+    'GUILD_MEMBER_ADD': Intents.GUILD_MEMBERS,
+    'GUILD_MEMBER_UPDATE': Intents.GUILD_MEMBERS,
+    'GUILD_MEMBER_REMOVE': Intents.GUILD_MEMBERS,
+    'GUILD_AUDIT_LOG_ENTRY_CREATE': Intents.GUILD_MODERATION,
+    'GUILD_BAN_ADD': Intents.GUILD_MODERATION,
+    'GUILD_BAN_REMOVE': Intents.GUILD_MODERATION,
+    'GUILD_EMOJIS_UPDATE': Intents.GUILD_EMOJIS_AND_STICKERS,
+    'GUILD_STICKERS_UPDATE': Intents.GUILD_EMOJIS_AND_STICKERS,
+    'GUILD_INTEGRATIONS_UPDATE': Intents.GUILD_INTEGRATIONS,
+    'INTEGRATION_CREATE': Intents.GUILD_INTEGRATIONS,
+    'INTEGRATION_UPDATE': Intents.GUILD_INTEGRATIONS,
+    'INTEGRATION_DELETE': Intents.GUILD_INTEGRATIONS,
+    'WEBHOOKS_UPDATE': Intents.GUILD_WEBHOOKS,
+    'INVITE_CREATE': Intents.GUILD_INVITES,
+    'INVITE_DELETE': Intents.GUILD_INVITES,
+    'VOICE_STATE_UPDATE': Intents.GUILD_VOICE_STATES,
+    'PRESENCE_UPDATE': Intents.GUILD_PRESENCES,
+    'MESSAGE_CREATE': _GUILD_MESSAGES,
+    'MESSAGE_UPDATE': _GUILD_MESSAGES,
+    'MESSAGE_DELETE': _GUILD_MESSAGES,
+    'MESSAGE_DELETE_BULK': Intents.GUILD_MESSAGES,
+    'MESSAGE_REACTION_ADD': _REACTIONS,
+    'MESSAGE_REACTION_REMOVE': _REACTIONS,
+    'MESSAGE_REACTION_REMOVE_ALL': _REACTIONS,
+    'MESSAGE_REACTION_REMOVE_EMOJI': _REACTIONS,
+    'TYPING_START': Intents.GUILD_MESSAGE_TYPING | Intents.DIRECT_MESSAGE_TYPING,
+    'GUILD_SCHEDULED_EVENT_CREATE': Intents.GUILD_SCHEDULED_EVENTS,
+    'GUILD_SCHEDULED_EVENT_UPDATE': Intents.GUILD_SCHEDULED_EVENTS,
+    'GUILD_SCHEDULED_EVENT_DELETE': Intents.GUILD_SCHEDULED_EVENTS,
+    'GUILD_SCHEDULED_EVENT_USER_ADD': Intents.GUILD_SCHEDULED_EVENTS,
+    'GUILD_SCHEDULED_EVENT_USER_REMOVE': Intents.GUILD_SCHEDULED_EVENTS,
+    'AUTO_MODERATION_RULE_CREATE': Intents.AUTO_MODERATION_CONFIGURATION,
+    'AUTO_MODERATION_RULE_UPDATE': Intents.AUTO_MODERATION_CONFIGURATION,
+    'AUTO_MODERATION_RULE_DELETE': Intents.AUTO_MODERATION_CONFIGURATION,
+    'AUTO_MODERATION_ACTION_EXECUTION': Intents.AUTO_MODERATION_EXECUTION,
+}
+
+
+def intents_for(event_types: Iterable[str]) -> Intents:
+    """
+    Gets the smallest set of intents that makes discord send the given events.
+
+    ``GUILDS`` is always included, because without it discord does not send the guilds the bot is in. Privileged
+    intents (``GUILD_MEMBERS`` and ``GUILD_PRESENCES``) are included if a listed event needs them, but
+    ``MESSAGE_CONTENT`` never is. Pass it explicitly to read the content of messages.
+
+    Parameters
+    ----------
+    event_types : Iterable[:class:`str`]
+        the events, such as ``MESSAGE_CREATE``
+
+    Returns
+    -------
+    :class:`discordSplash.enums.Intents`
+    """
+    intents = Intents.GUILDS
+    for event_type in event_types:
+        intents |= EVENT_INTENTS.get(event_type, 0)
+    return intents
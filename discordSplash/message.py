@@ -1,11 +1,16 @@
-from . import user
+from . import cache
 from .request import make_request
+from .util import UNPARSED, lazy_field, optional_datetime, optional_int
 
 from dataclasses import dataclass
-from datetime import datetime
 
 
 
+def _author(data):
+    # shared with every other message by the same author
+    return cache.get_cache().store_user(data) if data is not None else None
+
+
 @dataclass(init=False, eq=False)
 class Message:
     """
@@ -104,60 +109,99 @@ class Message:
         Sent if the message contains sticker item objects
 
 
+    raw : dict
+        The message payload. ``None`` unless :attr:`keep_raw` is ``True``
+
+
     Methods
     -------
 
     """
+    __slots__ = ('id', 'channel_id', 'guild_id', '_raw_author', '_author', 'member', 'content', '_raw_timestamp',
+                 '_timestamp', '_raw_edited_timestamp', '_edited_timestamp', 'tts', 'mention_everyone', 'mentions',
+                 'mention_roles', 'mention_channels', 'attachments', 'embeds', 'reactions', 'nonce', 'pinned',
+                 'webhook_id', 'type', 'activity', 'application', '_raw_application_id', '_application_id',
+                 'message_reference', 'flags', 'referenced_message', 'interaction', 'thread', 'components',
+                 'sticker_items', 'raw')
+
+    #: whether or not new messages keep their payload in :attr:`raw`. Off by default to save memory.
+    keep_raw = False
+
+    # parsed the first time they are read
+    author = lazy_field('author', _author)
+    timestamp = lazy_field('timestamp', optional_datetime)
+    edited_timestamp = lazy_field('edited_timestamp', optional_datetime)
+    application_id = lazy_field('application_id', optional_int)
 
     def __init__(self, jsonData: dict):
-        self.messageData = jsonData
-        print("msgdata", self.messageData)
+        self.id = int(jsonData.get("id"))
+        self.channel_id = int(jsonData.get("channel_id"))
+        self.guild_id = int(jsonData.get("guild_id")) if jsonData.get("guild_id") is not None else None
+        self._update(jsonData)
+
+    def _update(self, jsonData: dict):
+        """replaces the message's data, keeping the same object"""
+        self.raw = jsonData if self.keep_raw else None
         # Message data variables
-        self.id = int(self.messageData.get("id"))
-        self.channel_id = int(self.messageData.get("channel_id"))
-        self.guild_id = int(self.messageData.get("guild_id")) if self.messageData.get("guild_id") is not None else None
-        self.author = user.User(self.messageData.get("author"))
-        self.member = self.messageData.get("member") if self.messageData.get(
+        self._raw_author = jsonData.get("author")
+        self._author = UNPARSED
+        self.member = jsonData.get("member") if jsonData.get(
             "member") is not None else None  # TODO: Add a Member object - https://discord.com/developers/docs/resources/guild#guild-member-object
-        self.content = self.messageData.get("content")
-        self.timestamp = datetime.fromisoformat(self.messageData.get("timestamp"))
-        self.edited_timestamp = datetime.fromisoformat(
-            str(self.messageData.get("edited_timestamp"))) if self.messageData.get(
-            "edited_timestamp") is not None else None
-        self.tts = self.messageData.get("tts")
-        self.mention_everyone = self.messageData.get("mention_everyone")
-        self.mentions = self.messageData.get("mentions")
-        self.mention_roles = self.messageData.get(
+        self.content = jsonData.get("content")
+        self._raw_timestamp = jsonData.get("timestamp")
+        self._timestamp = UNPARSED
+        self._raw_edited_timestamp = jsonData.get("edited_timestamp")
+        self._edited_timestamp = UNPARSED
+        self.tts = jsonData.get("tts")
+        self.mention_everyone = jsonData.get("mention_everyone")
+        self.mentions = jsonData.get("mentions")
+        self.mention_roles = jsonData.get(
             "mention_roles")  # TODO: Add a Role object - https://discord.com/developers/docs/topics/permissions#role-object
-        self.mention_channels = self.messageData.get(
+        self.mention_channels = jsonData.get(
             "mention_channels")  # TODO: Add a Channel Mention object - https://discord.com/developers/docs/resources/channel#channel-mention-object
-        self.attachments = self.messageData.get(
+        self.attachments = jsonData.get(
             "attachments")  # TODO: Add an Attachment object - https://discord.com/developers/docs/resources/channel#attachment-object
-        self.embeds = self.messageData.get(
+        self.embeds = jsonData.get(
             "embeds")  # TODO: Add an Embed object - https://discord.com/developers/docs/resources/channel#embed-object
-        self.reactions = self.messageData.get(
+        self.reactions = jsonData.get(
             "reactions")  # TODO: Add a Reaction object - https://discord.com/developers/docs/resources/channel#reaction-object
-        self.nonce = self.messageData.get("nonce")
-        self.pinned = self.messageData.get("pinned")
-        self.webhook_id = self.messageData.get("webhook_id")
-        self.type = self.messageData.get("type")
-        self.activity = self.messageData.get(
+        self.nonce = jsonData.get("nonce")
+        self.pinned = jsonData.get("pinned")
+        self.webhook_id = jsonData.get("webhook_id")
+        self.type = jsonData.get("type")
+        self.activity = jsonData.get(
             "activity")  # TODO: Add a Message Activity oject - https://discord.com/developers/docs/resources/channel#message-object-message-activity-structure
-        self.application = self.messageData.get(
+        self.application = jsonData.get(
             "application")  # TODO: Add an Application object - https://discord.com/developers/docs/resources/application#application-object
-        self.application_id = int(self.messageData.get("application_id")) if self.messageData.get(
-            "application_id") is not None else None
-        self.message_reference = self.messageData.get(
+        self._raw_application_id = jsonData.get("application_id")
+        self._application_id = UNPARSED
+        self.message_reference = jsonData.get(
             "message_reference")  # TODO: Add a Message Reference object - https://discord.com/developers/docs/resources/channel#message-reference-object-message-reference-structure
-        self.flags = self.messageData.get("flags")
-        self.referenced_message = self.messageData.get("referenced_message")
-        self.interaction = self.messageData.get(
+        self.flags = jsonData.get("flags")
+        self.referenced_message = jsonData.get("referenced_message")
+        self.interaction = jsonData.get(
             "interaction")  # TODO: Add a Message Interaction object - https://discord.com/developers/docs/interactions/receiving-and-responding#message-interaction-object-message-interaction-structure
-        self.thread = self.messageData.get("thread")
-        self.components = self.messageData.get("components")
-        self.sticker_items = self.messageData.get(
+        self.thread = jsonData.get("thread")
+        self.components = jsonData.get("components")
+        self.sticker_items = jsonData.get(
             "sticker_items")  # TODO: Add a Sticker Item object - https://discord.com/developers/docs/resources/sticker#sticker-item-object
 
+    @property
+    def messageData(self):
+        """alias of :attr:`raw`"""
+        return self.raw
+
+    def _apply_update(self, data: dict):
+        """applies a partial MESSAGE_UPDATE payload in place. fields missing from ``data`` keep their value."""
+        for key, value in data.items():
+            if key in _LAZY_FIELDS:
+                setattr(self, f"_raw_{key}", value)
+                setattr(self, f"_{key}", UNPARSED)
+            elif key in _FIELDS and key not in _IMMUTABLE_FIELDS:
+                setattr(self, key, value)
+        if self.raw is not None:
+            self.raw.update(data)
+
     async def delete(self):
         """Deletes the message"""
         await make_request("DELETE", f"/channels/{self.channel_id}/messages/{self.id}", guild_id=self.guild_id,
@@ -178,3 +222,94 @@ class Message:
         jsondata["message_reference"] = {"message_id": self.id}
         jsondata["content"] = content
         return Message(await make_request("POST", f"/channels/{self.channel_id}/messages", json=jsondata))
+
+
+# which fields MESSAGE_UPDATE can change
+_LAZY_FIELDS = frozenset(('author', 'timestamp', 'edited_timestamp', 'application_id'))
+_FIELDS = frozenset(Message.__slots__)
+_IMMUTABLE_FIELDS = frozenset(('id', 'channel_id', 'guild_id', 'raw'))
+
+
+@dataclass(init=False, eq=False)
+class MessageUpdate:
+    """
+    Passed to MESSAGE_UPDATE listeners
+
+    Attributes
+    ----------
+    id : int
+        ID of the message
+
+    channel_id : int
+        ID of the channel the message is in
+
+    guild_id : int
+        ID of the guild the message is in. ``None`` in DMs
+
+    data : dict
+        the partial message discord sent. Only the fields that changed are guaranteed to be in it.
+
+    cached_message : Message
+        the cached message, already updated with ``data``. ``None`` if the message was not cached.
+    """
+
+    def __init__(self, data: dict, cached_message=None):
+        self.id = int(data["id"])
+        self.channel_id = int(data["channel_id"])
+        self.guild_id = int(data["guild_id"]) if data.get("guild_id") is not None else None
+        self.data = data
+        self.cached_message = cached_message
+
+
+@dataclass(init=False, eq=False)
+class MessageDelete:
+    """
+    Passed to MESSAGE_DELETE listeners
+
+    Attributes
+    ----------
+    id : int
+        ID of the deleted message
+
+    channel_id : int
+        ID of the channel the message was in
+
+    guild_id : int
+        ID of the guild the message was in. ``None`` in DMs
+
+    cached_message : Message
+        the deleted message. ``None`` if it was not cached.
+    """
+
+    def __init__(self, data: dict, cached_message=None):
+        self.id = int(data["id"])
+        self.channel_id = int(data["channel_id"])
+        self.guild_id = int(data["guild_id"]) if data.get("guild_id") is not None else None
+        self.cached_message = cached_message
+
+
+@dataclass(init=False, eq=False)
+class MessageBulkDelete:
+    """
+    Passed to MESSAGE_DELETE_BULK listeners
+
+    Attributes
+    ----------
+    ids : list
+        IDs of the deleted messages
+
+    channel_id : int
+        ID of the channel the messages were in
+
+    guild_id : int
+        ID of the guild the messages were in
+
+    cached_messages : list
+        the deleted messages that were cached
+    """
+
+    def __init__(self, data: dict, cached_messages=None):
+        self.ids = [int(message_id) for message_id in data["ids"]]
+        self.channel_id = int(data["channel_id"])
+        self.guild_id = int(data["guild_id"]) if data.get("guild_id") is not None else None
+        self.cached_messages = cached_messages if cached_messages is not None else []
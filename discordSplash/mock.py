@@ -0,0 +1,590 @@
+# Copyright (C) 2021-Present Mineinjava
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Local stand-ins for discord's gateway and HTTP API.
+
+:class:`MockGateway` speaks the gateway protocol (HELLO, IDENTIFY, RESUME, heartbeats, ``json`` and ``etf``
+encodings and ``zlib-stream`` compression) and lets a test send events and force reconnects. :class:`MockAPI`
+answers HTTP requests with discord's ``X-RateLimit-*`` headers, and with 429s once a bucket or the global limit is
+used up. Together they let the reconnect, ratelimit and dispatch code be tested (and load tested) offline.
+
+.. Hint::
+    Example Code:
+
+    .. code:: python
+
+        gateway, api = MockGateway(), MockAPI()
+        await gateway.start()
+        await api.start()
+        bot = GatewayBot(TOKEN, gateway=gateway.url, api_url=api.url)
+        asyncio.ensure_future(bot._run(update_commands=False))
+
+        await gateway.wait_for_connections()
+        await gateway.flood('MESSAGE_CREATE', message, 10000)
+        await gateway.reconnect()
+"""
+import asyncio
+import collections
+import hashlib
+import math
+import time
+import typing
+import uuid
+import zlib
+from typing import Callable, Dict, List, Optional, Tuple, Union
+from urllib.parse import parse_qs, urlsplit
+
+import websockets
+from aiohttp import web
+from websockets.exceptions import ConnectionClosed
+
+from . import codec, etf, ratelimit
+from .enums import Opcodes
+from .request import _GLOBAL_EXEMPT_ROUTES
+from .snowflake import DISCORD_EPOCH
+
+# events are sent in batches of this many before the event loop gets a chance to run something else
+_FLOOD_BATCH = 100
+
+_DEFAULT_USER = {'id': '800000000000000000', 'username': 'mock', 'discriminator': '0000', 'avatar': None,
+                 'bot': True}
+
+
+class _Session:
+    """a gateway session, which outlives the connections that resume it"""
+
+    def __init__(self, session_id: str, buffer_size: int):
+        self.id = session_id
+        self.sequence = 0
+        # the connection the session is on. ``None`` while the bot is disconnected.
+        self.connection: Optional[_Connection] = None
+        # events that can be replayed on RESUME, as (sequence, event type, data)
+        self.sent: typing.Deque[Tuple[int, str, dict]] = collections.deque(maxlen=buffer_size)
+
+
+class _Connection:
+    """one websocket connection to the mock gateway"""
+
+    def __init__(self, websocket, encoding: str, compress: bool):
+        self.websocket = websocket
+        self.encoding = encoding
+        self.session: Optional[_Session] = None
+        self._compressor = zlib.compressobj() if compress else None
+
+    def decode(self, message: Union[str, bytes]) -> dict:
+        return etf.decode(message) if self.encoding == 'etf' else codec.loads(message)
+
+    def encode(self, payload: dict) -> Union[str, bytes]:
+        return self._compress(etf.encode(payload) if self.encoding == 'etf' else codec.dumps(payload))
+
+    def encode_dispatch(self, event_type: str, sequence: int, data, encoded: Optional[str] = None):
+        if self.encoding == 'etf':
+            return self._compress(etf.encode({'t': event_type, 's': sequence, 'op': Opcodes.DISPATCH, 'd': data}))
+        if encoded is None:
+            encoded = codec.dumps(data)
+        # in the order discord sends the keys in, so bots can skip events without decoding them
+        return self._compress(f'{{"t":"{event_type}","s":{sequence},"op":0,"d":{encoded}}}')
+
+    def _compress(self, frame: Union[str, bytes]) -> Union[str, bytes]:
+        if self._compressor is None:
+            return frame
+        if isinstance(frame, str):
+            frame = frame.encode('utf-8')
+        return self._compressor.compress(frame) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    async def send(self, payload: dict) -> None:
+        await self.websocket.send(self.encode(payload))
+
+
+class MockGateway:
+    """
+    Websocket server that behaves like discord's gateway.
+
+    A connection gets HELLO straight away. IDENTIFY starts a new session and is answered with READY (and a
+    GUILD_CREATE for each of ``guilds``). RESUME replays the events the bot missed followed by RESUMED, or sends
+    INVALID_SESSION if the session is unknown or the missed events are no longer buffered. Heartbeats are
+    acknowledged while :attr:`ack_heartbeats` is ``True``. The encoding and compression of a connection are taken
+    from its url, like discord does.
+
+    Events are only sent when the test asks for them, with :meth:`dispatch` and :meth:`flood`. They go to every
+    session, and like on discord, a session that is disconnected buffers them until it is resumed. :meth:`reconnect`,
+    :meth:`invalidate_session` and :meth:`disconnect` force the bot down its reconnect paths.
+
+    Parameters
+    ----------
+    token : Optional[:class:`str`]
+        token IDENTIFY and RESUME must send. Connections with another token are closed with ``4004``.
+        Defaults to ``None``, which accepts any token.
+
+    heartbeat_interval : Optional[:class:`int`]
+        heartbeat interval sent in HELLO, in milliseconds. Defaults to ``41250``
+
+    user : Optional[:class:`dict`]
+        the bot's user, sent in READY
+
+    guilds : Optional[Iterable[:class:`dict`]]
+        GUILD_CREATE payloads sent after READY
+
+    resume_buffer : Optional[:class:`int`]
+        number of events kept per session to replay on RESUME. Defaults to ``10000``
+
+    Attributes
+    ----------
+    url : Optional[:class:`str`]
+        url to pass to :class:`discordSplash.GatewayBot` as ``gateway``. ``None`` until the server is started.
+
+    ack_heartbeats : :class:`bool`
+        whether or not heartbeats are acknowledged. Set it to ``False`` to make connections look like zombies.
+
+    identifies : :class:`int`
+        number of sessions started with IDENTIFY
+
+    resumes : :class:`int`
+        number of sessions resumed
+
+    heartbeats : :class:`int`
+        number of heartbeats received
+
+    dispatched : :class:`int`
+        number of events sent, not counting replayed ones
+    """
+
+    def __init__(self, token: Optional[str] = None, heartbeat_interval: int = 41250, user: Optional[dict] = None,
+                 guilds: typing.Iterable[dict] = (), resume_buffer: int = 10000):
+        self.token = token
+        self.heartbeat_interval = heartbeat_interval
+        self.user = user if user is not None else dict(_DEFAULT_USER)
+        self.guilds = list(guilds)
+        self.resume_buffer = resume_buffer
+        self.ack_heartbeats = True
+        self.url: Optional[str] = None
+
+        self.identifies = 0
+        self.resumes = 0
+        self.heartbeats = 0
+        self.dispatched = 0
+
+        self._sessions: Dict[str, _Session] = {}
+        self._server = None
+        self._changed: Optional[asyncio.Condition] = None
+
+    @property
+    def connections(self) -> int:
+        """number of sessions that are connected"""
+        return sum(1 for session in self._sessions.values() if session.connection is not None)
+
+    def _open_connections(self) -> List[_Connection]:
+        return [session.connection for session in self._sessions.values() if session.connection is not None]
+
+    def _condition(self) -> asyncio.Condition:
+        # created on first use, so it belongs to the running event loop
+        if self._changed is None:
+            self._changed = asyncio.Condition()
+        return self._changed
+
+    async def _notify(self) -> None:
+        condition = self._condition()
+        async with condition:
+            condition.notify_all()
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> None:
+        """starts serving. A free port is picked if ``port`` is ``0``. Returns once the server is listening."""
+        # discord does not negotiate permessage-deflate, so neither does the mock
+        self._server = await websockets.serve(self._handle, host, port, max_size=None, compression=None)
+        port = next(iter(self._server.sockets)).getsockname()[1]
+        self.url = f'ws://{host}:{port}'
+
+    async def close(self) -> None:
+        """closes every connection and stops serving"""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        self._sessions.clear()
+
+    async def wait_for_connections(self, count: int = 1, timeout: Optional[float] = 10.0) -> None:
+        """
+        Waits until ``count`` sessions are connected (have identified or resumed).
+
+        Raises
+        ------
+        asyncio.TimeoutError
+            if they did not within ``timeout`` seconds
+        """
+        condition = self._condition()
+        async with condition:
+            await asyncio.wait_for(condition.wait_for(lambda: self.connections >= count), timeout)
+
+    async def _handle(self, websocket, path: Optional[str] = None) -> None:
+        if path is None:
+            # websockets >= 13 passes the request instead of the path
+            request = getattr(websocket, 'request', None)
+            path = request.path if request is not None else websocket.path
+        query = parse_qs(urlsplit(path).query)
+        connection = _Connection(websocket, query.get('encoding', ['json'])[0],
+                                 query.get('compress', [None])[0] == 'zlib-stream')
+        try:
+            await connection.send({'op': Opcodes.HELLO, 'd': {'heartbeat_interval': self.heartbeat_interval}})
+            async for message in websocket:
+                payload = connection.decode(message)
+                op = payload.get('op')
+                if op == Opcodes.HEARTBEAT:
+                    self.heartbeats += 1
+                    if self.ack_heartbeats:
+                        await connection.send({'op': Opcodes.HEARTBEAT_ACK, 'd': None})
+                elif op == Opcodes.IDENTIFY:
+                    await self._identify(connection, payload['d'])
+                elif op == Opcodes.RESUME:
+                    await self._resume(connection, payload['d'])
+        except ConnectionClosed:
+            pass
+        finally:
+            session = connection.session
+            if session is not None and session.connection is connection:
+                session.connection = None
+                await self._notify()
+
+    async def _check_token(self, connection: _Connection, data: dict) -> bool:
+        if self.token is None or data.get('token') == self.token:
+            return True
+        await connection.websocket.close(4004, 'Authentication failed.')
+        return False
+
+    async def _identify(self, connection: _Connection, data: dict) -> None:
+        if not await self._check_token(connection, data):
+            return
+        session = _Session(uuid.uuid4().hex, self.resume_buffer)
+        connection.session = session
+        session.connection = connection
+        self.identifies += 1
+        ready = {'v': 9, 'user': self.user, 'session_id': session.id, 'resume_gateway_url': self.url,
+                 'guilds': [{'id': guild['id'], 'unavailable': True} for guild in self.guilds],
+                 'application': {'id': self.user['id'], 'flags': 0}}
+        if 'shard' in data:
+            ready['shard'] = data['shard']
+        await self._send_event(session, 'READY', ready)
+        for guild in self.guilds:
+            await self._send_event(session, 'GUILD_CREATE', guild)
+        # the session only gets other events once it is ready
+        self._sessions[session.id] = session
+        await self._notify()
+
+    async def _resume(self, connection: _Connection, data: dict) -> None:
+        if not await self._check_token(connection, data):
+            return
+        session = self._sessions.get(data.get('session_id'))
+        sequence = data.get('seq') or 0
+        # the events after the bot's sequence must all still be buffered
+        if session is None or sequence > session.sequence or \
+                (session.sent and session.sent[0][0] > sequence + 1) or \
+                (not session.sent and session.sequence > sequence):
+            await connection.send({'op': Opcodes.INVALID_SESSION, 'd': False})
+            return
+        # the old connection of the session (if it is still open) is dead to the bot
+        session.connection = None
+        connection.session = session
+        self.resumes += 1
+        for missed_sequence, event_type, event in list(session.sent):
+            if missed_sequence > sequence:
+                await connection.websocket.send(connection.encode_dispatch(event_type, missed_sequence, event))
+        session.connection = connection
+        await self._send_event(session, 'RESUMED', None)
+        await self._notify()
+
+    async def _send_event(self, session: _Session, event_type: str, data, encoded: Optional[str] = None) -> None:
+        session.sequence += 1
+        session.sent.append((session.sequence, event_type, data))
+        self.dispatched += 1
+        connection = session.connection
+        if connection is None:
+            return
+        try:
+            await connection.websocket.send(connection.encode_dispatch(event_type, session.sequence, data, encoded))
+        except ConnectionClosed:
+            # buffered, so it is sent again if the session is resumed
+            pass
+
+    async def dispatch(self, event_type: str, data) -> int:
+        """
+        Sends an event to every session.
+
+        Returns
+        -------
+        :class:`int`
+            number of sessions the event was sent (or buffered) for
+        """
+        sessions = list(self._sessions.values())
+        for session in sessions:
+            await self._send_event(session, event_type, data)
+        return len(sessions)
+
+    async def flood(self, event_type: str, data: Union[dict, Callable[[int], dict]], count: int,
+                    rate: Optional[float] = None) -> int:
+        """
+        Sends many events to every session, as fast as the connections take them or at a steady rate.
+
+        Parameters
+        ----------
+        event_type : :class:`str`
+            type of the events, such as ``MESSAGE_CREATE``
+
+        data : Union[:class:`dict`, Callable[[:class:`int`], :class:`dict`]]
+            data of every event, or a function that makes the data of the ``i``\\ th event. Fixed data is only
+            encoded once.
+
+        count : :class:`int`
+            number of events to send to each session
+
+        rate : Optional[:class:`float`]
+            events per second. Defaults to ``None``, which sends them as fast as possible.
+
+        Returns
+        -------
+        :class:`int`
+            number of events sent (or buffered), across all sessions
+        """
+        make = data if callable(data) else None
+        encoded = codec.dumps(data) if make is None else None
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        sent = 0
+        for i in range(count):
+            event = make(i) if make is not None else data
+            for session in list(self._sessions.values()):
+                await self._send_event(session, event_type, event, encoded)
+                sent += 1
+            if (i + 1) % _FLOOD_BATCH == 0:
+                # let the bot (and anything else on this event loop) run
+                delay = start + (i + 1) / rate - loop.time() if rate else 0
+                await asyncio.sleep(max(0, delay))
+        return sent
+
+    async def reconnect(self) -> None:
+        """
+        Sends RECONNECT to every connection, so the bots resume on new ones. Events sent after it are buffered for
+        the resume.
+        """
+        for connection in self._open_connections():
+            connection.session.connection = None
+            try:
+                await connection.send({'op': Opcodes.RECONNECT, 'd': None})
+            except ConnectionClosed:
+                pass
+
+    async def invalidate_session(self, resumable: bool = False) -> None:
+        """
+        Sends INVALID_SESSION to every connection. Sessions that are not ``resumable`` are forgotten, so the bots
+        have to identify again.
+        """
+        for connection in self._open_connections():
+            connection.session.connection = None
+            if not resumable:
+                self._sessions.pop(connection.session.id, None)
+            try:
+                await connection.send({'op': Opcodes.INVALID_SESSION, 'd': resumable})
+            except ConnectionClosed:
+                pass
+
+    async def disconnect(self, code: int = 4000, reason: str = '') -> None:
+        """
+        Closes every connection with a close code. ``4000`` lets the bots resume; codes such as ``4004`` are fatal.
+        """
+        for connection in self._open_connections():
+            await connection.websocket.close(code, reason)
+
+
+class MockAPI:
+    """
+    aiohttp server that answers like discord's HTTP API, ratelimits included.
+
+    Every route (method and route template, see :func:`discordSplash.ratelimit.route_template`) has a bucket of
+    ``limit`` requests per ``per`` seconds for each major parameter. Responses carry the ``X-RateLimit-Limit``,
+    ``-Remaining``, ``-Reset``, ``-Reset-After`` and ``-Bucket`` headers, and a request over the limit gets a 429
+    with ``Retry-After``, ``X-RateLimit-Scope`` and a ``retry_after`` body. Requests over ``global_limit`` per second
+    get a global 429 (``X-RateLimit-Global``). Interaction and webhook token routes are exempt from the global
+    limit, like on discord.
+
+    Responses come from :attr:`responses` if the route is in it. Otherwise ``/gateway`` and ``/gateway/bot`` return
+    ``gateway_url``, ``DELETE`` returns 204, ``POST`` and ``PATCH`` echo the request body with an ``id`` added,
+    ``PUT`` echoes the request body and ``GET`` returns ``{}``.
+
+    Parameters
+    ----------
+    token : Optional[:class:`str`]
+        token requests must be authorized with. Defaults to ``None``, which accepts any request.
+
+    limit : Optional[:class:`int`]
+        requests per bucket window. Defaults to ``5``
+
+    per : Optional[:class:`float`]
+        length of a bucket window in seconds. Defaults to ``1.0``
+
+    limits : Optional[Dict[:class:`str`, Tuple[:class:`int`, :class:`float`]]]
+        ``(limit, per)`` of routes with their own limits, by method and route template, such as
+        ``{'POST /channels/{channel_id}/messages': (5, 5.0)}``
+
+    global_limit : Optional[:class:`int`]
+        requests per second across all routes. Defaults to ``50``, ``None`` turns the global limit off.
+
+    gateway_url : Optional[:class:`str`]
+        url returned by ``/gateway`` and ``/gateway/bot``, such as :attr:`MockGateway.url`
+
+    shards : Optional[:class:`int`]
+        shard count returned by ``/gateway/bot``. Defaults to ``1``
+
+    latency : Optional[:class:`float`]
+        seconds every response is delayed by. Defaults to ``0``
+
+    Attributes
+    ----------
+    url : Optional[:class:`str`]
+        url to pass as ``api_url``. ``None`` until the server is started.
+
+    responses : Dict[:class:`str`, Any]
+        bodies of routes, by method and route template. A callable is called with the route and the decoded request
+        body and returns the body. A ``None`` body is sent as a 204.
+
+    requests : :class:`int`
+        number of requests received
+
+    rate_limited : :class:`int`
+        number of 429s sent because a bucket was empty
+
+    global_rate_limited : :class:`int`
+        number of 429s sent because of the global limit
+    """
+
+    #: path the API is served under
+    prefix = '/api/v9'
+
+    def __init__(self, token: Optional[str] = None, limit: int = 5, per: float = 1.0,
+                 limits: Optional[Dict[str, Tuple[int, float]]] = None, global_limit: Optional[int] = 50,
+                 gateway_url: Optional[str] = None, shards: int = 1, latency: float = 0.0):
+        self.token = token
+        self.limit = limit
+        self.per = per
+        self.limits = dict(limits or {})
+        self.global_limit = global_limit
+        self.gateway_url = gateway_url
+        self.shards = shards
+        self.latency = latency
+        self.responses: Dict[str, typing.Any] = {}
+        self.url: Optional[str] = None
+
+        self.requests = 0
+        self.rate_limited = 0
+        self.global_rate_limited = 0
+
+        # [remaining, monotonic reset time] of every bucket, by (bucket hash, major parameter)
+        self._buckets: Dict[Tuple[str, str], List[float]] = {}
+        self._global_count = 0
+        self._global_reset = 0.0
+        self._runner: Optional[web.AppRunner] = None
+
+    def make_app(self) -> web.Application:
+        """makes an :class:`aiohttp.web.Application` serving every route under :attr:`prefix`"""
+        app = web.Application()
+        app.router.add_route('*', self.prefix + '/{route:.*}', self.handle)
+        return app
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> None:
+        """starts serving. A free port is picked if ``port`` is ``0``. Returns once the server is listening."""
+        self._runner = web.AppRunner(self.make_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        self.url = f'http://{host}:{port}{self.prefix}'
+
+    async def close(self) -> None:
+        """stops serving"""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    @staticmethod
+    def _json(body, status: int = 200, headers: Optional[dict] = None) -> web.Response:
+        if body is None and status == 200:
+            return web.Response(status=204, headers=headers)
+        return web.Response(status=status, body=codec.dumps(body).encode('utf-8'), headers=headers,
+                            content_type='application/json')
+
+    def _too_many(self, retry_after: float, scope: str, headers: dict) -> web.Response:
+        headers['Retry-After'] = str(math.ceil(retry_after))
+        headers['X-RateLimit-Scope'] = scope
+        is_global = scope == 'global'
+        body = {'message': 'You are being rate limited.', 'retry_after': round(retry_after, 3), 'global': is_global}
+        return self._json(body, 429, headers)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        """the aiohttp handler of every route"""
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.token is not None and request.headers.get('Authorization') != f'Bot {self.token}':
+            return self._json({'message': '401: Unauthorized', 'code': 0}, 401)
+
+        route = request.path[len(self.prefix):]
+        template, major = ratelimit.route_template(route)
+        key = f'{request.method} {template}'
+        now = time.monotonic()
+
+        if self.global_limit is not None and not template.startswith(_GLOBAL_EXEMPT_ROUTES):
+            if now >= self._global_reset:
+                self._global_count, self._global_reset = 0, now + 1.0
+            self._global_count += 1
+            if self._global_count > self.global_limit:
+                self.global_rate_limited += 1
+                return self._too_many(self._global_reset - now, 'global', {'X-RateLimit-Global': 'true'})
+
+        limit, per = self.limits.get(key, (self.limit, self.per))
+        bucket_hash = hashlib.sha1(key.encode()).hexdigest()[:16]
+        bucket = self._buckets.get((bucket_hash, major))
+        if bucket is None or now >= bucket[1]:
+            bucket = self._buckets[bucket_hash, major] = [limit, now + per]
+        reset_after = bucket[1] - now
+        headers = {'X-RateLimit-Limit': str(limit), 'X-RateLimit-Bucket': bucket_hash,
+                   'X-RateLimit-Reset': f'{time.time() + reset_after:.3f}',
+                   'X-RateLimit-Reset-After': f'{reset_after:.3f}'}
+        if bucket[0] <= 0:
+            self.rate_limited += 1
+            headers['X-RateLimit-Remaining'] = '0'
+            return self._too_many(reset_after, 'user', headers)
+        bucket[0] -= 1
+        headers['X-RateLimit-Remaining'] = str(int(bucket[0]))
+
+        raw = await request.read()
+        payload = codec.loads(raw) if raw else None
+        return self._json(self._respond(request.method, key, route, payload), headers=headers)
+
+    def _respond(self, method: str, key: str, route: str, payload):
+        if key in self.responses:
+            response = self.responses[key]
+            return response(route, payload) if callable(response) else response
+        if key in ('GET /gateway', 'GET /gateway/bot'):
+            gateway = {'url': self.gateway_url or 'wss://gateway.discord.gg'}
+            if key == 'GET /gateway/bot':
+                gateway['shards'] = self.shards
+                gateway['session_start_limit'] = {'total': 1000, 'remaining': 1000, 'reset_after': 86400000,
+                                                  'max_concurrency': 1}
+            return gateway
+        if method == 'DELETE':
+            return None
+        if method in ('POST', 'PATCH') and isinstance(payload, dict):
+            snowflake = ((int(time.time() * 1000) - DISCORD_EPOCH) << 22) | (self.requests & 0xFFF)
+            return dict(payload, id=str(snowflake))
+        if method in ('POST', 'PATCH', 'PUT'):
+            return payload
+        return {}
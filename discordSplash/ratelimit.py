@@ -0,0 +1,333 @@
+# Copyright (C) 2021-Present Mineinjava
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Ratelimit handling for requests to the discord api.
+
+Routes are mapped to the bucket hash discord sends in the ``X-RateLimit-Bucket`` header. Requests in the same
+bucket (and with the same major parameters) wait in a FIFO queue instead of sleeping blindly.
+
+All requests also go through :data:`global_ratelimit`, which enforces discord's global limit.
+"""
+import asyncio
+import contextlib
+import re
+import time
+import typing
+from typing import Optional, Tuple
+
+# matches the major parameter (and webhook token) at the start of a route
+_MAJOR_ROUTE = re.compile(r'^/(channels|guilds|webhooks|interactions)/(\d+)(?:/([^/]+))?')
+_SNOWFLAKE = re.compile(r'/\d+(?=/|$)')
+
+
+def route_template(route: str) -> Tuple[str, str]:
+    """
+    Splits a formatted route into its template and major parameter
+
+    Parameters
+    ----------
+    route : :class:`str`
+        formatted route, such as ``/channels/1234/messages/5678``
+
+    Returns
+    -------
+    Tuple[:class:`str`, :class:`str`]
+        the template (``/channels/{channel_id}/messages/{id}``) and the major parameter (``1234``)
+    """
+    route = route.split('?', 1)[0]
+    major = ''
+    rest = route
+    match = _MAJOR_ROUTE.match(route)
+    if match is not None:
+        kind, major, token = match.groups()
+        prefix = f"/{kind}/{{{kind[:-1]}_id}}"
+        rest = route[match.end():]
+        # webhook and interaction tokens are part of the major parameter
+        if kind in ('webhooks', 'interactions') and token is not None and not token.isdigit():
+            major = f"{major}/{token}"
+            prefix += "/{token}"
+        elif token is not None:
+            rest = f"/{token}{rest}"
+        route = prefix + _SNOWFLAKE.sub('/{id}', rest)
+        return route, major
+    return _SNOWFLAKE.sub('/{id}', route), major
+
+
+class Bucket:
+    """
+    A single ratelimit bucket.
+
+    Requests acquire the bucket in FIFO order. While the limits of the bucket are unknown only one request is let
+    through at a time, so the first response can tell us what the limits are.
+
+    Attributes
+    ----------
+    limit : Optional[:class:`int`]
+        number of requests allowed per window. ``None`` until the first response.
+
+    remaining : Optional[:class:`int`]
+        number of requests left in the current window.
+
+    reset_at : :class:`float`
+        :func:`time.monotonic` time at which the current window resets.
+
+    unlimited : :class:`bool`
+        whether or not a successful response of the route had no ratelimit headers.
+    """
+
+    def __init__(self):
+        self.limit: Optional[int] = None
+        self.remaining: Optional[int] = None
+        self.reset_at: float = 0.0
+        self.unlimited: bool = False
+        self.lock = asyncio.Lock()
+
+    @property
+    def waiting(self) -> bool:
+        """whether or not any request is holding or waiting on the bucket"""
+        return self.lock.locked()
+
+    def expired(self, now: float) -> bool:
+        """whether or not the window of the bucket has reset"""
+        return now >= self.reset_at
+
+    async def acquire(self) -> bool:
+        """
+        Waits until a request can be made in this bucket
+
+        Returns
+        -------
+        :class:`bool`
+            whether the lock is still held. It is held until the response comes back if the limits or the reset
+            time of the current window are unknown.
+        """
+        if self.unlimited:
+            return False
+
+        await self.lock.acquire()
+        try:
+            delay = self.reset_at - time.monotonic()
+            if self.remaining is not None and self.remaining <= 0 and delay > 0:
+                await asyncio.sleep(delay)
+        except BaseException:
+            self.lock.release()
+            raise
+
+        if self.limit is None:
+            return True
+
+        if time.monotonic() >= self.reset_at:
+            # the window has reset. hold the bucket until the response tells us when the next reset is.
+            self.remaining = self.limit - 1
+            return True
+
+        self.remaining -= 1
+        self.lock.release()
+        return False
+
+    def update(self, headers: typing.Mapping[str, str], status: int = 200) -> None:
+        """
+        Updates the bucket from the ``X-RateLimit-*`` headers of a response.
+
+        Parameters
+        ----------
+        headers : Mapping[:class:`str`, :class:`str`]
+            headers of the response
+
+        status : Optional[:class:`int`]
+            status code of the response. Defaults to ``200``
+        """
+        if 'X-RateLimit-Limit' not in headers:
+            # only mark the route as unlimited if we never saw a limit on it. error pages (a 5xx, or one from
+            # cloudflare) have no ratelimit headers either, so they do not count.
+            if self.limit is None and 200 <= status < 300:
+                self.unlimited = True
+            return
+
+        self.unlimited = False
+
+        limit = int(headers['X-RateLimit-Limit'])
+        remaining = int(headers.get('X-RateLimit-Remaining', limit))
+        reset_at = time.monotonic() + float(headers.get('X-RateLimit-Reset-After', 0))
+
+        if reset_at < self.reset_at - 0.1:
+            # a late response from a window that has already reset
+            return
+        if self.remaining is None or reset_at > self.reset_at + 0.1:
+            # first response or a new window
+            self.remaining = remaining
+        else:
+            # responses can arrive out of order. trust whichever count is lower.
+            self.remaining = min(self.remaining, remaining)
+        self.limit = limit
+        self.reset_at = reset_at
+
+    def defer(self, retry_after: float) -> None:
+        """
+        Empties the bucket until ``retry_after`` seconds from now. Used when a 429 is received.
+        """
+        self.unlimited = False
+        self.remaining = 0
+        self.reset_at = max(self.reset_at, time.monotonic() + retry_after)
+        if self.limit is None:
+            self.limit = 1
+
+
+class RateLimiter:
+    """
+    Maps routes to :class:`Bucket` s using the bucket hashes discord returns.
+
+    Attributes
+    ----------
+    buckets : Dict[:class:`str`, :class:`Bucket`]
+        buckets keyed by ``hash:major`` (or ``route:major`` until the hash is known)
+
+    hashes : Dict[:class:`str`, :class:`str`]
+        bucket hash of every route that has been requested
+    """
+
+    #: number of buckets that are kept before expired ones are dropped
+    max_idle_buckets = 1024
+
+    def __init__(self):
+        self.buckets: typing.Dict[str, Bucket] = dict()
+        self.hashes: typing.Dict[str, str] = dict()
+
+    def _key(self, route: str, major: str) -> str:
+        bucket_hash = self.hashes.get(route)
+        if bucket_hash is None:
+            return f"{route}:{major}"
+        return f"{bucket_hash}:{major}"
+
+    def get_bucket(self, route: str, major: str) -> Bucket:
+        """
+        Gets the bucket for a route
+
+        Parameters
+        ----------
+        route : :class:`str`
+            method and route template, such as ``POST /channels/{channel_id}/messages``
+
+        major : :class:`str`
+            major parameter of the route
+
+        Returns
+        -------
+        :class:`Bucket`
+        """
+        key = self._key(route, major)
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            if len(self.buckets) >= self.max_idle_buckets:
+                self.prune()
+            bucket = self.buckets[key] = Bucket()
+        return bucket
+
+    def prune(self) -> None:
+        """drops buckets that have reset and that nothing is waiting on"""
+        now = time.monotonic()
+        for key in [key for key, bucket in self.buckets.items() if bucket.expired(now) and not bucket.waiting]:
+            del self.buckets[key]
+
+    def update(self, route: str, major: str, bucket: Bucket, headers: typing.Mapping[str, str],
+               status: int = 200) -> None:
+        """
+        Updates a bucket from a response, and maps the route to the bucket hash discord returned.
+        """
+        bucket.update(headers, status)
+
+        bucket_hash = headers.get('X-RateLimit-Bucket')
+        if bucket_hash is None or self.hashes.get(route) == bucket_hash:
+            return
+
+        old_key = self._key(route, major)
+        self.hashes[route] = bucket_hash
+        # routes that share a hash share a bucket. keep the existing one if there is one.
+        self.buckets.setdefault(self._key(route, major), bucket)
+        if self.buckets.get(old_key) is bucket:
+            del self.buckets[old_key]
+
+    @contextlib.asynccontextmanager
+    async def acquire(self, route: str, major: str):
+        """
+        Waits for the bucket of a route and yields it.
+
+        Usage::
+
+            async with limiter.acquire(route, major) as bucket:
+                response = ...
+                limiter.update(route, major, bucket, response.headers, response.status)
+        """
+        bucket = self.get_bucket(route, major)
+        held = await bucket.acquire()
+        try:
+            yield bucket
+        finally:
+            if held:
+                bucket.lock.release()
+
+
+class GlobalRateLimit:
+    """
+    Gate for discord's global ratelimit, shared by every bucket.
+
+    Requests are spread out to at most ``rate`` per ``per`` seconds. When discord reports that the global limit was
+    hit (``X-RateLimit-Global``), every request is paused until the ``retry_after`` has passed.
+
+    Parameters
+    ----------
+    rate : :class:`int`
+        number of requests allowed per ``per`` seconds. Defaults to ``50``
+
+    per : :class:`float`
+        length of the window in seconds. Defaults to ``1``
+
+    Attributes
+    ----------
+    paused_until : :class:`float`
+        :func:`time.monotonic` time until which all requests are paused.
+    """
+
+    def __init__(self, rate: int = 50, per: float = 1.0):
+        self.rate = rate
+        self.per = per
+        self.paused_until: float = 0.0
+        self._tokens: float = rate
+        self._updated: float = time.monotonic()
+
+    async def acquire(self) -> None:
+        """waits until a request can be made without going over the global limit"""
+        while True:
+            now = time.monotonic()
+            if self.paused_until > now:
+                await asyncio.sleep(self.paused_until - now)
+                continue
+
+            self._tokens = min(self.rate, self._tokens + (now - self._updated) * self.rate / self.per)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) * self.per / self.rate)
+
+    def pause(self, retry_after: float) -> None:
+        """
+        pauses every request for ``retry_after`` seconds. Used when the global limit is hit.
+        """
+        self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+
+
+#: global ratelimit shared by every :class:`discordSplash.request.HTTPClient` in the process.
+global_ratelimit = GlobalRateLimit()
@@ -0,0 +1,376 @@
+# Copyright (C) 2021-Present Mineinjava
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Records gateway frames and replays them through a bot.
+
+A recording holds every frame a :class:`discordSplash.GatewayBot` received, exactly as it was received (still
+compressed if the connection was), with the time it arrived. :class:`ReplayDriver` feeds a recording to a bot's real
+read loop, so frames go through the same decompression, decoding, caching, model building and dispatching as they
+would from discord.
+
+Recordings are binary files: a header line, then one record per frame::
+
+    time (float64, seconds since the recording started) | kind (uint8) | length (uint32) | data
+
+``kind`` is ``0`` for a text frame, ``1`` for a binary frame and ``2`` for the start of a connection, whose data is a
+JSON object with the connection's ``encoding`` and whether it was ``compress``\\ ed.
+"""
+import asyncio
+import json
+import struct
+import time
+import tracemalloc
+from typing import BinaryIO, Iterable, Iterator, List, NamedTuple, Optional, Union
+
+from websockets.exceptions import ConnectionClosed
+
+from .compression import ZlibStreamInflator
+
+#: first line of every recording
+MAGIC = b'discordSplash recording 1\n'
+
+_RECORD = struct.Struct('<dBI')
+_TEXT = 0
+_BINARY = 1
+_CONNECTION = 2
+
+
+class RecordedFrame(NamedTuple):
+    """a frame of a recording"""
+    #: seconds since the recording started
+    time: float
+    #: the frame as it was received. ``None`` for the start of a connection.
+    data: Union[str, bytes, None]
+    #: ``{'encoding': ..., 'compress': ...}`` for the start of a connection, ``None`` for frames
+    connection: Optional[dict] = None
+
+
+class FrameRecorder:
+    """
+    Writes the frames a bot receives to a recording. Pass it to :class:`discordSplash.GatewayBot` as ``recorder``.
+
+    Writes are buffered, so recording costs little more than a copy of each frame.
+
+    Parameters
+    ----------
+    file : Union[:class:`str`, BinaryIO]
+        path of the recording, or a binary file open for writing
+
+    Attributes
+    ----------
+    frames : :class:`int`
+        number of frames recorded
+    """
+
+    def __init__(self, file: Union[str, BinaryIO]):
+        self._owns_file = isinstance(file, str)
+        self._file: BinaryIO = open(file, 'wb') if self._owns_file else file
+        self._file.write(MAGIC)
+        self._start = time.monotonic()
+        self.frames = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _write(self, kind: int, data: bytes) -> None:
+        self._file.write(_RECORD.pack(time.monotonic() - self._start, kind, len(data)))
+        self._file.write(data)
+
+    def connection(self, encoding: str, compress: bool) -> None:
+        """marks the start of a connection. Called by the bot before it connects."""
+        self._write(_CONNECTION, json.dumps({'encoding': encoding, 'compress': compress}).encode())
+
+    def record(self, frame: Union[str, bytes]) -> None:
+        """records a frame"""
+        if isinstance(frame, str):
+            self._write(_TEXT, frame.encode('utf-8'))
+        else:
+            self._write(_BINARY, frame)
+        self.frames += 1
+
+    def flush(self) -> None:
+        """writes the buffered frames to the file"""
+        self._file.flush()
+
+    def close(self) -> None:
+        """flushes the recording, and closes the file if the recorder opened it"""
+        if self._owns_file:
+            self._file.close()
+        else:
+            self._file.flush()
+
+
+def write_recording(file: Union[str, BinaryIO], frames: Iterable[RecordedFrame]) -> None:
+    """writes frames (such as ones made up for a benchmark) as a recording"""
+    recorder = FrameRecorder(file)
+    try:
+        for frame in frames:
+            if frame.connection is not None:
+                data, kind = json.dumps(frame.connection).encode(), _CONNECTION
+            elif isinstance(frame.data, str):
+                data, kind = frame.data.encode('utf-8'), _TEXT
+            else:
+                data, kind = frame.data, _BINARY
+            recorder._file.write(_RECORD.pack(frame.time, kind, len(data)))
+            recorder._file.write(data)
+    finally:
+        recorder.close()
+
+
+def read_recording(file: Union[str, BinaryIO]) -> Iterator[RecordedFrame]:
+    """
+    Reads the frames of a recording.
+
+    Raises
+    ------
+    ValueError
+        if the file is not a recording
+    """
+    f = open(file, 'rb') if isinstance(file, str) else file
+    try:
+        if f.readline() != MAGIC:
+            raise ValueError('not a discordSplash recording')
+        while True:
+            header = f.read(_RECORD.size)
+            if len(header) < _RECORD.size:
+                return
+            at, kind, length = _RECORD.unpack(header)
+            data = f.read(length)
+            if kind == _CONNECTION:
+                yield RecordedFrame(at, None, json.loads(data))
+            elif kind == _TEXT:
+                yield RecordedFrame(at, data.decode('utf-8'))
+            else:
+                yield RecordedFrame(at, data)
+    finally:
+        if isinstance(file, str):
+            f.close()
+
+
+class ReplayStats:
+    """
+    What a replay measured.
+
+    Attributes
+    ----------
+    frames : :class:`int`
+        number of frames replayed
+
+    elapsed : :class:`float`
+        seconds the replay took, including waiting for the listeners to finish
+
+    latencies : List[:class:`float`]
+        seconds the bot's read loop spent on each frame (decompressing, decoding, updating the cache, building the
+        model and submitting it to the listeners)
+
+    allocated : List[:class:`int`]
+        bytes allocated (at the peak) while each frame was handled. Only measured with ``trace_allocations``.
+    """
+
+    def __init__(self):
+        self.frames = 0
+        self.elapsed = 0.0
+        self.latencies: List[float] = []
+        self.allocated: List[int] = []
+
+    @property
+    def events_per_second(self) -> float:
+        """frames replayed per second"""
+        return self.frames / self.elapsed if self.elapsed else 0.0
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """percentile (nearest-rank) of :attr:`latencies`, in seconds. ``None`` if nothing was replayed."""
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        rank = max(0, min(len(ordered) - 1, int(round(percent / 100 * len(ordered))) - 1))
+        return ordered[rank]
+
+    @property
+    def allocated_per_event(self) -> Optional[float]:
+        """mean of :attr:`allocated`. ``None`` if allocations were not traced."""
+        return sum(self.allocated) / len(self.allocated) if self.allocated else None
+
+    def to_dict(self) -> dict:
+        """the frames, elapsed seconds, events per second, p50 and p99 latencies and allocations per event"""
+        return {'frames': self.frames, 'elapsed': self.elapsed, 'events_per_second': self.events_per_second,
+                'p50': self.percentile(50), 'p99': self.percentile(99),
+                'allocated_per_event': self.allocated_per_event}
+
+
+class _ReplaySocket:
+    """stands in for the websocket in the bot's read loop"""
+
+    def __init__(self, frames: List[RecordedFrame], stats: ReplayStats, clock_start: Optional[float],
+                 speed: float, trace_allocations: bool):
+        self._frames = iter(frames)
+        self._stats = stats
+        self._clock_start = clock_start
+        self._speed = speed
+        self._trace_allocations = trace_allocations
+        self._handed_at: Optional[float] = None
+        self._memory_before = 0
+        self.close_code = None
+
+    def finish_frame(self):
+        if self._handed_at is None:
+            return
+        self._stats.latencies.append(time.perf_counter() - self._handed_at)
+        self._handed_at = None
+        if self._trace_allocations:
+            self._stats.allocated.append(tracemalloc.get_traced_memory()[1] - self._memory_before)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        self.finish_frame()
+        frame = next(self._frames, None)
+        if frame is None:
+            raise StopAsyncIteration
+        loop = asyncio.get_running_loop()
+        if self._clock_start is not None:
+            await asyncio.sleep(max(0.0, self._clock_start + frame.time / self._speed - loop.time()))
+        else:
+            # like a real socket, give the listeners a chance to run between frames
+            await asyncio.sleep(0)
+        if self._trace_allocations:
+            self._memory_before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        self._stats.frames += 1
+        self._handed_at = time.perf_counter()
+        return frame.data
+
+    async def recv(self):
+        return await self.__anext__()
+
+    async def send(self, data):
+        pass
+
+    async def close(self, code: int = 1000, reason: str = ''):
+        pass
+
+
+class ReplayDriver:
+    """
+    Feeds a recording to a bot's read loop (:meth:`discordSplash.GatewayBot.receive`).
+
+    The bot is switched to the encoding and compression of each recorded connection, and its per-connection state
+    is reset between connections like it is when it reconnects. Frames the bot would answer (such as heartbeat
+    requests) are answered to a socket that discards them. ``INVALID_SESSION`` makes the bot wait 1-5 seconds,
+    like it does with discord.
+
+    .. Hint::
+        Example Code:
+
+        .. code:: python
+
+            bot = GatewayBot(TOKEN, recorder=FrameRecorder('session.rec'))
+            ...
+            stats = await ReplayDriver(GatewayBot(TOKEN), 'session.rec').run()
+            print(stats.events_per_second, stats.percentile(99))
+
+    Parameters
+    ----------
+    bot : :class:`discordSplash.GatewayBot`
+        the bot to replay through. It does not need to be connected, and should not have a recorder.
+
+    recording : Union[:class:`str`, Iterable[:class:`RecordedFrame`]]
+        path of the recording, or its frames. The frames are read before the replay starts.
+
+    realtime : Optional[:class:`bool`]
+        whether to replay frames at the pace they were recorded, instead of as fast as possible.
+        Defaults to ``False``
+
+    speed : Optional[:class:`float`]
+        how many times faster than recorded a realtime replay is. Defaults to ``1.0``
+
+    trace_allocations : Optional[:class:`bool`]
+        whether or not to measure the bytes allocated for each frame with :mod:`tracemalloc`. This makes the replay
+        several times slower. Defaults to ``False``
+    """
+
+    def __init__(self, bot, recording: Union[str, Iterable[RecordedFrame]], realtime: bool = False,
+                 speed: float = 1.0, trace_allocations: bool = False):
+        self.bot = bot
+        self.frames = list(read_recording(recording) if isinstance(recording, str) else recording)
+        self.realtime = realtime
+        self.speed = speed
+        if trace_allocations and not hasattr(tracemalloc, 'reset_peak'):
+            raise RuntimeError('tracing allocations needs python 3.9 or newer')
+        self.trace_allocations = trace_allocations
+
+    def _connections(self):
+        connection, frames = None, []
+        for frame in self.frames:
+            if frame.connection is not None:
+                if frames or connection is not None:
+                    yield connection, frames
+                connection, frames = frame.connection, []
+            else:
+                frames.append(frame)
+        if frames or connection is not None:
+            yield connection, frames
+
+    def _configure(self, connection: Optional[dict]):
+        bot = self.bot
+        if connection is not None:
+            bot.encoding = connection['encoding']
+            if not connection['compress']:
+                bot.inflator = None
+            elif bot.inflator is None:
+                bot.inflator = ZlibStreamInflator()
+        bot._prepare_connection(False)
+
+    async def run(self) -> ReplayStats:
+        """
+        Replays the recording, and waits for the listeners to finish.
+
+        Returns
+        -------
+        :class:`ReplayStats`
+        """
+        # imported here, as the gateway module imports everything else
+        from .gateway import _Reconnect
+
+        stats = ReplayStats()
+        loop = asyncio.get_running_loop()
+        start_time = self.frames[0].time if self.frames else 0.0
+        clock_start = loop.time() - start_time / self.speed if self.realtime else None
+        tracing = self.trace_allocations and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            for connection, frames in self._connections():
+                self._configure(connection)
+                socket = _ReplaySocket(frames, stats, clock_start, self.speed, self.trace_allocations)
+                self.bot._websocket = socket
+                try:
+                    await self.bot.receive()
+                except (_Reconnect, ConnectionClosed):
+                    # the recording goes on with the next connection
+                    pass
+                socket.finish_frame()
+            await self.bot.dispatcher.join()
+            stats.elapsed = time.perf_counter() - start
+        finally:
+            if tracing:
+                tracemalloc.stop()
+            self.bot._websocket = None
+        return stats
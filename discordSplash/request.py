@@ -16,18 +16,20 @@ import asyncio
 import aiohttp
 import typing
 from typing import Optional
-import time
 import warnings
 
-from . import exception, util
+from . import codec, exception, ratelimit, util
 from .exception import HTTPexceptionStatusPairing
 
 # will be (hopefully) set when bot connects
 # token for the bot.
 auth_header: dict = dict()
-request_ratelimit_cache: dict = dict()
 api_url = "https://discord.com/api/v9"
 
+# server errors that are worth retrying
+_RETRY_STATUSES = frozenset((500, 502, 503, 504))
+_GLOBAL_EXEMPT_ROUTES = ('/interactions/', '/webhooks/{webhook_id}/{token}')
+
 
 def get_error_messages(d: dict) -> typing.List[str]:
     """gets all error messages from a flattened json"""
@@ -43,50 +45,82 @@ def get_error_messages(d: dict) -> typing.List[str]:
     return messages
 
 
-def get_ratelimit_bucket(**kwargs) -> str:  # channel_id: int = 0, guild_id: int = 0
+def get_ratelimit_bucket(method: str, route: str, **kwargs) -> typing.Tuple[str, str]:
     """
     Gets a ratelimit bucket including major parameters
 
     Parameters
     ----------
+    method : :class:`str`
+        HTTP method of the request
+
+    route : :class:`str`
+        route of the request
+
     channel_id : :class:`int`
         id of the channel from the ratelimit bucket
 
     guild_id : :class:`int`
         id of the guild from the ratelimit bucket
 
+    webhook_id : :class:`int`
+        id of the webhook from the ratelimit bucket
+
     Returns
     -------
-    bucket : str
-        the ratelimit bucket from the selected route, channel id, and guild id.
+    Tuple[:class:`str`, :class:`str`]
+        the method and route template, and the major parameters of the route.
+
+    .. seealso::
+        :func:`discordSplash.ratelimit.route_template`
     """
-    channel_id = kwargs.get('channel_id', 0)
-    guild_id = kwargs.get('guild_id', 0)
-    route = kwargs.get('route')
-    return f"{route}:{channel_id}:{guild_id}"
+    template, major = ratelimit.route_template(route)
+    if not major:
+        major = ':'.join(str(kwargs.get(key) or 0) for key in ('channel_id', 'guild_id', 'webhook_id'))
+    return f"{method.upper()} {template}", major
 
 
-async def cleanup_ratelimit(ratelimit_bucket: str, request: aiohttp.ClientResponse, requestjson) -> None:
+def decode_response(request: aiohttp.ClientResponse, body: bytes):
     """
-    cleans up the request, including raising errors and caching the headers
+    decodes the body of a response
 
     Parameters
     ----------
-    ratelimit_bucket : :py:class:`str`
-        bucket of the ratelimit. output of :func:`get_ratelimit_bucket`
+    request : :class:`aiohttp.ClientResponse`
+        the response
+
+    body : :class:`bytes`
+        the raw body of the response
 
+    Returns
+    -------
+    Union[dict, list, str, None]
+        the decoded JSON, the text of the body if it is not JSON, or ``None`` if the body is empty.
+    """
+    if not body:
+        return None
+    if request.content_type == 'application/json':
+        return codec.loads(body)
+    return body.decode('utf-8', errors='replace')
+
+
+def raise_for_status(request: aiohttp.ClientResponse, requestjson) -> None:
+    """
+    raises the error that matches the status of a response
+
+    Parameters
+    ----------
     request : :class:`aiohttp.ClientResponse`
-        request made that needs to be cleaned up.
+        request made that needs to be checked.
 
         :aiohttp:class:`aiohttp.ClientResponse`
 
+    requestjson : dict
+        json body of the response
+
     """
-    json = {
-        "reset": float(request.headers.get('X-RateLimit-Reset', '0')),
-        "remaining": int(request.headers.get('X-RateLimit-Remaining', '1'))
-    }
-    request_ratelimit_cache[ratelimit_bucket] = json
     if not request.ok:
+        requestjson = requestjson if isinstance(requestjson, dict) else {}
         error_messages = get_error_messages(d=requestjson)
 
         message = requestjson.get('message', 'no message provided by Discord API')
@@ -96,25 +130,168 @@ async def cleanup_ratelimit(ratelimit_bucket: str, request: aiohttp.ClientRespon
         raise error_to_raise(message)
 
 
-async def sleep_ratelimit(bucket):
-    """sleeps for the ratelimit based on a certain bucket
+class HTTPClient:
+    """
+    Pooled HTTP client used for requests to the discord api.
 
-    .. seealso::
-        :func:`get_ratelimit_bucket`
+    Every :class:`discordSplash.GatewayBot` owns one client, so a single :class:`aiohttp.ClientSession` (and its
+    keep-alive connections) is reused for every request the bot makes instead of doing a new TCP/TLS handshake
+    each time.
 
+    The session belongs to the event loop of the first request. Close the client (:meth:`close`) before that loop
+    ends to use the client on another one.
+
+    Parameters
+    ----------
+    token : Optional[:class:`str`]
+        the bot's token. If not passed, the module-level ``auth_header`` is used.
+
+    connector_limit : Optional[:class:`int`]
+        maximum number of simultaneous connections in the pool. Defaults to ``100``
+
+    dns_ttl : Optional[:class:`int`]
+        how long (in seconds) DNS lookups are cached for. Defaults to ``300``
+
+    keepalive_timeout : Optional[:class:`float`]
+        how long (in seconds) idle connections are kept open. Defaults to ``30``
+
+    max_retries : Optional[:class:`int`]
+        how many times a request is retried after a 429 or a 5xx response. Defaults to ``5``
+
+    global_ratelimit : Optional[:class:`discordSplash.ratelimit.GlobalRateLimit`]
+        global ratelimit gate. Defaults to the process-wide :data:`discordSplash.ratelimit.global_ratelimit`
+
+    api_url : Optional[:class:`str`]
+        base url requests are made to, such as the url of a :class:`discordSplash.mock.MockAPI`. Defaults to the
+        module-level ``api_url``
+
+    Attributes
+    ----------
+    closed : :class:`bool`
+        whether or not the client has been closed.
+
+    ratelimiter : :class:`discordSplash.ratelimit.RateLimiter`
+        per-route ratelimit buckets of the client.
+    """
+
+    def __init__(self, token: Optional[str] = None, *, connector_limit: int = 100, dns_ttl: int = 300,
+                 keepalive_timeout: float = 30.0, max_retries: int = 5,
+                 global_ratelimit: Optional[ratelimit.GlobalRateLimit] = None, api_url: Optional[str] = None):
+        self.token = token
+        self.api_url = api_url
+        self.connector_limit = connector_limit
+        self.dns_ttl = dns_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.max_retries = max_retries
+        self.closed = False
+        self.ratelimiter = ratelimit.RateLimiter()
+        self.global_ratelimit = global_ratelimit or ratelimit.global_ratelimit
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def headers(self) -> dict:
+        """headers sent with every request"""
+        if self.token is not None:
+            return {'Authorization': f"Bot {self.token}"}
+        return dict(auth_header)
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """gets the pooled session, creating it on the running event loop if needed"""
+        loop = asyncio.get_running_loop()
+        if self._session is not None and not self._session.closed and self._loop is not loop:
+            # a session can not be shared between event loops, and replacing it would leak its connections
+            raise RuntimeError("the HTTPClient's session belongs to another event loop. close() the client before "
+                               "its event loop ends to use it on a new one")
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.connector_limit,
+                use_dns_cache=True,
+                ttl_dns_cache=self.dns_ttl,
+                keepalive_timeout=self.keepalive_timeout
+            )
+            self._session = aiohttp.ClientSession(connector=connector, headers=self.headers,
+                                                  json_serialize=codec.dumps)
+            self._loop = loop
+            self.closed = False
+        return self._session
+
+    async def request(self, method: str, route: str, json=None, guild_id=0, channel_id=0, webhook_id=0) -> dict:
+        """
+        Makes a HTTP request to discord api through the pooled session.
+
+        .. seealso::
+            :func:`make_request`
+        """
+        bucket_route, major = get_ratelimit_bucket(method, route, guild_id=guild_id, channel_id=channel_id,
+                                                   webhook_id=webhook_id)
+        # interaction responses do not count towards the global ratelimit
+        is_global = not bucket_route.split(' ', 1)[1].startswith(_GLOBAL_EXEMPT_ROUTES)
+
+        url = f"{self.api_url or api_url}{route}"
+        for attempt in range(self.max_retries + 1):
+            if is_global:
+                await self.global_ratelimit.acquire()
+            session = self._get_session()
+            async with self.ratelimiter.acquire(bucket_route, major) as bucket:
+                async with session.request(method=method, url=url, json=json) as r:
+                    self.ratelimiter.update(bucket_route, major, bucket, r.headers, r.status)
+                    requestjson = decode_response(r, await r.read())
+
+                if r.status == 429 and attempt < self.max_retries:
+                    body = requestjson if isinstance(requestjson, dict) else {}
+                    retry_after = float(body.get('retry_after', r.headers.get('Retry-After', 1)))
+                    if body.get('global') or r.headers.get('X-RateLimit-Global'):
+                        self.global_ratelimit.pause(retry_after)
+                    else:
+                        bucket.defer(retry_after)
+                    continue
+
+            if r.status in _RETRY_STATUSES and attempt < self.max_retries:
+                await asyncio.sleep(util.jittered_backoff(attempt))
+                continue
+
+            raise_for_status(r, requestjson)
+            return requestjson
+
+    async def close(self) -> None:
+        """closes the session and all of its pooled connections"""
+        if self._session is not None and not self._session.closed:
+            if self._loop is not None and self._loop.is_closed():
+                # nothing can be done on the loop the session belonged to any more, so it is only dropped
+                warnings.warn("the HTTPClient was not closed before its event loop ended", ResourceWarning)
+            else:
+                await self._session.close()
+        self._session = None
+        self.closed = True
+
+
+# client used by :func:`make_request`. set by the bot when it is created.
+http_client: Optional[HTTPClient] = None
+
+
+def get_client() -> HTTPClient:
+    """
+    Gets the :class:`HTTPClient` used by :func:`make_request`, creating one if the bot has not set it.
+
+    Returns
+    -------
+    :class:`HTTPClient`
     """
-    if bucket not in request_ratelimit_cache:
-        return
+    global http_client
+    if http_client is None:
+        http_client = HTTPClient()
+    return http_client
 
-    json: dict = request_ratelimit_cache.get(bucket)
-    if json.get("remaining") != 0:
-        return
 
-    if json.get('reset') > time.time():
-        await asyncio.sleep(time.time()-json.get('reset'))
+def set_client(client: HTTPClient) -> None:
+    """sets the :class:`HTTPClient` used by :func:`make_request`"""
+    global http_client
+    http_client = client
 
 
-async def make_request(method, route, json=None, guild_id=0, channel_id=0) -> dict:
+async def make_request(method, route, json=None, guild_id=0, channel_id=0, webhook_id=0) -> dict:
     """
     Makes a HTTP request to discord api.
 
@@ -143,17 +320,14 @@ async def make_request(method, route, json=None, guild_id=0, channel_id=0) -> di
     channel_id : Optional[:class:`int`]
         channel id of the request. Used for ratelimit handling
 
+    webhook_id : Optional[:class:`int`]
+        webhook id of the request. Used for ratelimit handling
+
 
     Returns
     -------
     dict
         json response body of the request.
     """
-    bucket = get_ratelimit_bucket(guild_id=guild_id, channel_id=channel_id)
-    await sleep_ratelimit(bucket)
-    async with aiohttp.ClientSession(headers=auth_header) as cs:
-        async with cs.request(method=method, url=f"{api_url}{route}", json=json) as r:
-            await cleanup_ratelimit(ratelimit_bucket=bucket, request=r, requestjson= await r.json())
-
-            return await r.json(content_type=None)
-
+    return await get_client().request(method, route, json=json, guild_id=guild_id, channel_id=channel_id,
+                                      webhook_id=webhook_id)
@@ -0,0 +1,461 @@
+# Copyright (C) 2021-Present Mineinjava
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Routes interactions to the coroutines registered for them.
+
+Slash commands are registered by their full name, such as ``'poll'`` or ``'admin users ban'`` (command, subcommand
+group, subcommand). Their options are passed to the coroutine as keyword arguments, converted to python types.
+
+Components are registered by their ``custom_id``. Parts of it in braces are parameters, passed to the coroutine as
+keyword arguments: ``'vote:{poll_id}'`` matches ``vote:1234`` and is called with ``poll_id='1234'``.
+"""
+import logging
+import warnings
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from . import cache, util
+from .channel import Channel
+from .commands import Command
+from .enums import ApplicationCommandOptionType, InteractionType
+from .exception import CommandRegistrationError, SlashCommandNotFound
+from .guild import Member, Role
+
+_log = logging.getLogger(__name__)
+
+_SUBCOMMAND_TYPES = (ApplicationCommandOptionType.SUB_COMMAND.value,
+                     ApplicationCommandOptionType.SUB_COMMAND_GROUP.value)
+# separates the parts of a parametrised custom_id
+_CUSTOM_ID_SEPARATOR = ':'
+
+#: bucket bounds (in seconds) of :attr:`InteractionRouter.response_times`
+RESPONSE_TIME_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 1.5, 2.0, 2.5, 3.0, 5.0, 10.0)
+
+
+def _resolve_user(value, resolved: dict, guild_id: Optional[int], entity_cache: "cache.Cache"):
+    user_data = resolved.get('users', {}).get(value)
+    if user_data is None:
+        return int(value)
+    user = entity_cache.store_user(user_data)
+    member_data = resolved.get('members', {}).get(value)
+    if member_data is None:
+        return user
+    return Member(member_data, guild_id, user)
+
+
+def _resolve_channel(value, resolved: dict, guild_id: Optional[int], entity_cache: "cache.Cache"):
+    channel_data = resolved.get('channels', {}).get(value)
+    return Channel(channel_data) if channel_data is not None else int(value)
+
+
+def _resolve_role(value, resolved: dict, guild_id: Optional[int], entity_cache: "cache.Cache"):
+    role_data = resolved.get('roles', {}).get(value)
+    return Role(role_data) if role_data is not None else int(value)
+
+
+def _resolve_mentionable(value, resolved: dict, guild_id: Optional[int], entity_cache: "cache.Cache"):
+    if value in resolved.get('roles', ()):
+        return _resolve_role(value, resolved, guild_id, entity_cache)
+    return _resolve_user(value, resolved, guild_id, entity_cache)
+
+
+def _resolve_attachment(value, resolved: dict, guild_id: Optional[int], entity_cache: "cache.Cache"):
+    return resolved.get('attachments', {}).get(value)
+
+
+# converts option values to python types. Strings and booleans are passed as they are.
+_CONVERTERS: Dict[int, Callable[[Any, dict, Optional[int], "cache.Cache"], Any]] = {
+    ApplicationCommandOptionType.INTEGER.value: lambda value, resolved, guild_id, entity_cache: int(value),
+    ApplicationCommandOptionType.NUMBER.value: lambda value, resolved, guild_id, entity_cache: float(value),
+    ApplicationCommandOptionType.USER.value: _resolve_user,
+    ApplicationCommandOptionType.CHANNEL.value: _resolve_channel,
+    ApplicationCommandOptionType.ROLE.value: _resolve_role,
+    ApplicationCommandOptionType.MENTIONABLE.value: _resolve_mentionable,
+    ApplicationCommandOptionType.ATTACHMENT.value: _resolve_attachment,
+}
+
+
+def parse_options(options: Sequence[dict], resolved: Optional[dict] = None, guild_id: Optional[int] = None,
+                  entity_cache: Optional["cache.Cache"] = None) -> Dict[str, Any]:
+    """
+    Converts the options of a command (below its subcommand) to keyword arguments.
+
+    ``-`` in option names is replaced with ``_``. Users, members, channels and roles are built from ``resolved``,
+    or passed as their id if discord did not resolve them.
+
+    Parameters
+    ----------
+    options : Sequence[:class:`dict`]
+        the options payload
+
+    resolved : Optional[:class:`dict`]
+        the ``resolved`` payload of the interaction
+
+    guild_id : Optional[:class:`int`]
+        the guild the interaction was sent in. Set on resolved members.
+
+    entity_cache : Optional[:class:`discordSplash.cache.Cache`]
+        the cache resolved users are stored in. Defaults to :func:`discordSplash.cache.get_cache`
+
+    Returns
+    -------
+    Dict[:class:`str`, Any]
+    """
+    if entity_cache is None:
+        entity_cache = cache.get_cache()
+    kwargs = {}
+    for option in options:
+        value = option.get('value')
+        convert = _CONVERTERS.get(option.get('type'))
+        if convert is not None and value is not None:
+            value = convert(value, resolved or {}, guild_id, entity_cache)
+        kwargs[option['name'].replace('-', '_')] = value
+    return kwargs
+
+
+class _ComponentPattern:
+    __slots__ = ('parts', 'func')
+
+    def __init__(self, parts: List[Tuple[bool, str]], func: Callable):
+        # (is_parameter, static text or parameter name) for each part of the custom_id
+        self.parts = parts
+        self.func = func
+
+    def match(self, parts: List[str]) -> Optional[Dict[str, str]]:
+        kwargs = {}
+        for (is_parameter, name), part in zip(self.parts, parts):
+            if is_parameter:
+                kwargs[name] = part
+            elif name != part:
+                return None
+        return kwargs
+
+
+class InteractionRouter:
+    """
+    Routes interactions to the coroutines registered for them.
+
+    Commands are kept in nested dicts (command name → subcommand group → subcommand), so finding the coroutine of a
+    command takes one dict lookup per level, however many commands are registered. Components with a fixed
+    ``custom_id`` are found with one lookup. Parametrised components are indexed by their first part and their
+    number of parts, so only the patterns that could match are compared.
+
+    Discord needs a response within 3 seconds. If a coroutine has not responded ``defer_margin`` seconds before
+    the deadline of its interaction, the interaction is deferred for it, and its first
+    :meth:`~discordSplash.slashCommand.Interaction.respond` edits the deferred response.
+
+    Parameters
+    ----------
+    auto_defer : Optional[:class:`bool`]
+        whether or not to defer interactions that are not responded to in time. Defaults to ``True``
+
+    defer_margin : Optional[:class:`float`]
+        seconds before the deadline at which interactions are deferred. Defaults to ``1.0``, which leaves time for
+        the request to reach discord.
+
+    defer_ephemeral : Optional[:class:`bool`]
+        whether or not automatically deferred command responses are ephemeral. Defaults to ``False``
+
+    Attributes
+    ----------
+    response_times : :class:`discordSplash.util.Histogram`
+        seconds between receiving an interaction and its first response (or defer), for every interaction. Buckets
+        are :data:`RESPONSE_TIME_BUCKETS`.
+
+    .. Hint::
+        Example Code:
+
+        .. code:: python
+
+            router = discordSplash.router.get_router()
+
+            @router.command('admin users ban')
+            async def ban(interaction, user, reason=None):
+                ...
+
+            @router.component('vote:{poll_id}')
+            async def vote(interaction, poll_id):
+                ...
+    """
+
+    def __init__(self, auto_defer: bool = True, defer_margin: float = 1.0, defer_ephemeral: bool = False):
+        self.auto_defer = auto_defer
+        self.defer_margin = defer_margin
+        self.defer_ephemeral = defer_ephemeral
+        self.response_times = util.Histogram(RESPONSE_TIME_BUCKETS)
+        self._commands: Dict[str, Any] = {}
+        self._components: Dict[str, Callable] = {}
+        self._component_patterns: Dict[Tuple[str, int], List[_ComponentPattern]] = {}
+        self._routes = 0
+        #: definitions of the commands, by full name. Synced with discord by :class:`discordSplash.sync.CommandSync`
+        self.definitions: Dict[str, Command] = {}
+
+    def __len__(self):
+        """number of registered commands and components"""
+        return self._routes
+
+    def add_command(self, name: str, func: Callable, description: Optional[str] = None, **kwargs) -> None:
+        """
+        Registers the coroutine of a command.
+
+        Parameters
+        ----------
+        name : :class:`str`
+            the full name of the command, such as ``'poll'``, ``'config show'`` or ``'admin users ban'``
+
+        func : Callable
+            the coroutine. It is called with the :class:`discordSplash.slashCommand.Interaction` and the options
+            as keyword arguments.
+
+        description : Optional[:class:`str`]
+            description of the command. Commands with a description are created on discord when the bot starts
+            (see :class:`discordSplash.sync.CommandSync`). Commands without one must be created some other way.
+
+        Other keyword arguments (such as ``options`` and ``guild_id``) are passed to
+        :class:`discordSplash.commands.Command`.
+
+        Raises
+        ------
+        :class:`discordSplash.exception.CommandRegistrationError`
+            if the name is taken, or if a command is registered both with and without subcommands
+        """
+        path = name.split()
+        if not 1 <= len(path) <= 3:
+            raise CommandRegistrationError(f"{name!r} must be a command name followed by at most two subcommands")
+        # the whole path is checked before anything is added, so a failed registration leaves nothing behind
+        node = self._commands
+        for part in path[:-1]:
+            node = node.get(part, {})
+            if not isinstance(node, dict):
+                raise CommandRegistrationError(f"{name!r} is a subcommand of a command that has no subcommands")
+        if path[-1] in node:
+            raise CommandRegistrationError(f"{name!r} is already registered")
+        definition = Command(func, name, description, **kwargs) if description is not None else None
+
+        node = self._commands
+        for part in path[:-1]:
+            node = node.setdefault(part, {})
+        node[path[-1]] = func
+        self._routes += 1
+        if definition is not None:
+            self.definitions[name] = definition
+        _log.debug("Registered %r for the command %r", func, name)
+
+    def describe(self, name: str, description: str, **kwargs) -> None:
+        """
+        Sets the description of a command that has subcommands, or of a subcommand group.
+
+        Parameters
+        ----------
+        name : :class:`str`
+            the name of the command (such as ``'admin'``) or of the group (such as ``'admin users'``). Without a
+            description, the name is used.
+
+        Other keyword arguments (such as ``guild_id`` and ``default_member_permissions``) are passed to
+        :class:`discordSplash.commands.Command`.
+        """
+        self.definitions[name] = Command(None, name, description, **kwargs)
+
+    def command(self, name: str, description: Optional[str] = None, **kwargs):
+        """decorator version of :meth:`add_command`"""
+
+        def decorator(func):
+            self.add_command(name, func, description, **kwargs)
+            return func
+
+        return decorator
+
+    def add_component(self, custom_id: str, func: Callable) -> None:
+        """
+        Registers the coroutine of a component.
+
+        Parameters
+        ----------
+        custom_id : :class:`str`
+            the component's ``custom_id``. Parts separated by ``:`` and written in braces (such as
+            ``'vote:{poll_id}'``) are parameters. The first part can not be a parameter.
+
+        func : Callable
+            the coroutine. It is called with the :class:`discordSplash.slashCommand.Interaction` and the
+            parameters as keyword arguments.
+
+        Raises
+        ------
+        :class:`discordSplash.exception.CommandRegistrationError`
+            if the custom_id is already registered or starts with a parameter
+        """
+        parts = custom_id.split(_CUSTOM_ID_SEPARATOR)
+        pattern = [(True, part[1:-1]) if part.startswith('{') and part.endswith('}') else (False, part)
+                   for part in parts]
+        if not any(is_parameter for is_parameter, _ in pattern):
+            if custom_id in self._components:
+                raise CommandRegistrationError(f"the component {custom_id!r} is already registered")
+            self._components[custom_id] = func
+        else:
+            if pattern[0][0]:
+                raise CommandRegistrationError(f"the component {custom_id!r} must not start with a parameter")
+            patterns = self._component_patterns.setdefault((parts[0], len(parts)), [])
+            if any(existing.parts == pattern for existing in patterns):
+                raise CommandRegistrationError(f"the component {custom_id!r} is already registered")
+            patterns.append(_ComponentPattern(pattern, func))
+        self._routes += 1
+        _log.debug("Registered %r for the component %r", func, custom_id)
+
+    def component(self, custom_id: str):
+        """decorator version of :meth:`add_component`"""
+
+        def decorator(func):
+            self.add_component(custom_id, func)
+            return func
+
+        return decorator
+
+    def resolve_command(self, data: dict) -> Tuple[Optional[Callable], Sequence[dict]]:
+        """
+        Finds the coroutine of a command.
+
+        Parameters
+        ----------
+        data : :class:`dict`
+            the ``data`` of the interaction
+
+        Returns
+        -------
+        Tuple[Optional[Callable], Sequence[:class:`dict`]]
+            the coroutine (``None`` if the command is not registered) and the options below the subcommand
+        """
+        node = self._commands.get(data.get('name'))
+        options = data.get('options') or ()
+        while isinstance(node, dict):
+            if not options or options[0].get('type') not in _SUBCOMMAND_TYPES:
+                return None, ()
+            node = node.get(options[0]['name'])
+            options = options[0].get('options') or ()
+        return node, options
+
+    def resolve_component(self, custom_id: str) -> Tuple[Optional[Callable], Dict[str, str]]:
+        """
+        Finds the coroutine of a component.
+
+        Returns
+        -------
+        Tuple[Optional[Callable], Dict[:class:`str`, :class:`str`]]
+            the coroutine (``None`` if the component is not registered) and the parameters of the custom_id
+        """
+        func = self._components.get(custom_id)
+        if func is not None:
+            return func, {}
+        parts = custom_id.split(_CUSTOM_ID_SEPARATOR)
+        for pattern in self._component_patterns.get((parts[0], len(parts)), ()):
+            kwargs = pattern.match(parts)
+            if kwargs is not None:
+                return pattern.func, kwargs
+        return None, {}
+
+    def handles(self, payload: dict) -> bool:
+        """
+        Whether a coroutine is registered for an interaction.
+
+        Parameters
+        ----------
+        payload : :class:`dict`
+            the interaction's payload
+
+        Returns
+        -------
+        :class:`bool`
+            ``False`` for interactions that are not commands or components, such as autocomplete.
+        """
+        data = payload.get('data') or {}
+        interaction_type = payload.get('type')
+        if interaction_type == InteractionType.ApplicationCommand.value:
+            return self.resolve_command(data)[0] is not None
+        if interaction_type == InteractionType.MessageComponent.value:
+            return self.resolve_component(data.get('custom_id', ''))[0] is not None
+        return False
+
+    async def dispatch(self, interaction) -> None:
+        """
+        Calls the coroutine registered for an interaction.
+
+        Interactions that are not commands or components (such as autocomplete) are ignored. While the coroutine
+        runs, the interaction is deferred if it is not responded to in time (see ``auto_defer``).
+
+        Parameters
+        ----------
+        interaction : :class:`discordSplash.slashCommand.Interaction`
+        """
+        payload = interaction.jsonData
+        data = payload.get('data') or {}
+        interaction_type = payload.get('type')
+        if interaction_type == InteractionType.ApplicationCommand.value:
+            func, options = self.resolve_command(data)
+            if func is None:
+                warnings.warn(f"the command {data.get('name')!r} is not registered", SlashCommandNotFound)
+                return
+            kwargs = parse_options(options, data.get('resolved'), interaction.guild_id, interaction.entity_cache)
+        elif interaction_type == InteractionType.MessageComponent.value:
+            func, kwargs = self.resolve_component(data.get('custom_id', ''))
+            if func is None:
+                _log.debug("No coroutine is registered for the component %r", data.get('custom_id'))
+                return
+        else:
+            return
+        if not self.auto_defer:
+            await func(interaction, **kwargs)
+            return
+        interaction.schedule_defer(self.defer_margin, self.defer_ephemeral)
+        try:
+            await func(interaction, **kwargs)
+        finally:
+            interaction.cancel_defer()
+
+
+interaction_router: Optional[InteractionRouter] = None
+
+
+def get_router() -> InteractionRouter:
+    """
+    gets the :class:`InteractionRouter` that the bots dispatch interactions to, creating it if needed.
+
+    Returns
+    -------
+    :class:`InteractionRouter`
+    """
+    global interaction_router
+    if interaction_router is None:
+        interaction_router = InteractionRouter()
+    return interaction_router
+
+
+def set_router(router: InteractionRouter) -> None:
+    """sets the :class:`InteractionRouter` returned by :func:`get_router`. Call it before registering commands."""
+    global interaction_router
+    interaction_router = router
+
+
+def command(name: str, description: Optional[str] = None, **kwargs):
+    """
+    decorator that registers the coroutine of a command with the router returned by :func:`get_router`.
+    See :meth:`InteractionRouter.add_command`
+    """
+    return get_router().command(name, description, **kwargs)
+
+
+def component(custom_id: str):
+    """
+    decorator that registers the coroutine of a component with the router returned by :func:`get_router`.
+    See :meth:`InteractionRouter.add_component`
+    """
+    return get_router().component(custom_id)
@@ -0,0 +1,212 @@
+# Copyright (C) 2021-Present Mineinjava
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Automatic sharding for bots in more guilds than one gateway connection can handle.
+"""
+import asyncio
+import time
+from typing import Dict, Iterable, Optional
+
+from .cache import Cache, set_cache
+from .gateway import GatewayBot
+from .dispatch import Dispatcher
+from .presence import UpdatePresence, EmptyUpdatePresence
+from .request import HTTPClient, set_client
+
+
+class IdentifyLimiter:
+    """
+    Keeps shards within discord's identify ratelimit.
+
+    Shards are split into ``max_concurrency`` buckets (``shard_id % max_concurrency``). Each bucket can IDENTIFY
+    once every ``delay`` seconds.
+
+    Parameters
+    ----------
+    max_concurrency : Optional[:class:`int`]
+        ``session_start_limit.max_concurrency`` from ``/gateway/bot``. Defaults to ``1``
+
+    delay : Optional[:class:`float`]
+        seconds between identifies in the same bucket. Defaults to ``5``
+    """
+
+    def __init__(self, max_concurrency: int = 1, delay: float = 5.0):
+        self.max_concurrency = max_concurrency
+        self.delay = delay
+        self._locks: Dict[int, asyncio.Lock] = dict()
+        self._last: Dict[int, float] = dict()
+
+    async def acquire(self, shard_id: int) -> None:
+        """
+        waits until the shard is allowed to IDENTIFY
+
+        Parameters
+        ----------
+        shard_id : :class:`int`
+            id of the shard that is about to IDENTIFY
+        """
+        key = shard_id % self.max_concurrency
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+
+        async with lock:
+            wait = self._last.get(key, -self.delay) + self.delay - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._last[key] = time.monotonic()
+
+
+class ShardManager:
+    """
+    Runs several :class:`discordSplash.GatewayBot` shards in one event loop.
+
+    The number of shards and the identify concurrency are fetched from ``/gateway/bot``. All shards share one
+    HTTP pool and one :class:`discordSplash.dispatch.Dispatcher`, so events from every shard go to the same
+    listeners.
+
+    Parameters
+    ----------
+    token : :class:`str`
+        The bot's token
+
+    presence : Optional[:class:`discordSplash.UpdatePresence`]
+        The bot's presence when it connects
+
+    shard_count : Optional[:class:`int`]
+        total number of shards. Defaults to the number discord recommends.
+
+    shard_ids : Optional[Iterable[:class:`int`]]
+        ids of the shards to run. Defaults to all of them.
+
+    connector_limit : Optional[:class:`int`]
+        maximum number of simultaneous HTTP connections. Defaults to ``100``
+
+    max_concurrency : Optional[:class:`int`]
+        maximum number of event handlers that can run at once across all shards. Defaults to ``64``
+
+    ordering : Optional[str]
+        which events must be handled in order. See :class:`discordSplash.dispatch.Dispatcher`
+
+    cache : Optional[:class:`discordSplash.cache.Cache`]
+        cache shared by the shards. Defaults to a :class:`discordSplash.cache.Cache` with every entity type turned on.
+
+    api_url : Optional[:class:`str`]
+        base url of the HTTP API. Defaults to ``discordSplash.request.api_url``. The gateway url is fetched from it.
+
+    **kwargs
+        passed on to every :class:`discordSplash.GatewayBot` (such as ``compress`` or ``encoding``)
+
+    Attributes
+    ----------
+    shards : Dict[:class:`int`, :class:`discordSplash.GatewayBot`]
+        the shards, by id. Empty until the manager is started.
+
+    shard_count : Optional[:class:`int`]
+        total number of shards.
+
+    http : :class:`discordSplash.request.HTTPClient`
+        HTTP client shared by the shards
+
+    dispatcher : :class:`discordSplash.dispatch.Dispatcher`
+        dispatcher shared by the shards
+
+    cache : :class:`discordSplash.cache.Cache`
+        cache shared by the shards
+    """
+
+    def __init__(self, token: str, presence: UpdatePresence = EmptyUpdatePresence,
+                 shard_count: Optional[int] = None, shard_ids: Optional[Iterable[int]] = None,
+                 connector_limit: int = 100, max_concurrency: int = 64, ordering=None,
+                 cache: Optional[Cache] = None, api_url: Optional[str] = None, **kwargs):
+        self.TOKEN = token
+        self.presence = presence
+        self.shard_count = shard_count
+        self.shard_ids = list(shard_ids) if shard_ids is not None else None
+        self.shards: Dict[int, GatewayBot] = dict()
+        self.identify_limiter: Optional[IdentifyLimiter] = None
+
+        self.http = HTTPClient(token, connector_limit=connector_limit, api_url=api_url)
+        set_client(self.http)
+        self.dispatcher = Dispatcher(max_concurrency=max_concurrency, ordering=ordering)
+        self.cache = cache if cache is not None else Cache()
+        set_cache(self.cache)
+        self._kwargs = kwargs
+
+    @property
+    def latencies(self) -> Dict[int, Optional[float]]:
+        """heartbeat latency (in seconds) of every shard"""
+        return {shard_id: shard.latency for shard_id, shard in self.shards.items()}
+
+    @property
+    def latency_stats(self) -> Dict[int, dict]:
+        """rolling heartbeat latency (``last``, ``p50`` and ``p99``) of every shard"""
+        return {shard_id: shard.heartbeat_latency.to_dict() for shard_id, shard in self.shards.items()}
+
+    @property
+    def statuses(self) -> Dict[int, str]:
+        """connection status of every shard. See :attr:`discordSplash.GatewayBot.status`"""
+        return {shard_id: shard.status for shard_id, shard in self.shards.items()}
+
+    async def fetch_gateway(self) -> dict:
+        """
+        Gets the gateway url, recommended shard count and session start limits from ``/gateway/bot``
+
+        Returns
+        -------
+        dict
+        """
+        return await self.http.request("GET", "/gateway/bot")
+
+    def create_shards(self, gateway: dict) -> None:
+        """creates a :class:`discordSplash.GatewayBot` for every shard that is run by this manager"""
+        if self.shard_count is None:
+            self.shard_count = gateway['shards']
+        limit = gateway.get('session_start_limit', {})
+        if self.identify_limiter is None:
+            self.identify_limiter = IdentifyLimiter(limit.get('max_concurrency', 1))
+
+        shard_ids = self.shard_ids if self.shard_ids is not None else range(self.shard_count)
+        for shard_id in shard_ids:
+            self.shards[shard_id] = GatewayBot(
+                self.TOKEN, self.presence,
+                shard_id=shard_id, shard_count=self.shard_count,
+                gateway=gateway.get('url', 'wss://gateway.discord.gg'),
+                http=self.http, dispatcher=self.dispatcher, identify_limiter=self.identify_limiter, cache=self.cache,
+                **self._kwargs
+            )
+
+    async def start(self, update_commands: bool = True) -> None:
+        """
+        Fetches the gateway information, then connects every shard.
+        """
+        try:
+            self.create_shards(await self.fetch_gateway())
+            await asyncio.gather(*(shard._run(update_commands and shard_id == min(self.shards))
+                                   for shard_id, shard in self.shards.items()))
+        finally:
+            await self.close()
+
+    async def close(self) -> None:
+        """closes every shard, the dispatcher and the HTTP pool"""
+        await asyncio.gather(*(shard.close() for shard in self.shards.values()))
+        await self.dispatcher.close()
+        await self.http.close()
+
+    def run(self, update_commands: bool = True) -> None:
+        """
+        Run the bot with all of its shards.
+        """
+        asyncio.run(self.start(update_commands))
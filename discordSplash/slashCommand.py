@@ -14,14 +14,25 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 
+import asyncio
 import json
+import logging
+import time
 from dataclasses import dataclass
-import traceback
 from typing import Optional
 
 from .abstractbaseclass import Object
-from . import enums
+from . import cache, enums, router
+from .guild import Member
+from .request import make_request
+from .snowflake import timestamp_ms
 from .user import User
+from .util import optional_int
+
+_log = logging.getLogger(__name__)
+
+#: seconds discord gives a bot to send the first response to an interaction
+RESPONSE_WINDOW = 3.0
 
 
 @dataclass(init=False, eq=False)
@@ -37,8 +48,8 @@ class ReactionResponse:
     isEphemeral : bool
         Whether or not the message should be ephemeral (only seen by the user who created the interaction)
 
-    responseType : discordSplash.enums.InteractionResponseType
-        Type of response.
+    responseType : Union[:class:`discordSplash.enums.InteractionResponseType`, int]
+        Type of response. Defaults to ``ChannelMessageWithSource``
 
     Attributes
     ----------
@@ -57,7 +68,7 @@ class ReactionResponse:
 
     def __init__(self, content: str, isEphemeral: bool = False, responseType: int = 4):
         self.jsonContent = {
-            "type": responseType.value,
+            "type": getattr(responseType, 'value', responseType),
             "data": {
                 "content": str(content)
             }
@@ -102,6 +113,20 @@ class Interaction(Object):
     jsonData : dict
         JSON data for the interaction
     guild_id : Optional[int]
+    channel_id : Optional[int]
+    member : Optional[:class:`discordSplash.guild.Member`]
+        the member that sent the interaction. ``None`` in DMs
+    user : :class:`discordSplash.user.User`
+        the user that sent the interaction
+    entity_cache : :class:`discordSplash.cache.Cache`
+        the cache the interaction's users are stored in
+    received_at : float
+        :func:`time.monotonic` when the interaction was built
+    deadline : float
+        :func:`time.monotonic` by which the first response must be sent. Worked out from the interaction's snowflake,
+        and never later than :data:`RESPONSE_WINDOW` after ``received_at``.
+    state : str
+        ``'pending'`` until the first response, then ``'deferred'`` or ``'responded'``
 
 
     Methods
@@ -112,24 +137,64 @@ class Interaction(Object):
 
     """
 
-    def __init__(self, jsonData):
-        super.__init__(id=jsonData.get("id"))
+    def __init__(self, jsonData, entity_cache: Optional["cache.Cache"] = None):
+        super().__init__(jsonData.get("id"))
+        self.entity_cache: "cache.Cache" = entity_cache if entity_cache is not None else cache.get_cache()
         self.jsonData: dict = jsonData
-        self.application_id: int = int()
+        self.application_id: Optional[int] = optional_int(jsonData.get("application_id"))
         self.type: enums.InteractionType = enums.InteractionType(
             jsonData.get("type"))
 
-        self.guild_id: Optional[int] = int(jsonData.get("guild_id"))
+        self.guild_id: Optional[int] = optional_int(jsonData.get("guild_id"))
 
         # self.guild = (get the guild object)
         self.token: str = jsonData.get("token")
-        self.channel_id
+        self.channel_id: Optional[int] = optional_int(jsonData.get("channel_id"))
 
-        # self.member = (Get Member Somehow)
-        self.user: Optional[User] = User(jsonData.get('user'))
+        # guild interactions have a member (with its user), DMs have a user
+        member_data = jsonData.get('member')
+        user_data = member_data.get('user') if member_data is not None else jsonData.get('user')
+        self.user: Optional[User] = self.entity_cache.store_user(user_data) if user_data is not None else None
+        self.member: Optional[Member] = Member(member_data, self.guild_id, self.user) \
+            if member_data is not None else None
 
         self.data: Optional[InteractionData] = InteractionData(
-            jsonData.get("data")) if not not jsonData.get("data") else None
+            self.type, jsonData.get("data")) if jsonData.get("data") else None
+
+        self.received_at: float = time.monotonic()
+        # the snowflake says when discord created the interaction. The clock of this machine can be off, so the
+        # deadline is kept between now and the full window.
+        remaining = (timestamp_ms(self.id) / 1000 + RESPONSE_WINDOW) - time.time()
+        self.deadline: float = self.received_at + max(0.0, min(remaining, RESPONSE_WINDOW))
+        self.state: str = 'pending'
+        self._edited_original = False
+        self._lock: Optional[asyncio.Lock] = None
+        self._defer_handle: Optional[asyncio.TimerHandle] = None
+        # kept so the automatic defer is not garbage collected while it runs
+        self._defer_task: Optional[asyncio.Future] = None
+        # set by the interactions webhook server, which sends the first response as the body of its HTTP response
+        self._initial_response: Optional[asyncio.Future] = None
+
+    def _get_lock(self) -> asyncio.Lock:
+        # created on first use, so it belongs to the running event loop
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    async def _send_initial_response(self, response: dict):
+        if self._initial_response is not None and not self._initial_response.done():
+            self._initial_response.set_result(response)
+        else:
+            await make_request("POST", f'/interactions/{self.jsonData["id"]}/{self.jsonData["token"]}/callback',
+                               json=response)
+
+    def _responded(self, state: str):
+        self.state = state
+        # an automatic defer that is waiting for the lock has nothing left to do
+        task = self._defer_task
+        if task is not None and task is not asyncio.current_task():
+            task.cancel()
+        router.get_router().response_times.add(time.monotonic() - self.received_at)
 
     @property
     def options(self):
@@ -160,34 +225,88 @@ class Interaction(Object):
     async def respond(self, data: ReactionResponse):
         """Responds to the interaction.
 
+        The first call sends the interaction response. If the interaction was deferred (by :meth:`defer`, or
+        automatically by the router), the first call edits the deferred response instead, and its ``isEphemeral``
+        is ignored. Every later call sends a followup message.
 
         :param discordSplash.ReactionResponse data: Reaction Response Data
 
 
         .. Tip::
-            This must be called within 3 seconds of receiving the response.
-
-            .. Tip::
-                If you do not want to immediately send a message, call this with reactionResponse ResponseType ``1``
+            The first response must be sent within 3 seconds of the interaction being created. Interactions routed
+            by :class:`discordSplash.router.InteractionRouter` are deferred automatically before that.
 
             """
-        async with aiohttp.ClientSession() as session:
-            print("jsondata", self.jsonData)
-            async with session.post(
-                    f'https://discord.com/api/v8/interactions/{self.jsonData["id"]}/{self.jsonData["token"]}/callback',
-                    json=data.json) as resp:
-                pass
+        async with self._get_lock():
+            if self.state == 'pending':
+                await self._send_initial_response(data.jsonContent)
+                self._responded('responded')
+                return
+            if self.state == 'deferred' and not self._edited_original:
+                self._edited_original = True
+                await self.edit(data)
+                return
+        await self.send_followup_message(data)
+
+    async def defer(self, ephemeral: bool = False):
+        """
+        Tells discord the response will come later, which gives the bot 15 minutes to send it with :meth:`respond`.
+
+        Commands show a "thinking" state (``DeferredChannelMessageWithSource``), components keep their message as
+        it is (``DeferredUpdateMessage``). Does nothing if the interaction was already responded to or deferred.
+
+        :param bool ephemeral: whether or not the response will be ephemeral. Only used for commands.
+        """
+        async with self._get_lock():
+            if self.state != 'pending':
+                return
+            if self.type == enums.InteractionType.MessageComponent:
+                response = {"type": enums.InteractionResponseType.DeferredUpdateMessage.value}
+            else:
+                response = {"type": enums.InteractionResponseType.DeferredChannelMessageWithSource.value}
+                if ephemeral:
+                    response["data"] = {"flags": 64}
+            await self._send_initial_response(response)
+            self._responded('deferred')
+
+    def schedule_defer(self, margin: float, ephemeral: bool = False):
+        """
+        Defers the interaction ``margin`` seconds before its :attr:`deadline`, unless it was responded to by then.
+
+        :param float margin: seconds before the deadline. Leave enough for the request to reach discord.
+        :param bool ephemeral: see :meth:`defer`
+        """
+        self.cancel_defer()
+        delay = max(0.0, self.deadline - margin - time.monotonic())
+        self._defer_handle = asyncio.get_running_loop().call_later(delay, self._start_auto_defer, ephemeral)
+
+    def cancel_defer(self):
+        """cancels a defer scheduled by :meth:`schedule_defer`, unless it is already being sent"""
+        if self._defer_handle is not None:
+            self._defer_handle.cancel()
+            self._defer_handle = None
+
+    def _start_auto_defer(self, ephemeral: bool):
+        self._defer_handle = None
+        self._defer_task = asyncio.ensure_future(self._auto_defer(ephemeral))
+
+    async def _auto_defer(self, ephemeral: bool):
+        if self.state != 'pending':
+            return
+        _log.debug("Deferring interaction %s, its handler has not responded yet", self.id)
+        try:
+            await self.defer(ephemeral)
+        except Exception:
+            _log.exception("Could not defer interaction %s", self.id)
 
     async def edit(self, content: ReactionResponse):
         """
         Edits the original reaction response sent.
         :param discordSplash.ReactionResponse content: New content of the reaction response.
         """
-        async with aiohttp.ClientSession as session:
-            async with session.patch(
-                    f'https://discord.com/api/v8/webhooks/{cfg.CLIENT_ID}/{self.jsonData["token"]}/@original',
-                    json=content.json) as r:
-                pass
+        await make_request("PATCH",
+                           f'/webhooks/{self.jsonData["application_id"]}/{self.jsonData["token"]}/messages/@original',
+                           json=content.jsonContent['data'])
 
     async def send_followup_message(self, data: ReactionResponse):
         """
@@ -201,26 +320,24 @@ class Interaction(Object):
             - To Test:
                 - Ephemeral Messages
         """
-        async with aiohttp.ClientSession as session:
-            async with session.post(f'https://discord.com/api/v8/webhooks/{cfg.CLIENT_ID}/{self.jsonData["token"]}/',
-                                    json=data.json) as r:
-                pass
+        await make_request("POST", f'/webhooks/{self.jsonData["application_id"]}/{self.jsonData["token"]}',
+                           json=data.jsonContent['data'])
 
     async def delete_original_response(self):
         """
         delete the original reaction
         """
-        async with aiohttp.ClientSession as session:
-            async with session.delete(
-                    f'https://discord.com/api/v8/webhooks/{cfg.CLIENT_ID}/{self.jsonData["token"]}/@original'):
-                pass
+        await make_request("DELETE",
+                           f'/webhooks/{self.jsonData["application_id"]}/{self.jsonData["token"]}/messages/@original')
     #  TODO: make it possible to edit any message from an interaction - currently it is possible to delete or edit the original response, but not any of the other responses |
 
 
-def command(name: str):
+def command(name: str, description: Optional[str] = None, **kwargs):
     """A decorator that is used to register a command.
 
-    :param str name: name of the command
+    :param str name: full name of the command, such as ``say-hello`` or ``admin users ban``
+    :param str description: description of the command. Commands with a description are created on discord when
+        the bot starts.
 
     .. SeeAlso::
         See ``examples`` directory on GitHub for info on usage
@@ -234,14 +351,13 @@ def command(name: str):
             async def say_hello(data):
                 await data.respond('hi')
 
+    The options of the command are passed as keyword arguments. See
+    :class:`discordSplash.router.InteractionRouter`.
 
-    """
 
-    def decorator(func):
-        commands[name] = func
-        return func
+    """
 
-    return decorator
+    return router.command(name, description, **kwargs)
 
 
 @dataclass(init=False, eq=False)
@@ -0,0 +1,130 @@
+# Copyright (C) 2021-Present Mineinjava
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Snowflake (discord id) helpers.
+
+A snowflake is a 64 bit integer::
+
+    timestamp (ms since DISCORD_EPOCH) | worker id | process id | increment
+              42 bits                  |  5 bits   |   5 bits   |  12 bits
+
+Everything here uses integer shifts and masks. The bulk functions use `numpy <https://numpy.org>`_ if it is
+installed (``pip install discordSplash[numpy]``), and plain lists otherwise.
+"""
+import datetime
+from typing import Iterable, List, Sequence, Union
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+#: the first millisecond of 2015, in ms since the unix epoch
+DISCORD_EPOCH = 1420070400000
+
+_WORKER_MASK = 0x3E0000
+_PROCESS_MASK = 0x1F000
+_INCREMENT_MASK = 0xFFF
+_UTC = datetime.timezone.utc
+
+Snowflake = Union[int, str]
+
+
+def timestamp_ms(snowflake: Snowflake) -> int:
+    """milliseconds since the unix epoch at which the snowflake was created"""
+    return (int(snowflake) >> 22) + DISCORD_EPOCH
+
+
+def snowflake_time(snowflake: Snowflake) -> datetime.datetime:
+    """
+    when the snowflake was created
+
+    Returns
+    -------
+    :class:`datetime.datetime`
+        an aware datetime in UTC
+    """
+    return datetime.datetime.fromtimestamp(((int(snowflake) >> 22) + DISCORD_EPOCH) / 1000, _UTC)
+
+
+def worker_id(snowflake: Snowflake) -> int:
+    """id of the internal worker that created the snowflake"""
+    return (int(snowflake) & _WORKER_MASK) >> 17
+
+
+def process_id(snowflake: Snowflake) -> int:
+    """id of the internal process that created the snowflake"""
+    return (int(snowflake) & _PROCESS_MASK) >> 12
+
+
+def increment(snowflake: Snowflake) -> int:
+    """number of snowflakes the process had created before this one, in the same millisecond"""
+    return int(snowflake) & _INCREMENT_MASK
+
+
+def snowflake_from_time(time: datetime.datetime, high: bool = False) -> int:
+    """
+    Makes the lowest (or highest) snowflake that could have been created at a time.
+
+    Useful as the ``before`` or ``after`` bound when paginating messages or members.
+
+    Parameters
+    ----------
+    time : :class:`datetime.datetime`
+        the time. Naive datetimes are treated as local time, like :meth:`datetime.datetime.timestamp` does.
+
+    high : Optional[:class:`bool`]
+        whether to make the highest snowflake of that millisecond instead of the lowest. Defaults to ``False``
+
+    Returns
+    -------
+    :class:`int`
+    """
+    ms = int(time.timestamp() * 1000) - DISCORD_EPOCH
+    return (ms << 22) + (2 ** 22 - 1 if high else 0)
+
+
+def parse_ids(ids: Iterable[Snowflake]) -> Sequence[int]:
+    """
+    Converts many snowflakes (such as the ids in a GUILD_MEMBERS_CHUNK) to integers at once
+
+    Returns
+    -------
+    Sequence[:class:`int`]
+        a ``numpy.uint64`` array if numpy is installed, a :class:`list` otherwise
+    """
+    if numpy is not None:
+        return numpy.array(list(ids), dtype=numpy.uint64)
+    return list(map(int, ids))
+
+
+def bulk_timestamps_ms(ids: Iterable[Snowflake]) -> Sequence[int]:
+    """
+    :func:`timestamp_ms` of many snowflakes at once
+
+    Returns
+    -------
+    Sequence[:class:`int`]
+        a ``numpy.uint64`` array if numpy is installed, a :class:`list` otherwise
+    """
+    if numpy is not None:
+        return (parse_ids(ids) >> numpy.uint64(22)) + numpy.uint64(DISCORD_EPOCH)
+    return [(int(snowflake) >> 22) + DISCORD_EPOCH for snowflake in ids]
+
+
+def bulk_snowflake_times(ids: Iterable[Snowflake]) -> List[datetime.datetime]:
+    """:func:`snowflake_time` of many snowflakes at once"""
+    fromtimestamp = datetime.datetime.fromtimestamp
+    return [fromtimestamp(int(ms) / 1000, _UTC) for ms in bulk_timestamps_ms(ids)]
@@ -0,0 +1,273 @@
+# Copyright (C) 2021-Present Mineinjava
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Creates the registered slash commands on discord.
+
+Discord only allows 200 command creations per day per guild, so commands are only sent when they changed. The
+payload of each scope (global, or one guild) is hashed in a canonical form, and the hash is compared with the
+commands that already exist. The hashes that were synced are saved to a file, so a restart with the same commands
+does not make any request.
+"""
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, Iterable, List, Optional
+
+from .commands import Command
+from .enums import ApplicationCommandOptionType
+from .request import HTTPClient, get_client
+from .router import get_router
+
+_log = logging.getLogger(__name__)
+
+#: file the synced hashes are saved to by default, in the working directory
+DEFAULT_CACHE_PATH = '.discordSplash-commands.json'
+
+# keys that discord adds to the commands it sends back are left out of the hash, and so are keys that have their
+# default value (discord sends some of them back, but not others). every other key is hashed, known or not.
+_SERVER_KEYS = frozenset(('id', 'application_id', 'version', 'guild_id'))
+_COMMAND_DEFAULTS = {'type': 1, 'options': [], 'dm_permission': True, 'nsfw': False,
+                     'default_member_permissions': None, 'name_localizations': None,
+                     'description_localizations': None}
+_OPTION_DEFAULTS = {'required': False, 'autocomplete': False, 'options': [], 'choices': [], 'channel_types': None,
+                    'min_value': None, 'max_value': None, 'min_length': None, 'max_length': None,
+                    'name_localizations': None, 'description_localizations': None}
+_SUB_COMMAND = ApplicationCommandOptionType.SUB_COMMAND.value
+_SUB_COMMAND_GROUP = ApplicationCommandOptionType.SUB_COMMAND_GROUP.value
+
+
+def _canonical(data: dict, defaults: dict) -> dict:
+    canonical = {'name': data['name'], 'description': data.get('description', '')}
+    if defaults is _OPTION_DEFAULTS:
+        canonical['type'] = data['type']
+    for key in {*defaults, *data}:
+        if key in canonical or key in _SERVER_KEYS:
+            continue
+        default = defaults.get(key)
+        value = data.get(key, default)
+        if key == 'options':
+            value = [_canonical(option, _OPTION_DEFAULTS) for option in value or ()]
+        elif key == 'choices':
+            value = [{k: v for k, v in choice.items() if v is not None} for choice in value or ()]
+        elif key == 'channel_types' and value is not None:
+            value = sorted(value)
+        elif key == 'default_member_permissions' and value is not None:
+            value = str(value)
+        if value != default:
+            canonical[key] = value
+    return canonical
+
+
+def canonical_commands(commands: Iterable[dict]) -> List[dict]:
+    """
+    Puts command payloads in a canonical form: sorted, without the keys discord adds (``id``, ``application_id``,
+    ``version`` and ``guild_id``) and without keys that have their default value (``None`` for unknown keys). The commands sent to discord and the commands
+    discord returns have the same canonical form if they are the same.
+    """
+    return sorted((_canonical(command, _COMMAND_DEFAULTS) for command in commands),
+                  key=lambda command: (command.get('type', 1), command['name']))
+
+
+def command_hash(commands: Iterable[dict]) -> str:
+    """sha256 of the canonical form of command payloads"""
+    encoded = json.dumps(canonical_commands(commands), sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def build_payloads(definitions: Iterable[Command]) -> Dict[Optional[int], List[dict]]:
+    """
+    Builds the payloads of commands, nesting subcommands in their command.
+
+    Commands and subcommand groups that were not described (see
+    :meth:`discordSplash.router.InteractionRouter.describe`) use their name as their description.
+
+    Parameters
+    ----------
+    definitions : Iterable[:class:`discordSplash.commands.Command`]
+        the commands, subcommands and descriptions
+
+    Returns
+    -------
+    Dict[Optional[:class:`int`], List[:class:`dict`]]
+        the payloads of each guild id, or of ``None`` for global commands
+    """
+    commands: Dict[str, dict] = {}
+    guild_ids: Dict[str, Optional[int]] = {}
+    # commands and groups are built before the subcommands in them
+    for definition in sorted(definitions, key=lambda definition: len(definition.path)):
+        path = definition.path
+        if definition.guild_id is not None:
+            guild_ids[path[0]] = definition.guild_id
+        if len(path) == 1:
+            commands[path[0]] = definition.to_dict
+            continue
+
+        parent = commands.setdefault(path[0], {'name': path[0], 'description': path[0], 'options': []})
+        if len(path) == 3:
+            parent = _suboption(parent, path[1])
+        payload = definition.to_dict
+        payload['type'] = _SUB_COMMAND if definition.callback is not None or len(path) == 3 else _SUB_COMMAND_GROUP
+        if payload['type'] == _SUB_COMMAND_GROUP:
+            # keep the subcommands of a group described after them
+            existing = _find(parent, path[-1])
+            payload['options'] = existing['options'] if existing is not None else []
+        _replace(parent, payload)
+
+    payloads: Dict[Optional[int], List[dict]] = {}
+    for name, payload in commands.items():
+        payloads.setdefault(guild_ids.get(name), []).append(payload)
+    return payloads
+
+
+def _find(parent: dict, name: str) -> Optional[dict]:
+    for option in parent['options']:
+        if option['name'] == name:
+            return option
+    return None
+
+
+def _suboption(parent: dict, name: str) -> dict:
+    group = _find(parent, name)
+    if group is None:
+        group = {'type': _SUB_COMMAND_GROUP, 'name': name, 'description': name, 'options': []}
+        parent['options'].append(group)
+    return group
+
+
+def _replace(parent: dict, payload: dict) -> None:
+    options = parent['options']
+    for i, option in enumerate(options):
+        if option['name'] == payload['name']:
+            options[i] = payload
+            return
+    options.append(payload)
+
+
+class CommandSync:
+    """
+    Creates, updates and deletes an application's commands so they match the registered ones.
+
+    Each scope (global commands, and the commands of each guild) is synced with at most one ``GET`` and one bulk
+    ``PUT``:
+
+    1. if the hash of the scope's payload is the one saved in ``cache_path``, nothing is sent.
+    2. otherwise the existing commands are fetched, and if their hash is the same, only the file is updated.
+    3. otherwise every command of the scope is replaced with one ``PUT``.
+
+    Scopes that were synced before but no longer have any command have their commands deleted. Scopes that were
+    never synced and have no commands are left alone, so commands created some other way are not deleted.
+
+    Parameters
+    ----------
+    application_id : :class:`int`
+        id of the bot's application
+
+    http : Optional[:class:`discordSplash.request.HTTPClient`]
+        client the requests are made with. Defaults to :func:`discordSplash.request.get_client`
+
+    cache_path : Optional[:class:`str`]
+        file the synced hashes are saved to. ``None`` turns the file off, so every sync fetches the commands.
+    """
+
+    def __init__(self, application_id: int, http: Optional[HTTPClient] = None,
+                 cache_path: Optional[str] = DEFAULT_CACHE_PATH):
+        self.application_id = int(application_id)
+        self.http = http
+        self.cache_path = cache_path
+
+    def _route(self, guild_id: Optional[int]) -> str:
+        if guild_id is None:
+            return f'/applications/{self.application_id}/commands'
+        return f'/applications/{self.application_id}/guilds/{guild_id}/commands'
+
+    def load_hashes(self) -> Dict[str, str]:
+        """the saved hashes of this application, by scope (``'global'`` or a guild id)"""
+        if self.cache_path is None:
+            return {}
+        try:
+            with open(self.cache_path, encoding='utf-8') as f:
+                return json.load(f).get(str(self.application_id), {})
+        except (OSError, ValueError) as e:
+            if not isinstance(e, FileNotFoundError):
+                _log.warning("Could not read the command hashes from %s: %r", self.cache_path, e)
+            return {}
+
+    def save_hashes(self, hashes: Dict[str, str]) -> None:
+        """saves the hashes of this application, keeping those of other applications"""
+        if self.cache_path is None:
+            return
+        try:
+            with open(self.cache_path, encoding='utf-8') as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            saved = {}
+        saved[str(self.application_id)] = hashes
+        # written to a temporary file first so a crash can not leave a half written file
+        temporary = f'{self.cache_path}.tmp'
+        try:
+            with open(temporary, 'w', encoding='utf-8') as f:
+                json.dump(saved, f, indent=2, sort_keys=True)
+            os.replace(temporary, self.cache_path)
+        except OSError as e:
+            _log.warning("Could not save the command hashes to %s: %r", self.cache_path, e)
+
+    async def sync(self, definitions: Optional[Iterable[Command]] = None, force: bool = False) -> Dict[str, str]:
+        """
+        Syncs the commands.
+
+        Parameters
+        ----------
+        definitions : Optional[Iterable[:class:`discordSplash.commands.Command`]]
+            the commands. Defaults to the ones registered with :func:`discordSplash.router.get_router`
+
+        force : Optional[:class:`bool`]
+            whether or not to fetch the existing commands even if the saved hash matches. Defaults to ``False``
+
+        Returns
+        -------
+        Dict[:class:`str`, :class:`str`]
+            what was done for each scope (``'global'`` or a guild id): ``'cached'`` (no request), ``'unchanged'``
+            (fetched and the same) or ``'updated'``
+        """
+        if definitions is None:
+            definitions = get_router().definitions.values()
+        payloads = build_payloads(definitions)
+        saved = self.load_hashes()
+        http = self.http or get_client()
+
+        scopes = {None if scope == 'global' else int(scope) for scope in saved}
+        scopes.update(payloads)
+        hashes: Dict[str, str] = {}
+        results: Dict[str, str] = {}
+        for guild_id in sorted(scopes, key=lambda scope: -1 if scope is None else scope):
+            key = 'global' if guild_id is None else str(guild_id)
+            payload = payloads.get(guild_id, [])
+            digest = command_hash(payload)
+            if not force and saved.get(key) == digest:
+                results[key] = 'cached'
+            else:
+                existing = await http.request('GET', self._route(guild_id))
+                if command_hash(existing or []) == digest:
+                    results[key] = 'unchanged'
+                else:
+                    await http.request('PUT', self._route(guild_id), json=payload, guild_id=guild_id or 0)
+                    results[key] = 'updated'
+            _log.info("Commands of %s: %s (%d commands)", key, results[key], len(payload))
+            # scopes that have no commands left are forgotten once they are cleared
+            if payload:
+                hashes[key] = digest
+        self.save_hashes(hashes)
+        return results
@@ -91,15 +91,27 @@ class User(Object):
     timestamp : :class:`datetime.datetime`
         timestamp of when the object was created.
 
+    raw : Optional[:class:`dict`]
+        the user payload. ``None`` unless :attr:`keep_raw` is ``True``
+
 
     Methods
     -------
 
     """
+    __slots__ = ('username', 'discriminator', 'avatar', 'bot', 'mfa_enabled', 'system', 'locale', 'verified',
+                 'flags', 'premium_type', 'public_flags', 'raw')
+
+    #: whether or not new users keep their payload in :attr:`raw`. Off by default to save memory.
+    keep_raw = False
 
     def __init__(self, json):
         super().__init__(json.get('id'))
-        self._json          = json
+        self._update(json)
+
+    def _update(self, json):
+        """replaces the user's data, keeping the same object. used by :class:`discordSplash.cache.Cache`"""
+        self.raw            = json if self.keep_raw else None
         self.username       = json.get("username")
         self.discriminator  = json.get("discriminator")
         self.avatar         = json.get('avatar')
@@ -112,5 +124,19 @@ class User(Object):
         self.premium_type   = json.get('premium_type')
         self.public_flags   = json.get('public_flags')
 
+    def _apply_update(self, json):
+        """
+        applies a user payload in place. fields missing from ``json`` keep their value, as most user payloads (such
+        as the author of a message) only have some of them.
+        """
+        for key, value in json.items():
+            if key in _FIELDS:
+                setattr(self, key, value)
+        if self.raw is not None:
+            self.raw.update(json)
+
     def __str__(self):
         return f"{self.username}#{self.discriminator}"
+
+
+_FIELDS = frozenset(User.__slots__) - {'raw'}
@@ -17,10 +17,25 @@
 Miscellaneous utilities used by discordSplash
 """
 
+import bisect
 import collections
+import collections.abc
+import datetime
+import logging
+import operator
+import random
+import sys
+import typing
 
+#: log level below ``DEBUG`` used for tracing every gateway frame
+TRACE = 5
+logging.addLevelName(TRACE, 'TRACE')
 
-def flatten(d: collections.MutableMapping, parent_key: str = '', sep: str = '_') -> dict:
+# keys whose values are never logged
+_REDACTED_KEYS = frozenset(('token', 'Authorization'))
+
+
+def flatten(d: collections.abc.MutableMapping, parent_key: str = '', sep: str = '_') -> dict:
     """
     flatten a dict
 
@@ -46,8 +61,317 @@ def flatten(d: collections.MutableMapping, parent_key: str = '', sep: str = '_')
     items = []
     for k, v in d.items():
         new_key = parent_key + sep + k if parent_key else k
-        if isinstance(v, collections.MutableMapping):
+        if isinstance(v, collections.abc.MutableMapping):
             items.extend(flatten(v, new_key, sep=sep).items())
         else:
             items.append((new_key, v))
     return dict(items)
+
+
+def optional_int(value) -> typing.Optional[int]:
+    """converts a snowflake (or other number) from a payload to :class:`int`, keeping ``None``"""
+    return int(value) if value is not None else None
+
+
+def optional_datetime(value) -> typing.Optional[datetime.datetime]:
+    """parses an ISO8601 timestamp from a payload, keeping ``None``"""
+    return datetime.datetime.fromisoformat(value) if value is not None else None
+
+
+#: value of a :func:`lazy_field` that has not been parsed yet
+UNPARSED = object()
+
+
+def lazy_field(name: str, parse: typing.Callable[[typing.Any], typing.Any]) -> property:
+    """
+    Makes a model field that is parsed from its payload value the first time it is read, then memoized.
+
+    The model must have ``_raw_<name>`` and ``_<name>`` slots. It only stores the payload value in ``_raw_<name>``
+    and sets ``_<name>`` to :data:`UNPARSED`, so fields a handler never reads are never parsed. Once parsed, the
+    payload value is dropped. Assigning to the field stores an already parsed value.
+
+    Usage::
+
+        class Message:
+            __slots__ = ('_raw_timestamp', '_timestamp')
+            timestamp = lazy_field('timestamp', optional_datetime)
+
+            def __init__(self, data):
+                self._raw_timestamp = data.get('timestamp')
+                self._timestamp = UNPARSED
+
+    Parameters
+    ----------
+    name : str
+        name of the field
+
+    parse : Callable[[Any], Any]
+        turns the payload value into the field's value
+
+    Returns
+    -------
+    property
+    """
+    raw_name = f"_raw_{name}"
+    value_name = f"_{name}"
+    # a property with attrgetter is about twice as fast to read as a descriptor class
+    get_raw = operator.attrgetter(raw_name)
+    get_value = operator.attrgetter(value_name)
+
+    def fget(self):
+        value = get_value(self)
+        if value is UNPARSED:
+            value = parse(get_raw(self))
+            setattr(self, value_name, value)
+            setattr(self, raw_name, None)
+        return value
+
+    def fset(self, value):
+        setattr(self, value_name, value)
+        setattr(self, raw_name, None)
+
+    return property(fget, fset)
+
+
+def _slot_names(cls: type) -> typing.Tuple[str, ...]:
+    names = _SLOT_NAMES.get(cls)
+    if names is None:
+        names = _SLOT_NAMES[cls] = tuple(name for klass in cls.__mro__ for name in klass.__dict__.get('__slots__', ()))
+    return names
+
+
+_SLOT_NAMES: typing.Dict[type, typing.Tuple[str, ...]] = dict()
+
+
+def approximate_size(obj) -> int:
+    """
+    approximate memory use (in bytes) of a decoded payload or a model, including everything nested in it
+
+    Models (objects with ``__slots__``) nested in a model are not counted, because they are shared (such as the
+    author of a message).
+
+    Parameters
+    ----------
+    obj : Any
+        a payload made of dicts, lists, strings, numbers, booleans and ``None``, or a model
+
+    Returns
+    -------
+    int
+    """
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            size += sys.getsizeof(key) + approximate_size(value)
+    elif isinstance(obj, list):
+        for value in obj:
+            size += approximate_size(value)
+    elif hasattr(type(obj), '__slots__'):
+        for name in _slot_names(type(obj)):
+            value = getattr(obj, name, None)
+            if not hasattr(type(value), '__slots__'):
+                size += approximate_size(value)
+    return size
+
+
+def jittered_backoff(attempt: int, base: float = 0.5, cap: float = 30.0) -> float:
+    """
+    exponential backoff with full jitter
+
+    Parameters
+    ----------
+    attempt : int
+        number of attempts that have already failed, starting at ``0``
+
+    base : float
+        delay (in seconds) of the first attempt
+
+    cap : float
+        maximum delay (in seconds)
+
+    Returns
+    -------
+    float
+        seconds to wait before the next attempt. random between ``0`` and ``min(cap, base * 2 ** attempt)``
+    """
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class RollingLatency:
+    """
+    Keeps the last ``size`` latency samples and reports percentiles over them.
+
+    Parameters
+    ----------
+    size : int
+        number of samples to keep. Defaults to ``100``
+
+    Attributes
+    ----------
+    last : Optional[float]
+        the most recent sample. ``None`` if there are no samples yet.
+    """
+
+    def __init__(self, size: int = 100):
+        self._samples: typing.Deque[float] = collections.deque(maxlen=size)
+        self.last: typing.Optional[float] = None
+
+    def __len__(self):
+        return len(self._samples)
+
+    def add(self, value: float) -> None:
+        """adds a sample"""
+        self._samples.append(value)
+        self.last = value
+
+    def percentile(self, percent: float) -> typing.Optional[float]:
+        """
+        gets a percentile (nearest-rank) of the samples
+
+        Parameters
+        ----------
+        percent : float
+            the percentile, between ``0`` and ``100``
+
+        Returns
+        -------
+        Optional[float]
+            ``None`` if there are no samples yet.
+        """
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        rank = max(0, min(len(ordered) - 1, int(round(percent / 100 * len(ordered))) - 1))
+        return ordered[rank]
+
+    @property
+    def p50(self) -> typing.Optional[float]:
+        """median of the samples"""
+        return self.percentile(50)
+
+    @property
+    def p99(self) -> typing.Optional[float]:
+        """99th percentile of the samples"""
+        return self.percentile(99)
+
+    def to_dict(self) -> dict:
+        """``last``, ``p50`` and ``p99`` as a dict"""
+        return {'last': self.last, 'p50': self.p50, 'p99': self.p99}
+
+
+class Histogram:
+    """
+    Counts samples in fixed buckets. Adding a sample costs the same however many samples were added.
+
+    Parameters
+    ----------
+    bounds : Sequence[float]
+        upper bounds of the buckets, in increasing order. Samples above the last bound are counted in an extra
+        ``+Inf`` bucket.
+
+    Attributes
+    ----------
+    count : int
+        number of samples
+
+    total : float
+        sum of the samples
+
+    max : Optional[float]
+        largest sample. ``None`` if there are no samples yet.
+    """
+
+    def __init__(self, bounds: typing.Sequence[float]):
+        self.bounds = list(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max: typing.Optional[float] = None
+
+    def __len__(self):
+        return self.count
+
+    def add(self, value: float) -> None:
+        """adds a sample"""
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def percentile(self, percent: float) -> typing.Optional[float]:
+        """
+        gets the upper bound of the bucket a percentile falls in
+
+        Returns
+        -------
+        Optional[float]
+            ``None`` if there are no samples yet. :attr:`max` if the percentile is in the ``+Inf`` bucket.
+        """
+        if not self.count:
+            return None
+        rank = max(1, int(round(percent / 100 * self.count)))
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.max
+
+    def to_dict(self) -> dict:
+        """the count of each bucket (by upper bound), and the ``count``, ``sum``, ``max``, ``p50`` and ``p99``"""
+        buckets = {str(bound): count for bound, count in zip(self.bounds, self.counts)}
+        buckets['+Inf'] = self.counts[-1]
+        return {'buckets': buckets, 'count': self.count, 'sum': self.total, 'max': self.max,
+                'p50': self.percentile(50), 'p99': self.percentile(99)}
+
+
+def redact(payload):
+    """
+    copies a payload with secrets (such as the ``token`` in IDENTIFY and RESUME) replaced by ``'[REDACTED]'``
+
+    Parameters
+    ----------
+    payload : Any
+        the payload to redact. Only dicts and lists are searched.
+
+    Returns
+    -------
+    Any
+        the redacted copy
+    """
+    if isinstance(payload, dict):
+        return {key: '[REDACTED]' if key in _REDACTED_KEYS else redact(value) for key, value in payload.items()}
+    if isinstance(payload, list):
+        return [redact(value) for value in payload]
+    return payload
+
+
+class LoggedPayload:
+    """
+    Wraps a payload for logging. The payload is only redacted and turned into a string if the log record is actually
+    emitted, so passing one to a disabled logger costs almost nothing.
+
+    Usage::
+
+        log.debug("received %s", LoggedPayload(data))
+
+    Parameters
+    ----------
+    payload : Any
+        the payload
+
+    limit : Optional[int]
+        maximum number of characters to log. Longer payloads are truncated. ``None`` logs everything.
+    """
+    __slots__ = ('payload', 'limit')
+
+    def __init__(self, payload, limit: typing.Optional[int] = 1000):
+        self.payload = payload
+        self.limit = limit
+
+    def __str__(self):
+        text = str(redact(self.payload))
+        if self.limit is not None and len(text) > self.limit:
+            return f"{text[:self.limit]}... ({len(text) - self.limit} more characters)"
+        return text
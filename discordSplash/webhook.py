@@ -0,0 +1,304 @@
+# Copyright (C) 2021-Present Mineinjava
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Receives interactions over HTTP instead of the gateway.
+
+Discord can send interactions to an "interactions endpoint url" instead of the gateway. A bot that only has slash
+commands then needs no websocket connection, and any number of stateless :class:`InteractionServer` replicas can
+run behind a load balancer.
+
+Requests are verified with the application's Ed25519 public key, using `PyNaCl <https://pynacl.readthedocs.io>`_ or
+`cryptography <https://cryptography.io>`_, whichever is installed (``pip install discordSplash[webhook]``).
+"""
+import asyncio
+import concurrent.futures
+import functools
+import logging
+import time
+from typing import Dict, Optional, Union
+
+from aiohttp import web
+
+from . import codec, enums
+from .cache import Cache, get_cache
+from .dispatch import Dispatcher
+from .events import dispatch_event, eventdict
+from .router import get_router
+from .slashCommand import Interaction
+
+try:
+    from nacl.exceptions import BadSignatureError as _BadSignature
+    from nacl.signing import SigningKey as _SigningKey, VerifyKey as _VerifyKey
+    backend: Optional[str] = 'nacl'
+except ImportError:
+    try:
+        from cryptography.exceptions import InvalidSignature as _BadSignature
+        from cryptography.hazmat.primitives import serialization as _serialization
+        from cryptography.hazmat.primitives.asymmetric.ed25519 import (Ed25519PrivateKey as _SigningKey,
+                                                                       Ed25519PublicKey as _VerifyKey)
+        backend = 'cryptography'
+    except ImportError:
+        backend = None
+
+_log = logging.getLogger(__name__)
+
+_PING = 1
+_PONG = b'{"type":1}'
+_NO_CHOICES = b'{"type":8,"data":{"choices":[]}}'
+
+
+def _require_backend():
+    if backend is None:
+        raise ImportError("verifying interactions needs PyNaCl or cryptography. "
+                          "Install one with pip install discordSplash[webhook]")
+
+
+@functools.lru_cache(maxsize=32)
+def _verify_key(public_key: str):
+    # building a key parses and checks the point, so keys are kept between requests
+    raw = bytes.fromhex(public_key)
+    return _VerifyKey(raw) if backend == 'nacl' else _VerifyKey.from_public_bytes(raw)
+
+
+def verify_signature(public_key: str, signature: str, timestamp: str, body: bytes) -> bool:
+    """
+    Checks the signature discord sent with an interaction.
+
+    Parameters
+    ----------
+    public_key : :class:`str`
+        the application's public key, in hex, as shown in the developer portal
+
+    signature : :class:`str`
+        the ``X-Signature-Ed25519`` header
+
+    timestamp : :class:`str`
+        the ``X-Signature-Timestamp`` header
+
+    body : :class:`bytes`
+        the body of the request, as it was received
+
+    Returns
+    -------
+    :class:`bool`
+        whether or not the signature is valid
+    """
+    _require_backend()
+    try:
+        raw_signature = bytes.fromhex(signature)
+    except ValueError:
+        return False
+    message = timestamp.encode() + body
+    key = _verify_key(public_key)
+    try:
+        if backend == 'nacl':
+            key.verify(message, raw_signature)
+        else:
+            key.verify(raw_signature, message)
+    except (_BadSignature, ValueError):
+        return False
+    return True
+
+
+class InteractionSigner:
+    """
+    Signs requests like discord does. Made for testing an :class:`InteractionServer` locally.
+
+    Parameters
+    ----------
+    private_key : Optional[:class:`bytes`]
+        32 byte Ed25519 seed. A new key is generated if not passed.
+
+    Attributes
+    ----------
+    public_key : :class:`str`
+        the public key in hex, to pass to :class:`InteractionServer`
+    """
+
+    def __init__(self, private_key: Optional[bytes] = None):
+        _require_backend()
+        if backend == 'nacl':
+            self._key = _SigningKey(private_key) if private_key is not None else _SigningKey.generate()
+            self.public_key = self._key.verify_key.encode().hex()
+        else:
+            self._key = _SigningKey.from_private_bytes(private_key) if private_key is not None \
+                else _SigningKey.generate()
+            self.public_key = self._key.public_key().public_bytes(_serialization.Encoding.Raw,
+                                                                  _serialization.PublicFormat.Raw).hex()
+
+    def sign(self, body: Union[bytes, str], timestamp: Optional[str] = None) -> Dict[str, str]:
+        """
+        Signs a request body.
+
+        Returns
+        -------
+        Dict[:class:`str`, :class:`str`]
+            the ``X-Signature-Ed25519`` and ``X-Signature-Timestamp`` headers
+        """
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        timestamp = timestamp if timestamp is not None else str(int(time.time()))
+        message = timestamp.encode() + body
+        signature = self._key.sign(message).signature if backend == 'nacl' else self._key.sign(message)
+        return {'X-Signature-Ed25519': signature.hex(), 'X-Signature-Timestamp': timestamp}
+
+
+class InteractionServer:
+    """
+    aiohttp server that receives interactions from discord.
+
+    Every request is verified first, and PINGs are answered straight away. Other interactions go through the same
+    listeners and :class:`discordSplash.router.InteractionRouter` as interactions received by
+    :class:`discordSplash.GatewayBot`. The first response of an interaction (or its defer) is sent back as the
+    body of the HTTP response. Later responses go through the HTTP API as usual. Interactions nothing responds to
+    (no typed listener, and no route in the router) are answered straight away: autocompletes with no choices,
+    anything else with a 404.
+
+    The server keeps no state between requests, so it can be replicated.
+
+    .. Hint::
+        Example Code:
+
+        .. code:: python
+
+            @discordSplash.command('ping')
+            async def ping(interaction):
+                await interaction.respond(ReactionResponse('pong'))
+
+            InteractionServer(PUBLIC_KEY).run(port=8080)
+
+    Parameters
+    ----------
+    public_key : :class:`str`
+        the application's public key, in hex
+
+    path : Optional[:class:`str`]
+        path the interactions are posted to. Defaults to ``/interactions``
+
+    cache : Optional[:class:`discordSplash.cache.Cache`]
+        cache passed interactions go through. Defaults to :func:`discordSplash.cache.get_cache`
+
+    dispatcher : Optional[:class:`discordSplash.dispatch.Dispatcher`]
+        runs the listeners. A new one is created if not passed.
+
+    executor : Optional[:class:`concurrent.futures.Executor`]
+        executor signatures are verified in, so verifying does not block the event loop. A thread pool with
+        ``verify_workers`` threads is created if not passed.
+
+    verify_workers : Optional[:class:`int`]
+        number of threads of the default executor. Defaults to ``4``
+
+    Attributes
+    ----------
+    requests : :class:`int`
+        number of requests received
+
+    rejected : :class:`int`
+        number of requests whose signature was missing or invalid
+    """
+
+    def __init__(self, public_key: str, path: str = '/interactions', cache: Optional[Cache] = None,
+                 dispatcher: Optional[Dispatcher] = None,
+                 executor: Optional[concurrent.futures.Executor] = None, verify_workers: int = 4):
+        _require_backend()
+        self.public_key = public_key
+        # fails here, not on the first request, if the key is malformed
+        _verify_key(public_key)
+        self.path = path
+        self.cache = cache if cache is not None else get_cache()
+        self.dispatcher = dispatcher if dispatcher is not None else Dispatcher()
+        self._owns_executor = executor is None
+        self.executor = executor if executor is not None else concurrent.futures.ThreadPoolExecutor(
+            verify_workers, thread_name_prefix='discordSplash-verify')
+        self.requests = 0
+        self.rejected = 0
+        self._runner: Optional[web.AppRunner] = None
+
+    def make_app(self) -> web.Application:
+        """makes an :class:`aiohttp.web.Application` serving :meth:`handle` at ``path``"""
+        app = web.Application()
+        app.router.add_post(self.path, self.handle)
+        return app
+
+    async def handle(self, request: web.Request) -> web.Response:
+        """the aiohttp handler of interactions"""
+        self.requests += 1
+        signature = request.headers.get('X-Signature-Ed25519')
+        timestamp = request.headers.get('X-Signature-Timestamp')
+        body = await request.read()
+        if not signature or not timestamp:
+            self.rejected += 1
+            return web.Response(status=401, text='missing request signature')
+        loop = asyncio.get_running_loop()
+        valid = await loop.run_in_executor(self.executor, verify_signature, self.public_key, signature, timestamp,
+                                           body)
+        if not valid:
+            self.rejected += 1
+            return web.Response(status=401, text='invalid request signature')
+
+        data = codec.loads(body)
+        if data.get('type') == _PING:
+            return web.Response(body=_PONG, content_type='application/json')
+
+        interaction = Interaction(data, self.cache)
+        response = interaction._initial_response = loop.create_future()
+        await dispatch_event(self.dispatcher, self.cache, 'INTERACTION_CREATE', data, interaction)
+        if not eventdict.getall('INTERACTION_CREATE', ()) and not get_router().handles(data):
+            # nothing will respond, so there is no point waiting for the deadline
+            response.cancel()
+            if data.get('type') == enums.InteractionType.ApplicationCommandAutocomplete.value:
+                return web.Response(body=_NO_CHOICES, content_type='application/json')
+            return web.Response(status=404, text='nothing handles the interaction')
+        try:
+            initial = await asyncio.wait_for(asyncio.shield(response), interaction.deadline - time.monotonic())
+        except asyncio.TimeoutError:
+            # later responses go through the HTTP API, which will reject them as the interaction expired
+            response.cancel()
+            _log.warning("Interaction %s was not responded to in time", interaction.id)
+            return web.Response(status=504, text='the interaction was not responded to in time')
+        return web.Response(body=codec.dumps(initial).encode('utf-8'), content_type='application/json')
+
+    async def start(self, host: str = '0.0.0.0', port: int = 8080) -> None:
+        """starts serving. Returns once the server is listening."""
+        self._runner = web.AppRunner(self.make_app(), access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        _log.info("Listening for interactions on http://%s:%s%s", host, port, self.path)
+
+    async def close(self) -> None:
+        """stops serving and cancels the pending listeners"""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+        await self.dispatcher.close()
+        if self._owns_executor:
+            self.executor.shutdown(wait=False)
+
+    def run(self, host: str = '0.0.0.0', port: int = 8080) -> None:
+        """
+        Runs the server until it is interrupted.
+        """
+
+        async def serve():
+            await self.start(host, port)
+            try:
+                await asyncio.Event().wait()
+            finally:
+                await self.close()
+
+        try:
+            asyncio.run(serve())
+        except KeyboardInterrupt:
+            pass
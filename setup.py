@@ -25,6 +25,11 @@ setuptools.setup(
     url="https://github.com/Mineinjava/discord-splash",
     packages=setuptools.find_packages(),
     install_requires=requirements,
+    extras_require={
+        'speed': ['orjson'],
+        'numpy': ['numpy'],
+        'webhook': ['pynacl']
+    },
     project_urls={
         "Documentation": "https://discordsplash.readthedocs.io/",
         "Issue tracker": "https://github.com/mineinjava/discordSplash/issues",